@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the Python orchestration layer.
+
+Generates a synthetic project and times YAML loading, source discovery,
+Tcl generation and a build against the stub vivado of the tests. Wall time
+and peak Python memory of every stage are written as JSON; --compare
+reports the change against an earlier result and fails on regressions.
+
+  python3 benchmarks/bench_orchestration.py --files 200 -o new.json \\
+      --compare bench_results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from xil_builder.fileindex import FileIndex  # noqa: E402
+from xil_builder.project import Project  # noqa: E402
+from xil_builder.vivado import Vivado  # noqa: E402
+
+STUB_BIN = ROOT / "tests" / "files" / "bin"
+
+ENTITY = """library ieee;
+use ieee.std_logic_1164.all;
+{uses}entity {name} is
+  port (clk : in std_logic);
+end entity;
+architecture rtl of {name} is
+begin
+{inst}end architecture;
+"""
+
+
+def generate(root: Path, libs: int, files: int, ips: int, bds: int,
+             patterns: int) -> Path:
+    """
+    Writes a synthetic project and commits it to a new git repository.
+
+    Every library lies in its own directory with half of its files in
+    subdirectories, so recursive patterns have something to walk. Each
+    entity instantiates the previous one, the first entity of a library
+    the last one of the previous library, the last one is the top.
+
+    Args:
+      root (Path): The project directory.
+      libs (int): Number of libraries.
+      files (int): VHDL files per library.
+      ips (int): Number of IP files.
+      bds (int): Number of block design scripts.
+      patterns (int): Glob patterns per library.
+
+    Returns:
+      Path: The project YAML.
+    """
+    previous = None
+    previous_lib = None
+    libraries = {}
+    for i in range(libs):
+        lib = f"lib_{i:03d}"
+        for j in range(files):
+            sub = root / lib / (f"sub_{j % 4}" if j % 2 else "")
+            sub.mkdir(parents=True, exist_ok=True)
+            name = f"{lib}_e{j:04d}"
+            uses = ""
+            inst = ""
+            if previous is not None:
+                unit = "work"
+                if previous_lib != lib:
+                    uses = f"library {previous_lib};\n"
+                    unit = previous_lib
+                inst = f"  u_prev : entity {unit}.{previous} " \
+                       "port map (clk => clk);\n"
+            (sub / f"{name}.vhd").write_text(
+                ENTITY.format(name=name, uses=uses, inst=inst))
+            previous = name
+            previous_lib = lib
+        all_patterns = [f"./{lib}/*.vhd", f"./{lib}/**/*.vhd",
+                        f"./{lib}/sub_*/*.vhd", f"./{lib}/sub_0/*.vhd"]
+        libraries[lib] = all_patterns[0:max(1, patterns)]
+
+    (root / "ip").mkdir(exist_ok=True)
+    for i in range(ips):
+        (root / "ip" / f"ip_{i:03d}.xci").write_text("{}\n")
+    (root / "bd").mkdir(exist_ok=True)
+    for i in range(bds):
+        (root / "bd" / f"bd_{i:02d}.tcl").write_text("# block design\n")
+    (root / "xdc").mkdir(exist_ok=True)
+    (root / "xdc" / "top.xdc").write_text("# constraints\n")
+
+    data = {
+        "project": {
+            "name": "bench",
+            "part": "xc7z010clg400-1",
+            "top": previous,
+            "syn_args": {"flatten_hierarchy": "rebuild"},
+            "impl_args": {},
+            "generics": {"g_bench": 1},
+        },
+        "bd_files": ["./bd/*.tcl"],
+        "ip_files": ["./ip/*.xci"],
+        "constraints": ["./xdc/*.xdc"],
+        "libraries": libraries,
+    }
+    path = root / "bench.yml"
+    path.write_text(yaml.safe_dump(data))
+    # the git generics need a repository
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.run(git + ["init", "-q"], cwd=root, check=True)
+    subprocess.run(git + ["add", "."], cwd=root, check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "bench"], cwd=root,
+                   check=True)
+    return path
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    """
+    Times a function and traces its peak Python memory.
+
+    Args:
+      fn (callable): The benchmarked function.
+      repeat (int): Number of timed runs.
+      setup (callable, optional): Called untimed before every run.
+          Defaults to None.
+
+    Returns:
+      dict: median_s, min_s and peak_kb.
+    """
+    times = []
+    peak = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        times.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "peak_kb": peak // 1024,
+    }
+
+
+def run(args) -> dict:
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "src"
+        outdir = Path(tmp) / "out"
+        yml = generate(root, args.libs, args.files, args.ips, args.bds,
+                       args.patterns)
+        # the patterns resolve against the YAML's directory, the git
+        # snapshot of the flow is taken in the working directory
+        os.chdir(root)
+        try:
+            results = _run_stages(args, yml, outdir, Path(tmp))
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "created": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        # peak resident size of this process and of the stub vivado runs
+        "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children_maxrss_kb":
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        "config": {
+            "libs": args.libs, "files": args.files, "ips": args.ips,
+            "bds": args.bds, "patterns": args.patterns,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def _run_stages(args, yml: Path, outdir: Path, tmp: Path) -> dict:
+    results = {}
+
+    def load_yaml():
+        with yml.open() as f:
+            yaml.safe_load(f)
+
+    results["yaml_load"] = measure(load_yaml, args.repeat)
+    results["discovery"] = measure(
+        lambda: Project(yml, outdir, index=FileIndex(), use_cache=False),
+        args.repeat)
+    # the warm-up and the shared project print like the measured runs
+    with contextlib.redirect_stdout(io.StringIO()):
+        Project(yml, outdir, use_cache=True)
+        prj = Project(yml, outdir)
+    results["project_cached"] = measure(
+        lambda: Project(yml, outdir, use_cache=True), args.repeat)
+
+    results["tcl_generation"] = measure(
+        lambda: Vivado(prj, "vhdl"), args.repeat)
+    results["tcl_generation_hdl_deps"] = measure(
+        lambda: Vivado(prj, "vhdl", hdl_deps=True), args.repeat)
+
+    old_path = os.environ.get("PATH", "")
+    os.environ["PATH"] = f"{STUB_BIN}{os.pathsep}{old_path}"
+    try:
+        log = tmp / "vivado.log"
+        results["orchestration"] = measure(
+            lambda: Vivado(prj, "vhdl").build(True, True, log=log),
+            args.repeat)
+    finally:
+        os.environ["PATH"] = old_path
+    return results
+
+
+def compare(new: dict, old: dict, threshold: float) -> bool:
+    """
+    Prints the change of every stage against an earlier result.
+
+    Args:
+      new (dict): The current result.
+      old (dict): The earlier result.
+      threshold (float): Slowdown factor counted as regression.
+
+    Returns:
+      bool: True if no stage regressed.
+    """
+    if new["config"] != old["config"]:
+        print("warning: the results were taken with different configs")
+    ok = True
+    for stage, r in new["results"].items():
+        before = old["results"].get(stage)
+        if before is None:
+            continue
+        ratio = r["median_s"] / before["median_s"] \
+            if before["median_s"] else 1.0
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{stage:<26}{before['median_s']:>9.4f} s ->"
+              f"{r['median_s']:>9.4f} s  x{ratio:.2f}{flag}")
+    return ok
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the orchestration layer")
+    parser.add_argument("--libs", type=int, default=10)
+    parser.add_argument("--files", type=int, default=100,
+                        help="VHDL files per library")
+    parser.add_argument("--ips", type=int, default=20)
+    parser.add_argument("--bds", type=int, default=2)
+    parser.add_argument("--patterns", type=int, default=3,
+                        help="Glob patterns per library (1-4)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", type=str,
+                        default="bench_results.json")
+    parser.add_argument("--compare", type=str,
+                        help="Earlier result to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Slowdown factor counted as regression")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    result = run(args)
+    for stage, r in result["results"].items():
+        print(f"{stage:<26}{r['median_s']:>9.4f} s"
+              f"{r['peak_kb'] / 1024:>9.1f} MiB")
+    old = None
+    if args.compare is not None:
+        old = json.loads(Path(args.compare).read_text())
+    Path(args.output).write_text(json.dumps(result, indent=2))
+    if old is not None and not compare(result, old, args.threshold):
+        sys.exit(1)
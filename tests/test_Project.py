@@ -1,4 +1,7 @@
+import io
+import tempfile
 import unittest
+from contextlib import redirect_stdout
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 from xil_builder.project import Project, FType, Library, SrcFile
@@ -25,11 +28,17 @@ class TestProject(unittest.TestCase):
             Path('file.unknown')), FType.NONE)
 
     def test_get_files(self):
-        with patch.object(Path, 'glob', return_value=[Path('file.v')]):
+        with patch.object(self.project.index, 'resolve',
+                          return_value=[Path('file.v')]):
             files = self.project._get_files(['file.v'])
             self.assertEqual(len(files), 1)
             self.assertIsInstance(files[0], SrcFile)
 
+    def test_get_files_dedup(self):
+        files = self.project._get_files(["./hdl/*.vhd", "hdl/demo.vhd"])
+        self.assertEqual([f.get_path() for f in files],
+                         [Path("tests/files/hdl/demo.vhd")])
+
     def test_print_prj_info(self):
         with patch('builtins.print') as mocked_print:
             self.project.print_prj_info()
@@ -52,5 +61,73 @@ class TestProject(unittest.TestCase):
             self.assertEqual(mocked_print.call_count, 0)
 
 
+class TestProjectCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "hdl").mkdir()
+        (self.root / "hdl" / "top.vhd").write_text("")
+        self.yaml = self.root / "prj.yml"
+        self.yaml.write_text(
+            "project:\n"
+            "  name: cached\n"
+            "  part: xc7z010clg400-1\n"
+            "  top: top\n"
+            "constraints: null\n"
+            "libraries:\n"
+            "  work:\n"
+            "    - ./hdl/*.vhd\n"
+        )
+        self.outdir = self.root / "out"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def files(self, prj):
+        return [f.get_path().name for f in prj.libs[0].get_files()]
+
+    def test_hit(self):
+        first = Project(self.yaml, self.outdir, use_cache=True)
+        self.assertTrue(first.cache_file.is_file())
+        with patch("xil_builder.project.load") as mock_load:
+            second = Project(self.yaml, self.outdir, use_cache=True)
+            mock_load.assert_not_called()
+        self.assertEqual(second.name, "cached")
+        self.assertEqual(self.files(second), ["top.vhd"])
+        self.assertEqual(second.libs[0].get_files()[0].get_type(),
+                         FType.VHDL)
+
+    def test_new_file(self):
+        Project(self.yaml, self.outdir, use_cache=True)
+        (self.root / "hdl" / "pkg.vhd").write_text("")
+        prj = Project(self.yaml, self.outdir, use_cache=True)
+        self.assertEqual(self.files(prj), ["pkg.vhd", "top.vhd"])
+
+    def test_yaml_changed(self):
+        Project(self.yaml, self.outdir, use_cache=True)
+        self.yaml.write_text(self.yaml.read_text().replace("cached", "new"))
+        self.assertEqual(
+            Project(self.yaml, self.outdir, use_cache=True).name, "new")
+
+    def test_disabled_by_default(self):
+        prj = Project(self.yaml, self.outdir)
+        self.assertFalse(prj.cache_file.exists())
+
+    def test_cached_load_behaves_like_uncached(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            Project(self.yaml, self.outdir, use_cache=True)
+        uncached = out.getvalue()
+        self.assertIn("no impl_args", uncached)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            Project(self.yaml, self.outdir, use_cache=True)
+        self.assertEqual(out.getvalue(), uncached)
+        # the restored files are checked like resolved ones
+        with patch("xil_builder.library.Library.add_file_obj") as add:
+            Project(self.yaml, self.outdir, use_cache=True)
+            add.assert_called_once()
+
+
 if __name__ == '__main__':
     unittest.main()
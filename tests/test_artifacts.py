@@ -0,0 +1,130 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+from xil_builder.artifacts import ArtifactStore
+from xil_builder.project import Project
+from xil_builder.vivado import Vivado
+
+FAKE_BIN = Path("tests/files/bin").resolve()
+
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.deploy = Path(self.tmp.name) / "deploy"
+        self.deploy.mkdir()
+        self.store = ArtifactStore(self.deploy)
+        self.now = 1000.0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _build(self, build, contents, name="demo", rev="abc"):
+        # write the artifacts and links like synth.tcl and ingest them
+        for ext, content in contents.items():
+            (self.deploy / f"{build}.{ext}").write_text(content)
+            link = self.deploy / f"latest-{name}.{ext}"
+            if link.is_symlink():
+                link.unlink()
+            link.symlink_to(f"{build}.{ext}")
+        self.now += 1
+        with mock.patch("time.time", return_value=self.now):
+            return self.store.ingest(name, rev)
+
+    def test_ingest(self):
+        m = self._build("demo_main_abc_1_-0.125ns",
+                        {"bit": "bit0", "xsa": "xsa0"})
+        self.assertEqual(m["build"], "demo_main_abc_1_-0.125ns")
+        self.assertEqual(m["wns"], -0.125)
+        self.assertEqual(m["git_rev"], "abc")
+        self.assertEqual(set(m["files"]), {"demo_main_abc_1_-0.125ns.bit",
+                                           "demo_main_abc_1_-0.125ns.xsa"})
+        self.assertEqual(m["links"]["latest-demo.bit"],
+                         "demo_main_abc_1_-0.125ns.bit")
+        self.assertIsNone(ArtifactStore(Path(self.tmp.name)).ingest("demo"))
+
+    def test_dedupe(self):
+        self._build("demo_1_0.5ns", {"bit": "same", "xsa": "xsa1"})
+        self._build("demo_2_0.5ns", {"bit": "same", "xsa": "xsa2"})
+        first = self.deploy / "demo_1_0.5ns.bit"
+        second = self.deploy / "demo_2_0.5ns.bit"
+        self.assertTrue(os.path.samefile(first, second))
+        self.assertEqual(second.read_text(), "same")
+        s = self.store.stats()
+        self.assertEqual(s["builds"], 2)
+        self.assertEqual(s["objects"], 3)
+        self.assertEqual(s["logical_bytes"], 16)
+        self.assertEqual(s["bytes"], 12)
+
+    def test_lookup(self):
+        self._build("demo_1_0.5ns", {"bit": "bit1"}, rev="r1")
+        self._build("demo_2_0.5ns", {"bit": "bit2"}, rev="r2")
+        arts = self.store.artifacts("demo_1_0.5ns")
+        self.assertEqual(arts["demo_1_0.5ns.bit"].read_text(), "bit1")
+        arts = self.store.artifacts(name="demo", git_rev="r2")
+        self.assertEqual(arts["demo_2_0.5ns.bit"].read_text(), "bit2")
+        self.assertEqual(self.store.artifacts("unknown"), {})
+
+    def test_keep_last(self):
+        for i in range(4):
+            self._build(f"demo_{i}_0.5ns", {"bit": f"bit{i}", "zip": "zip"},
+                        rev=f"r{i}")
+        self._build("other_0_0.5ns", {"bit": "other"}, name="other")
+        removed = self.store.prune(keep_last=2)
+        self.assertEqual(removed, ["demo_1_0.5ns", "demo_0_0.5ns"])
+        self.assertFalse((self.deploy / "demo_0_0.5ns.bit").exists())
+        self.assertTrue((self.deploy / "demo_3_0.5ns.zip").exists())
+        self.assertTrue((self.deploy / "other_0_0.5ns.bit").exists())
+        self.assertIsNone(self.store.manifest(name="demo", git_rev="r0"))
+        # the shared zip stays, the bitstreams of removed builds are gone
+        self.assertEqual(self.store.stats()["objects"], 4)
+        self.assertTrue((self.deploy / "latest-demo.bit").resolve().exists())
+
+    def test_max_bytes(self):
+        for i in range(3):
+            self._build(f"demo_{i}_0.5ns", {"bit": "x" * 100 + str(i)})
+        removed = self.store.prune(max_bytes=250)
+        self.assertEqual(removed, ["demo_0_0.5ns"])
+        # the newest build is kept even if it exceeds the limit
+        removed = self.store.prune(max_bytes=10)
+        self.assertEqual(removed, ["demo_1_0.5ns"])
+        self.assertEqual(self.store.stats()["builds"], 1)
+
+    def test_replaced_file_is_kept(self):
+        self._build("demo_0_0.5ns", {"bit": "bit0"})
+        self._build("demo_1_0.5ns", {"bit": "bit1"})
+        path = self.deploy / "demo_0_0.5ns.bit"
+        path.unlink()
+        path.write_text("not from the store")
+        self.store.prune(keep_last=1)
+        self.assertEqual(path.read_text(), "not from the store")
+
+
+class TestVivadoArtifacts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.outdir = Path(self.tmp.name)
+        self.path = os.environ["PATH"]
+        os.environ["PATH"] = f"{FAKE_BIN}{os.pathsep}{self.path}"
+
+    def tearDown(self):
+        os.environ["PATH"] = self.path
+        self.tmp.cleanup()
+
+    def test_build_ingests(self):
+        prj = Project(Path("tests/files/demo.yml"), self.outdir)
+        store = ArtifactStore(self.outdir / "deploy", keep_last=3)
+        viv = Vivado(prj, artifacts=store)
+        log = self.outdir / "vivado.log"
+        self.assertEqual(viv.build(True, True, log=log), 0)
+        m = store.manifest(name="demo", git_rev=viv.git_sha)
+        self.assertEqual(m["build"], "demo_fake_0.000ns")
+        self.assertEqual(m["wns"], 0.0)
+        self.assertLess(abs(m["created"] - time.time()), 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from xil_builder.cache import BuildCache
+from xil_builder.fingerprint import project_fingerprint
+from xil_builder.project import Project
+
+
+def make_deploy(deploy: Path, name: str, payload: bytes):
+    deploy.mkdir(parents=True, exist_ok=True)
+    for ext in ["bit", "bin"]:
+        f = deploy / f"{name}_main_abc_0.123ns.{ext}"
+        f.write_bytes(payload)
+        link = deploy / f"latest-{name}.{ext}"
+        if link.is_symlink():
+            link.unlink()
+        link.symlink_to(f.name)
+
+
+class TestBuildCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.cache = BuildCache(self.root / "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_miss(self):
+        self.assertFalse(self.cache.restore("abc", self.root / "deploy"))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_store_restore(self):
+        make_deploy(self.root / "build", "demo", b"bitstream")
+        self.assertTrue(self.cache.store("abc", self.root / "build", "demo"))
+        deploy = self.root / "deploy"
+        self.assertTrue(self.cache.restore("abc", deploy))
+        link = deploy / "latest-demo.bit"
+        self.assertTrue(link.is_symlink())
+        self.assertEqual(link.read_bytes(), b"bitstream")
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_store_without_artifacts(self):
+        (self.root / "build").mkdir()
+        self.assertFalse(self.cache.store("abc", self.root / "build", "demo"))
+
+    def test_eviction(self):
+        cache = BuildCache(self.root / "small", max_bytes=30)
+        make_deploy(self.root / "b0", "demo", b"0" * 10)
+        make_deploy(self.root / "b1", "demo", b"1" * 10)
+        cache.store("k0", self.root / "b0", "demo")
+        os.utime(cache.entry("k0") / "manifest.json", (0, 0))
+        cache.store("k1", self.root / "b1", "demo")
+        self.assertFalse(cache.contains("k0"))
+        self.assertTrue(cache.contains("k1"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.project = Project(
+            Path('tests/files/demo.yml'), Path('tests/files/.work')
+        )
+
+    def test_stable(self):
+        self.assertEqual(project_fingerprint(self.project),
+                         project_fingerprint(self.project))
+
+    def test_generics_change(self):
+        ref = project_fingerprint(self.project)
+        self.project.generics = dict(self.project.generics, g_major=9)
+        self.assertNotEqual(ref, project_fingerprint(self.project))
+
+    def test_extra_change(self):
+        self.assertNotEqual(project_fingerprint(self.project, {"a": 1}),
+                            project_fingerprint(self.project, {"a": 2}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from xil_builder.distributed import Coordinator, Worker, submit
+
+FAKE_BIN = Path("tests/files/bin").resolve()
+
+
+class TestCoordinator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.coordinator = Coordinator(Path(self.tmp.name) / "artifacts")
+
+    def tearDown(self):
+        self.coordinator.server.server_close()
+        self.tmp.cleanup()
+
+    def test_coalescing(self):
+        request = {"yaml": "demo.yml", "rev": "abc", "syn": True,
+                   "impl": True}
+        first, coalesced = self.coordinator.submit(request)
+        self.assertFalse(coalesced)
+        second, coalesced = self.coordinator.submit(dict(request))
+        self.assertTrue(coalesced)
+        self.assertIs(first, second)
+        other, _ = self.coordinator.submit(dict(request, rev="def"))
+        self.assertIsNot(other, first)
+        self.assertEqual(len(self.coordinator.queue), 2)
+
+    def test_finished_job_is_not_reused(self):
+        request = {"yaml": "demo.yml"}
+        job, _ = self.coordinator.submit(request)
+        self.assertIs(self.coordinator.fetch("w"), job)
+        self.assertEqual(job.state, "running")
+        self.coordinator.done(job.id, 0, [], {})
+        again, coalesced = self.coordinator.submit(request)
+        self.assertFalse(coalesced)
+        self.assertIsNot(again, job)
+
+    def test_requeue(self):
+        job, _ = self.coordinator.submit({"yaml": "demo.yml"})
+        self.coordinator.fetch("w")
+        self.coordinator.requeue([job.id])
+        self.assertEqual(job.state, "pending")
+        self.assertIs(self.coordinator.fetch("w2"), job)
+
+    def test_fetch_timeout(self):
+        self.assertIsNone(self.coordinator.fetch("w", timeout=0.01))
+
+    def test_upload(self):
+        job, _ = self.coordinator.submit({"yaml": "demo.yml"})
+        self.coordinator.upload(job.id, "../a.bit", 0, "YWJj")
+        self.coordinator.upload(job.id, "../a.bit", 3, "ZGVm")
+        self.coordinator.done(job.id, 0, ["a.bit"], {"latest-a.bit": "a.bit"})
+        jobdir = self.coordinator.outdir / job.id
+        self.assertEqual((jobdir / "latest-a.bit").read_bytes(), b"abcdef")
+        self.assertEqual(job.artifacts, ["a.bit", "latest-a.bit"])
+        with self.assertRaises(KeyError):
+            self.coordinator.upload("nope", "a.bit", 0, "")
+
+
+def git_repo(root: Path) -> list:
+    shutil.copytree("tests/files", root,
+                    ignore=shutil.ignore_patterns(".work"))
+    git = ["git", "-C", str(root), "-c", "user.name=test",
+           "-c", "user.email=test@example.com"]
+    subprocess.run(git + ["init", "-q", "-b", "main"], check=True)
+    subprocess.run(git + ["add", "."], check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "init"], check=True)
+    return git
+
+
+def head(git: list) -> str:
+    return subprocess.run(git + ["rev-parse", "HEAD"], check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+class TestRevisions(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.repo = self.root / "repo"
+        self.git = git_repo(self.repo)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def commit(self):
+        (self.repo / "demo.yml").write_text(
+            (self.repo / "demo.yml").read_text() + "#\n")
+        subprocess.run(self.git + ["commit", "-q", "-am", "next"],
+                       check=True)
+        return head(self.git)
+
+    def test_branch_is_resolved_before_coalescing(self):
+        coordinator = Coordinator(self.root / "artifacts", repo=self.repo)
+        try:
+            first, _ = coordinator.submit({"yaml": "demo.yml",
+                                           "rev": "main"})
+            self.assertEqual(first.request["rev"], head(self.git))
+            self.assertEqual(first.request["ref"], "main")
+            self.commit()
+            second, coalesced = coordinator.submit({"yaml": "demo.yml",
+                                                    "rev": "main"})
+            self.assertFalse(coalesced)
+            self.assertEqual(second.request["rev"], head(self.git))
+            with self.assertRaises(ValueError):
+                coordinator.submit({"yaml": "demo.yml", "rev": "nope"})
+        finally:
+            coordinator.server.server_close()
+
+    def test_worker_builds_current_commit(self):
+        worker = Worker(("127.0.0.1", 0), self.repo, self.root / "work")
+        worker.conn = MagicMock()
+        cwd = os.getcwd()
+        path = f"{FAKE_BIN}{os.pathsep}{os.environ['PATH']}"
+        with patch.dict(os.environ, {"PATH": path}):
+            job = {"job": "1", "request": {"yaml": "demo.yml",
+                                           "rev": "feature/x"}}
+            subprocess.run(self.git + ["branch", "feature/x"], check=True)
+            code, files, links = worker.build(job)
+            self.assertEqual(os.getcwd(), cwd)
+            self.assertEqual(code, 0)
+            first = head(self.git)
+            self.assertTrue((self.root / "work" / "src" / first).is_dir())
+            subprocess.run(self.git + ["checkout", "-q", "feature/x"],
+                           check=True)
+            second = self.commit()
+            worker.build(dict(job, job="2"))
+        self.assertTrue((self.root / "work" / "src" / second).is_dir())
+        self.assertFalse((self.root / "work" / "src" / "feature").exists())
+        self.assertEqual(files, ["demo_fake_0.000ns.bin",
+                                 "demo_fake_0.000ns.bit",
+                                 "demo_fake_0.000ns.xsa"])
+        uploads = [c.kwargs["name"] for c in worker.conn.call.call_args_list
+                   if c.args[0] == "upload"]
+        self.assertIn("demo_fake_0.000ns.bit", uploads)
+
+
+class TestDistributedBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.repo = root / "repo"
+        self.rev = head(git_repo(self.repo))
+        self.coordinator = Coordinator(root / "artifacts")
+        self.coordinator.start()
+        host, port = self.coordinator.address
+        env = dict(os.environ)
+        env["PATH"] = f"{FAKE_BIN}{os.pathsep}{env['PATH']}"
+        self.workers = [
+            subprocess.Popen(
+                [sys.executable, "-m", "xil_builder.distributed", "worker",
+                 "--connect", f"{host}:{port}", "--repo", str(self.repo),
+                 "--workdir", str(root / f"worker{i}"), "--idle", "5"],
+                env=env, stdout=subprocess.DEVNULL,
+            )
+            for i in range(2)
+        ]
+
+    def tearDown(self):
+        for w in self.workers:
+            w.terminate()
+            w.wait()
+        self.coordinator.stop()
+        self.tmp.cleanup()
+
+    def test_build(self):
+        address = self.coordinator.address
+        first = submit(address, "demo.yml")
+        again = submit(address, "demo.yml")
+        self.assertEqual(first["job"], again["job"])
+        self.assertTrue(again["coalesced"])
+        synth = submit(address, "demo.yml", rev=self.rev, impl=False)
+        self.assertNotEqual(synth["job"], first["job"])
+
+        job = self.coordinator.wait(first["job"], timeout=60)
+        self.assertEqual(job.state, "done")
+        self.assertEqual(job.submitted, 2)
+        self.assertIn("stage_end", [e["kind"] for e in job.events])
+        jobdir = self.coordinator.outdir / job.id
+        self.assertEqual((jobdir / "latest-demo.bit").read_text(),
+                         "demo bit\n")
+
+        job = self.coordinator.wait(synth["job"], timeout=60)
+        self.assertEqual(job.state, "done")
+        self.assertEqual(job.artifacts, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+from pathlib import Path
+from xil_builder.fileindex import FileIndex
+
+
+class TestFileIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for name in ["hdl/a.vhd", "hdl/b.v", "hdl/sub/c.vhd",
+                     "hdl/sub/deep/d.vhd", "ip/x/x.xci", "other/e.vhd"]:
+            p = self.root / name
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text("")
+        self.index = FileIndex()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def names(self, patterns, root=None):
+        root = self.root if root is None else root
+        return [p.relative_to(self.root).as_posix()
+                for p in self.index.resolve(root, patterns)]
+
+    def test_same_as_pathlib(self):
+        for pattern in ["hdl/*.vhd", "./hdl/*", "hdl/**/*.vhd",
+                        "*/*/*.xci", "hdl/sub/c.vhd", "**/*.v"]:
+            expected = sorted(
+                p.relative_to(self.root).as_posix()
+                for p in self.root.glob(pattern) if p.is_file()
+            )
+            self.assertEqual(sorted(self.names([pattern])), expected,
+                             pattern)
+
+    def test_parent_reference(self):
+        self.assertEqual(self.names(["../other/*.vhd"],
+                                    self.root / "hdl"),
+                         ["hdl/../other/e.vhd"])
+
+    def test_dedup(self):
+        self.assertEqual(self.names(["hdl/a.vhd", "hdl/*.vhd"]),
+                         ["hdl/a.vhd"])
+
+    def test_single_scan(self):
+        self.names(["hdl/*.vhd"])
+        scans = self.index.scans
+        self.names(["hdl/*.v", "hdl/a.vhd"])
+        self.assertEqual(self.index.scans, scans)
+
+    def test_new_file_rescans(self):
+        self.names(["hdl/*.vhd"])
+        (self.root / "hdl" / "new.vhd").write_text("")
+        self.assertIn("hdl/new.vhd", self.names(["hdl/*.vhd"]))
+
+    def test_missing_dir(self):
+        self.assertEqual(self.names(["nope/*.vhd"]), [])
+
+    def test_shared(self):
+        self.assertIs(FileIndex.shared(), FileIndex.shared())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from xil_builder import gitinfo
+from xil_builder.gitinfo import snapshot
+
+GIT = ["git", "-c", "user.name=test", "-c", "user.email=test@localhost"]
+
+
+class TestGitSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = Path(self.tmp.name)
+        (self.repo / "hdl").mkdir()
+        (self.repo / "doc").mkdir()
+        self.src = self.repo / "hdl" / "top.vhd"
+        self.src.write_text("entity top is end entity;\n")
+        (self.repo / "doc" / "readme.txt").write_text("doc\n")
+        self._git("init", "-q", "-b", "feature/x")
+        self._git("add", ".")
+        self._git("commit", "-q", "-m", "init")
+        self._git("tag", "-a", "v1.0", "-m", "v1.0")
+        self.cache = self.repo / "git.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _git(self, *args):
+        subprocess.run(GIT + list(args), cwd=self.repo, check=True)
+
+    def test_snapshot(self):
+        s = snapshot([self.src], cwd=self.repo)
+        self.assertEqual(len(s.sha), 40)
+        self.assertEqual(s.describe, "v1.0")
+        self.assertEqual(s.branch, "feature/x")
+        self.assertFalse(s.dirty)
+        self.assertIn("set GIT_REV {v1.0}", s.tcl())
+        self.assertIn("set GIT_BRANCH {feature-x}", s.tcl())
+        self.assertIn(f"set GIT_SHA {{{s.sha[0:8]}}}", s.tcl())
+
+    def test_dirty_scoped_to_sources(self):
+        (self.repo / "doc" / "readme.txt").write_text("changed\n")
+        (self.repo / "hdl" / "notes.txt").write_text("untracked\n")
+        self.assertFalse(snapshot([self.src], cwd=self.repo).dirty)
+        self.src.write_text("entity top is end entity; -- changed\n")
+        s = snapshot([self.src], cwd=self.repo)
+        self.assertTrue(s.dirty)
+        self.assertEqual(s.revision, "v1.0-dirty")
+
+    def test_untracked_source_is_dirty(self):
+        new = self.repo / "hdl" / "sub" / "new.vhd"
+        new.parent.mkdir()
+        new.write_text("entity new is end entity;\n")
+        self.assertTrue(snapshot([self.src, new], cwd=self.repo).dirty)
+
+    def test_sources_outside_are_ignored(self):
+        with tempfile.NamedTemporaryFile(suffix=".vhd") as f:
+            s = snapshot([self.src, Path(f.name)], cwd=self.repo)
+        self.assertFalse(s.dirty)
+
+    def test_cache(self):
+        first = snapshot([self.src], self.cache, cwd=self.repo)
+        with mock.patch.object(gitinfo, "_dirty") as dirty:
+            again = snapshot([self.src], self.cache, cwd=self.repo)
+            dirty.assert_not_called()
+        self.assertEqual(again.to_dict(), first.to_dict())
+
+        # a modified source invalidates the cache
+        self.src.write_text("entity top is end entity; -- changed\n")
+        self.assertTrue(snapshot([self.src], self.cache, cwd=self.repo).dirty)
+
+        # so does a new commit
+        self._git("commit", "-q", "-am", "second")
+        s = snapshot([self.src], self.cache, cwd=self.repo)
+        self.assertFalse(s.dirty)
+        self.assertNotEqual(s.sha, first.sha)
+        self.assertTrue(s.describe.startswith("v1.0-1-g"))
+
+    def test_no_repository(self):
+        with tempfile.TemporaryDirectory() as d:
+            with self.assertRaises(RuntimeError):
+                snapshot(cwd=d)
+
+
+if __name__ == "__main__":
+    unittest.main()
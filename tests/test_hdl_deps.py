@@ -0,0 +1,109 @@
+import tempfile
+import unittest
+from pathlib import Path
+from xil_builder.hdl_deps import DependencyGraph, scan
+from xil_builder.library import Library, SrcFile, FType
+
+PKG = """
+library ieee;
+use ieee.std_logic_1164.all;
+package util_pkg is
+  constant WIDTH : integer := 8;
+end package;
+"""
+
+LEAF = """
+library ieee;
+use ieee.std_logic_1164.all;
+library util;
+use util.util_pkg.all;
+entity leaf is
+  port (clk : in std_logic);
+end entity;
+architecture rtl of leaf is
+begin
+end architecture;
+"""
+
+TOP = """
+library ieee;
+use ieee.std_logic_1164.all;
+entity top is
+end entity;
+architecture rtl of top is
+  -- u_old : old_block port map ();
+  component vlog_core is end component;
+begin
+  u_leaf : entity work.leaf port map (clk => '0');
+  u_core : vlog_core
+    port map ();
+end architecture;
+"""
+
+CORE = """
+// counter c0 (.clk(clk));
+module vlog_core (input clk);
+  wire a;
+  counter #(.W(8)) u_cnt (.clk(clk));
+endmodule
+"""
+
+COUNTER = """
+module counter #(parameter W = 4) (input clk);
+endmodule
+"""
+
+UNUSED = """
+entity old_block is
+end entity;
+"""
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        util = Library("util")
+        work = Library("work")
+        files = [
+            (work, "top.vhd", TOP, FType.VHDL),
+            (work, "old.vhd", UNUSED, FType.VHDL),
+            (work, "core.v", CORE, FType.VERILOG),
+            (work, "counter.v", COUNTER, FType.VERILOG),
+            (work, "leaf.vhd", LEAF, FType.VHDL),
+            (util, "util_pkg.vhd", PKG, FType.VHDL),
+        ]
+        for lib, name, text, t in files:
+            (root / name).write_text(text)
+            lib.add_file_obj(SrcFile(root / name, t))
+        self.graph = DependencyGraph([work, util])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def names(self, pairs):
+        return [src.get_path().name for _, src in pairs]
+
+    def test_scan(self):
+        provides, requires = scan(self.graph.files[0][1])
+        self.assertEqual(provides, {"top"})
+        self.assertIn(("work", "leaf"), requires)
+        self.assertIn((None, "vlog_core"), requires)
+        self.assertNotIn((None, "old_block"), requires)
+
+    def test_compile_order(self):
+        order = self.names(self.graph.compile_order("top"))
+        self.assertEqual(order[-1], "top.vhd")
+        self.assertLess(order.index("util_pkg.vhd"), order.index("leaf.vhd"))
+        self.assertLess(order.index("counter.v"), order.index("core.v"))
+        self.assertNotIn("old.vhd", order)
+
+    def test_unused(self):
+        self.assertEqual(self.names(self.graph.unused("top")), ["old.vhd"])
+
+    def test_unknown_top(self):
+        self.assertIsNone(self.graph.compile_order("missing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
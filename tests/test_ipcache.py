@@ -0,0 +1,72 @@
+import fcntl
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from xil_builder.ipcache import IpCache
+from xil_builder.progress import VivadoLogParser, dispatch
+
+PART = "xc7z010clg400-1"
+
+
+class TestIpCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.cache = IpCache(self.root, max_bytes=2048)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_entry(self, loc, name, size=1024, age=0):
+        entry = loc / name
+        entry.mkdir()
+        f = entry / "ip.dcp"
+        f.write_bytes(b"x" * size)
+        t = time.time() - age
+        os.utime(f, (t, t))
+        os.utime(entry, (t, t))
+        return entry
+
+    @patch.dict(os.environ, {"XILINX_VIVADO": "/tools/Vivado/2023.1"})
+    def test_location(self):
+        loc = self.cache.location(PART)
+        self.assertEqual(loc.name, f"2023.1_{PART}")
+        self.assertTrue(loc.is_dir())
+
+    def test_session_counts_misses(self):
+        with self.cache.session(PART) as loc:
+            self.add_entry(loc, "a1")
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_hits_from_log(self):
+        dispatch(VivadoLogParser(), [self.cache],
+                 "INFO: [IP_Flow 19-4838] Using cached IP results for "
+                 "'clk_wiz_0'\n")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_evict_lru(self):
+        loc = self.cache.location(PART)
+        old = self.add_entry(loc, "old", age=3600)
+        mid = self.add_entry(loc, "mid", age=60)
+        new = self.add_entry(loc, "new")
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertFalse(old.exists())
+        self.assertTrue(mid.exists())
+        self.assertTrue(new.exists())
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_no_eviction_while_in_use(self):
+        loc = self.cache.location(PART)
+        for i in range(3):
+            self.add_entry(loc, f"e{i}", age=i)
+        with self.cache.use_file.open("a") as uf:
+            fcntl.flock(uf, fcntl.LOCK_SH)
+            self.assertEqual(self.cache.evict(), 0)
+        self.assertEqual(self.cache.stats()["entries"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from subprocess import CompletedProcess
+from unittest.mock import MagicMock
+from xil_builder.pipeline import Pipeline, split_cpus, PREBUILD
+
+
+class TestSplitCpus(unittest.TestCase):
+    def test_disjoint(self):
+        vivado, peta = split_cpus()
+        available = os.sched_getaffinity(0)
+        if len(available) < 2:
+            self.skipTest("needs two CPUs")
+        self.assertFalse(vivado & peta)
+        self.assertEqual(vivado | peta, available)
+
+    def test_limit(self):
+        if len(os.sched_getaffinity(0)) < 2:
+            self.skipTest("needs two CPUs")
+        vivado, peta = split_cpus(1000)
+        self.assertTrue(peta)
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.events = []
+        self.vivado = MagicMock()
+        self.vivado.prj.outdir = root
+        self.vivado.prj.name = "demo"
+        self.vivado.build.side_effect = self.vivado_build
+        self.peta = MagicMock()
+        self.peta.linux_dir = root / "linux"
+        (self.peta.linux_dir / "project-spec" / "hw-description").mkdir(
+            parents=True)
+        self.peta._build.side_effect = self.prebuild
+        self.prebuild_running = threading.Event()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def vivado_build(self, syn, impl, log=None):
+        # vivado is still running while the prebuild starts
+        self.assertTrue(self.prebuild_running.wait(5))
+        self.events.append("vivado")
+        return self.code
+
+    def prebuild(self, component=None):
+        self.prebuild_running.set()
+        time.sleep(0.01)
+        self.events.append(component)
+        return CompletedProcess([], 0)
+
+    def test_overlap(self):
+        self.code = 0
+        self.assertEqual(Pipeline(self.vivado, self.peta).build(), 0)
+        self.assertEqual(sorted(self.events), sorted(PREBUILD + ["vivado"]))
+        self.peta.build.assert_called_once_with(
+            reconfigure=True, package=True, incremental=False)
+
+    def test_vivado_failure(self):
+        self.code = 2
+        self.assertEqual(Pipeline(self.vivado, self.peta).build(), 2)
+        self.peta.build.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import tempfile
+import unittest
+from pathlib import Path
+from xil_builder.preflight import PreflightError, check, preflight
+from xil_builder.project import Project
+from xil_builder.vivado import Vivado
+
+GOOD = """\
+project:
+  name: "checked"
+  part: "xc7z010clg400-1"
+  top: "top"
+  generics:
+    g_width: 8
+    g_name: "abc"
+  syn_args:
+    flatten_hierarchy: "rebuild"
+    max_dsp: -1
+  impl_args:
+    place_design:
+      directive: "Explore"
+    phys_opt_design:
+      is_enabled: True
+constraints:
+  - "./xdc/*.xdc"
+libraries:
+  prj:
+    - "./hdl/*.vhd"
+"""
+
+BAD = """\
+project:
+  name: "checked"
+  part: "xc7z010clg400-1"
+  top: "missing_top"
+  external_libs:
+    - "./nowhere"
+  generics:
+    g_ok: 1
+    "1bad": 2
+    g_list: [1, 2]
+  syn_args:
+    flaten_hierarchy: "rebuild"
+    max_dsp: [1]
+  impl_args:
+    place_desing:
+      directive: "Explore"
+    route_design:
+      directiv: "Explore"
+    phys_opt_design:
+      is_enabled: "yes"
+constraints:
+  - "./xdc/*.xdc"
+  - "./xdc/extra.xdc"
+libraries:
+  prj:
+    - "./hdl/*.vhd"
+  other:
+    - "./hdl/top.vhd"
+  empty:
+    - "./ip/*.vhd"
+"""
+
+
+class TestPreflight(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "src"
+        (self.root / "hdl").mkdir(parents=True)
+        (self.root / "xdc").mkdir()
+        (self.root / "hdl" / "top.vhd").write_text(
+            "entity top is\nend entity;\n")
+        (self.root / "xdc" / "pins.xdc").write_text("# pins\n")
+        self.outdir = Path(self.tmp.name) / "out"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def project(self, text):
+        yaml = self.root / "checked.yml"
+        yaml.write_text(text)
+        return Project(yaml, self.outdir, use_cache=False)
+
+    def test_valid_project(self):
+        prj = self.project(GOOD)
+        self.assertEqual(preflight(prj), [])
+        check(prj)
+
+    def test_all_errors_are_reported(self):
+        prj = self.project(BAD)
+        with self.assertRaises(PreflightError) as cm:
+            check(prj)
+        errors = cm.exception.errors
+        expected = [
+            "constraints: ./xdc/extra.xdc does not exist",
+            "libraries.empty: ./ip/*.vhd matches no file",
+            "external_libs: ./nowhere is not a directory",
+            "is in libraries prj, other",
+            "top missing_top is not defined in any HDL file",
+            "syn_args: unknown argument flaten_hierarchy, "
+            "did you mean flatten_hierarchy?",
+            "syn_args.max_dsp must be a bool, int or string, not list",
+            "impl_args: unknown step place_desing, "
+            "did you mean place_design?",
+            "impl_args.route_design: unknown setting directiv, "
+            "did you mean directive?",
+            "impl_args.phys_opt_design.is_enabled must be a bool",
+            "generics: 1bad is not a valid generic name",
+            "generics.g_list must be a bool, number or string, not list",
+        ]
+        self.assertEqual(len(errors), len(expected), errors)
+        for want, got in zip(expected, errors):
+            self.assertIn(want, got)
+        self.assertIn(f"{len(expected)} problems", str(cm.exception))
+
+    def test_removed_file(self):
+        prj = self.project(GOOD)
+        (self.root / "hdl" / "top.vhd").unlink()
+        errors = preflight(prj)
+        self.assertIn(f"{self.root / 'hdl' / 'top.vhd'} does not exist",
+                      errors)
+
+    def test_verilog_top_and_bd_wrapper(self):
+        (self.root / "hdl" / "core.v").write_text("module Core(); endmodule\n")
+        prj = self.project(GOOD.replace('top: "top"', 'top: "Core"')
+                           .replace("*.vhd", "*.v"))
+        self.assertEqual(preflight(prj), [])
+        (self.root / "bd").mkdir()
+        (self.root / "bd" / "system.tcl").write_text("\n")
+        prj = self.project(GOOD.replace('top: "top"',
+                                        'top: "system_wrapper"')
+                           + 'bd_files:\n  - "./bd/*.tcl"\n')
+        self.assertEqual(preflight(prj), [])
+
+    def test_vivado_build(self):
+        prj = self.project(BAD)
+        with self.assertRaises(PreflightError):
+            Vivado(prj, preflight=True)
+        self.assertFalse((self.outdir / "checked.tcl").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
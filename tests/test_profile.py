@@ -0,0 +1,119 @@
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from xil_builder.profile import BuildProfile
+from xil_builder.progress import VivadoLogParser, dispatch
+
+
+class TestBuildProfile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "deploy" / "demo_profile.json"
+        self.profile = BuildProfile(self.path, interval=0.01)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_python_stage(self):
+        with self.profile.stage("tcl_generation"):
+            time.sleep(0.05)
+        stage = self.profile.stages[0]
+        self.assertEqual(stage["name"], "tcl_generation")
+        self.assertEqual(stage["source"], "python")
+        self.assertGreaterEqual(stage["duration"], 0.05)
+        self.assertGreater(stage["peak_rss_kb"], 0)
+
+    def test_tcl_markers(self):
+        parser = VivadoLogParser()
+        lines = [
+            "XB_PROFILE begin synth 1000000 100 90\n",
+            "INFO: something in between\n",
+            "XB_PROFILE end synth 1012500 400 120\n",
+            "XB_PROFILE begin place 1012500 400 120\n",
+            "XB_PROFILE end place 1020000 400 300\n",
+        ]
+        for line in lines:
+            dispatch(parser, [self.profile], line)
+        synth, place = self.profile.stages
+        self.assertEqual(synth["source"], "tcl")
+        self.assertAlmostEqual(synth["duration"], 12.5)
+        self.assertEqual(synth["peak_rss_kb"], 400)
+        # no new high water mark, best estimate is the larger sample
+        self.assertEqual(place["peak_rss_kb"], 300)
+        self.assertAlmostEqual(self.profile.total("tcl"), 20.0)
+
+    def test_unmatched_end(self):
+        dispatch(VivadoLogParser(), [self.profile],
+                 "XB_PROFILE end route 1000 1 1\n")
+        self.assertEqual(self.profile.stages, [])
+
+    def test_tcl_stage_includes_process_tree(self):
+        parser = VivadoLogParser()
+        with self.profile.stage("vivado"):
+            dispatch(parser, [self.profile],
+                     "XB_PROFILE begin synth 1000000 100 90\n")
+            time.sleep(0.05)
+            dispatch(parser, [self.profile],
+                     "XB_PROFILE end synth 1001000 100 90\n")
+        synth = self.profile.stages[0]
+        self.assertEqual(synth["name"], "synth")
+        # the runs started by Vivado are children, the markers miss them
+        self.assertGreater(synth["peak_rss_kb"], 100)
+
+    def write_log(self, run, text):
+        log = Path(self.tmp.name) / "demo.runs" / run / "runme.log"
+        log.parent.mkdir(parents=True)
+        log.write_text(text)
+        return log
+
+    def test_runs(self):
+        self.write_log("synth_1", (
+            "synth_design: Time (s): cpu = 00:01:10 ; elapsed = 00:01:05 . "
+            "Memory (MB): peak = 2048.500 ; gain = 900.000\n"
+        ))
+        self.write_log("impl_1", (
+            "INFO: [Common 17-83] Releasing license\n"
+            "link_design: Time (s): cpu = 00:00:09 ; elapsed = 00:00:10 . "
+            "Memory (MB): peak = 1500.000 ; gain = 0.000\n"
+            "opt_design: Time (s): cpu = 00:00:20 ; elapsed = 00:00:15 . "
+            "Memory (MB): peak = 1800.000 ; gain = 12.000\n"
+            "place_design: Time (s): cpu = 00:02:00 ; elapsed = 01:00:30 . "
+            "Memory (MB): peak = 3000.000 ; gain = 500.000\n"
+        ))
+        dispatch(VivadoLogParser(), [self.profile],
+                 "XB_PROFILE begin impl 1000000 100 90\n")
+        dispatch(VivadoLogParser(), [self.profile],
+                 "XB_PROFILE end impl 1100000 100 90\n")
+        self.profile.add_runs(Path(self.tmp.name) / "demo.runs")
+        runs = [s for s in self.profile.stages if s["source"] == "run"]
+        self.assertEqual([s["name"] for s in runs], [
+            "synth.synth_design", "impl.opt_design", "impl.place_design"])
+        synth, opt, place = runs
+        self.assertEqual(synth["duration"], 65)
+        self.assertEqual(synth["peak_rss_kb"], 2048 * 1024 + 512)
+        self.assertEqual(opt["start"], 1000)
+        self.assertEqual(place["start"], 1015)
+        self.assertEqual(place["duration"], 3630)
+        self.assertEqual(place["peak_rss_kb"], 3000 * 1024)
+
+    def test_runs_of_earlier_builds_are_skipped(self):
+        self.write_log("impl_1", (
+            "opt_design: Time (s): cpu = 00:00:20 ; elapsed = 00:00:15 . "
+            "Memory (MB): peak = 1800.000 ; gain = 12.000\n"
+        ))
+        self.profile.add_runs(Path(self.tmp.name) / "demo.runs",
+                              since=time.time() + 60)
+        self.assertEqual(self.profile.stages, [])
+
+    def test_write(self):
+        with self.profile.stage("vivado"):
+            pass
+        self.profile.write()
+        data = json.loads(self.path.read_text())
+        self.assertEqual([s["name"] for s in data["stages"]], ["vivado"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from xil_builder.progress import (
+    stream, VivadoLogParser, PetalinuxLogParser, ProgressEvent,
+    ConsoleReporter
+)
+
+
+class TestVivadoLogParser(unittest.TestCase):
+    def setUp(self):
+        self.parser = VivadoLogParser()
+
+    def kinds(self, line):
+        return [(e.kind, e.stage) for e in self.parser.parse(line)]
+
+    def test_commands(self):
+        self.assertEqual(self.kinds("Command: place_design -directive X\n"),
+                         [("stage_start", "place_design")])
+        self.assertEqual(self.kinds("route_design completed successfully\n"),
+                         [("stage_end", "route_design")])
+        self.assertEqual(self.kinds("Command: report_timing_summary\n"), [])
+
+    def test_runs(self):
+        self.assertEqual(
+            self.kinds("[Tue Oct 10 10:00:00 2023] Launched synth_1...\n"),
+            [("stage_start", "synth_1")])
+        self.assertEqual(
+            self.kinds("[Tue Oct 10 10:30:00 2023] impl_1 finished\n"),
+            [("stage_end", "impl_1")])
+
+    def test_messages(self):
+        self.assertEqual(self.kinds("CRITICAL WARNING: [Timing 38-282]\n"),
+                         [("critical_warning", None)])
+        self.assertEqual(self.kinds("ERROR: [Synth 8-439] module not found"),
+                         [("error", None)])
+        self.assertEqual(self.kinds("WARNING: [Synth 8-3331]\n"), [])
+
+    def test_caught_errors(self):
+        self.assertEqual(self.kinds("XB_CAUGHT begin\n"), [])
+        self.assertEqual(self.kinds("ERROR: [filemgmt 56-12] no such file"),
+                         [])
+        self.assertEqual(self.kinds("XB_CAUGHT end\n"), [])
+        self.assertEqual(self.kinds("ERROR: [xil_builder] cannot read a"),
+                         [("error", None)])
+
+
+class TestPetalinuxLogParser(unittest.TestCase):
+    def test_task(self):
+        evs = PetalinuxLogParser().parse(
+            "NOTE: Running task 120 of 4000 (virtual:native:...)\n")
+        self.assertEqual(evs[0].kind, "task")
+        self.assertEqual((evs[0].current, evs[0].total), (120, 4000))
+
+    def test_info(self):
+        evs = PetalinuxLogParser().parse("[INFO] Building project\n")
+        self.assertEqual((evs[0].kind, evs[0].stage),
+                         ("stage_start", "Building project"))
+
+
+class TestStream(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = Path(self.tmp.name) / "out.log"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def script(self, body):
+        return [sys.executable, "-c", body]
+
+    def test_events(self):
+        events = []
+        code = stream(
+            self.script("print('Command: synth_design');"
+                        "print('synth_design completed successfully')"),
+            VivadoLogParser(), [events.append], log=self.log)
+        self.assertEqual(code.returncode, 0)
+        self.assertEqual([e.kind for e in events],
+                         ["stage_start", "stage_end"])
+        self.assertIn("Command: synth_design", self.log.read_text())
+
+    def test_fail_fast(self):
+        code = stream(
+            self.script("import time; print('ERROR: boom', flush=True);"
+                        "time.sleep(30)"),
+            VivadoLogParser(), log=self.log, fail_fast=True)
+        self.assertNotEqual(code.returncode, 0)
+
+    def test_fail_fast_ignores_caught_errors(self):
+        code = stream(
+            self.script("print('XB_CAUGHT begin');"
+                        "print('ERROR: [filemgmt 56-12] no such file');"
+                        "print('XB_CAUGHT end')"),
+            VivadoLogParser(), log=self.log, fail_fast=True)
+        self.assertEqual(code.returncode, 0)
+
+    def test_returncode(self):
+        code = stream(self.script("import sys; sys.exit(3)"),
+                      VivadoLogParser(), log=self.log)
+        self.assertEqual(code.returncode, 3)
+
+
+class TestConsoleReporter(unittest.TestCase):
+    def test_eta(self):
+        out = tempfile.TemporaryFile("w+")
+        rep = ConsoleReporter(out)
+        first = ProgressEvent("task", "bitbake", "", 10, 110)
+        second = ProgressEvent("task", "bitbake", "", 20, 110)
+        second.time = first.time + 60
+        rep(first)
+        rep(second)
+        out.seek(0)
+        self.assertIn("task 20/110, ETA 9.0 min", out.read())
+        out.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
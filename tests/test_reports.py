@@ -0,0 +1,248 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from xil_builder.project import Project
+from xil_builder.reports import (
+    parse_timing, parse_utilization, parse_drc, parse_power,
+    parse_route_status, parse_runtimes, parse_report, collect, ResultsDB,
+)
+
+TIMING = """\
+------------------------------------------------------------------------
+| Design Timing Summary
+| ---------------------
+------------------------------------------------------------------------
+
+    WNS(ns)      TNS(ns)  TNS Failing Endpoints  TNS Total Endpoints      \
+WHS(ns)      THS(ns)  THS Failing Endpoints  THS Total Endpoints
+    -------      -------  ---------------------  -------------------      \
+-------      -------  ---------------------  -------------------
+     -0.125       -1.500                     12                 4711      \
+  0.032        0.000                      0                 4711
+
+
+All user specified timing constraints are met.
+"""
+
+UTIL_FLAT = """\
+1. Slice Logic
+--------------
+
++----------------------------+------+-------+-----------+-------+
+|          Site Type         | Used | Fixed | Available | Util% |
++----------------------------+------+-------+-----------+-------+
+| Slice LUTs*                | 1234 |     0 |     17600 |  7.01 |
+|   LUT as Logic             | 1200 |     0 |     17600 |  6.82 |
+| Slice Registers            | 2345 |     0 |     35200 |  6.66 |
++----------------------------+------+-------+-----------+-------+
+
+3. Memory
+---------
+
++-------------------+------+-------+-----------+-------+
+|     Site Type     | Used | Fixed | Available | Util% |
++-------------------+------+-------+-----------+-------+
+| Block RAM Tile    |  4.5 |     0 |        60 |  7.50 |
++-------------------+------+-------+-----------+-------+
+
+4. DSP
+------
+
++-----------+------+-------+-----------+-------+
+| Site Type | Used | Fixed | Available | Util% |
++-----------+------+-------+-----------+-------+
+| DSPs      |    3 |     0 |        80 |  3.75 |
++-----------+------+-------+-----------+-------+
+"""
+
+UTIL_HIER_HEAD = """\
+1. Utilization by Hierarchy
+---------------------------
+
++----------+--------+------------+------------+---------+------+------+\
+--------+--------+------------+
+| Instance | Module | Total LUTs | Logic LUTs | LUTRAMs | SRLs |  FFs |\
+ RAMB36 | RAMB18 | DSP Blocks |
++----------+--------+------------+------------+---------+------+------+\
+--------+--------+------------+
+| top      |  (top) |       1234 |       1200 |      30 |    4 | 2345 |\
+      4 |      1 |          3 |
+"""
+
+DRC = """\
+1. REPORT SUMMARY
+-----------------
+            Checks found: 3
++----------+------------------+----------------------------+------------+
+| Rule     | Severity         | Description                | Violations |
++----------+------------------+----------------------------+------------+
+| CFGBVS-1 | Warning          | Missing CFGBVS             | 1          |
+| DPIP-1   | Warning          | Input pipelining           | 4          |
+| NSTD-1   | Critical Warning | Unspecified I/O Standard   | 2          |
++----------+------------------+----------------------------+------------+
+
+2. REPORT DETAILS
+-----------------
+| NSTD-1   | Error            | not part of the summary    | 99         |
+"""
+
+POWER = """\
++--------------------------+--------------+
+| Total On-Chip Power (W)  | 0.245        |
+| Dynamic (W)              | 0.144        |
++--------------------------+--------------+
+"""
+
+ROUTE = """\
+Design Route Status
+                                               :      # nets :
+   ------------------------------------------- : ----------- :
+   # of logical nets.......................... :        3012 :
+   #   of fully routed nets................... :        2037 :
+   # of nets with routing errors.............. :           2 :
+   # of unrouted nets......................... :           5 :
+"""
+
+LOG = """\
+XB_PROFILE begin synth 1000 0 0
+synth_design: Time (s): cpu = 00:00:20 ; elapsed = 00:00:25 . Memory (MB)
+XB_PROFILE end synth 31500 0 0
+XB_PROFILE begin impl 31500 0 0
+XB_PROFILE end impl 91500 0 0
+"""
+
+
+def lines(text):
+    return iter(text.splitlines(keepends=True))
+
+
+class TestReportParsers(unittest.TestCase):
+    def test_timing(self):
+        self.assertEqual(parse_timing(lines(TIMING)),
+                         {"wns": -0.125, "tns": -1.5, "whs": 0.032,
+                          "ths": 0})
+
+    def test_utilization_flat(self):
+        self.assertEqual(parse_utilization(lines(UTIL_FLAT)),
+                         {"luts": 1234, "ffs": 2345, "brams": 4.5,
+                          "dsps": 3})
+
+    def test_utilization_hierarchical_streams(self):
+        def report():
+            yield from lines(UTIL_HIER_HEAD)
+            while True:
+                # the rest of the report must never be read
+                yield "| u_child | child | 1 | 1 | 0 | 0 | 1 | 0 | 0 | 0 |\n"
+
+        self.assertEqual(parse_utilization(report()),
+                         {"luts": 1234, "ffs": 2345, "brams": 4.5,
+                          "dsps": 3})
+
+    def test_drc(self):
+        self.assertEqual(parse_drc(lines(DRC)),
+                         {"drc_errors": 0, "drc_critical": 2,
+                          "drc_warnings": 5})
+
+    def test_power(self):
+        self.assertEqual(parse_power(lines(POWER)), {"power": 0.245})
+
+    def test_route_status(self):
+        self.assertEqual(parse_route_status(lines(ROUTE)),
+                         {"routing_errors": 2, "unrouted_nets": 5})
+
+    def test_runtimes(self):
+        self.assertEqual(parse_runtimes(lines(LOG)),
+                         {"synth": 30.5, "synth_design": 25, "impl": 60})
+
+    def test_missing_report(self):
+        self.assertEqual(parse_report(Path("missing.rpt"), parse_timing), {})
+
+
+class TestResults(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.outdir = Path(self.tmp.name)
+        self.db = ResultsDB(self.outdir / "results.db")
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_collect_non_project(self):
+        prj = Project(Path("tests/files/demo.yml"), self.outdir)
+        reports = {"tim": TIMING, "util": UTIL_HIER_HEAD, "power": POWER,
+                   "status": ROUTE}
+        for name, text in reports.items():
+            (self.outdir / f"demo_post_route_{name}.rpt").write_text(text)
+        (self.outdir / "demo_post_opt_drc.rpt").write_text(DRC)
+        log = self.outdir / "vivado.log"
+        log.write_text(LOG)
+        metrics, runtimes = collect(prj, log)
+        self.assertEqual(metrics["wns"], -0.125)
+        self.assertEqual(metrics["luts"], 1234)
+        self.assertEqual(metrics["drc_warnings"], 5)
+        self.assertEqual(metrics["power"], 0.245)
+        self.assertEqual(runtimes["impl"], 60)
+
+        build = self.db.record_project(prj, log, git_sha="abcd1234")
+        self.assertEqual(self.db.runtimes(build)["synth"], 30.5)
+        self.assertEqual(self.db.builds("demo")[0]["git_sha"], "abcd1234")
+
+    def test_collect_project_runs(self):
+        prj = Project(Path("tests/files/demo.yml"), self.outdir)
+        impl = self.outdir / "demo.runs" / "impl_1"
+        impl.mkdir(parents=True)
+        (impl / "demo_top_timing_summary_routed.rpt").write_text(TIMING)
+        (impl / "demo_top_utilization_placed.rpt").write_text(UTIL_FLAT)
+        (impl / "runme.log").write_text(
+            "route_design: Time (s): cpu = 00:01:00 ; "
+            "elapsed = 00:01:05 . Memory (MB)\n")
+        metrics, runtimes = collect(prj)
+        self.assertEqual(metrics["whs"], 0.032)
+        self.assertEqual(metrics["brams"], 4.5)
+        self.assertEqual(runtimes, {"route_design": 65})
+
+    def test_collect_skips_stale_runs(self):
+        prj = Project(Path("tests/files/demo.yml"), self.outdir)
+        for run, step in [("synth_1", "synth_design"),
+                          ("impl_1", "route_design")]:
+            (self.outdir / "demo.runs" / run).mkdir(parents=True)
+            (self.outdir / "demo.runs" / run / "runme.log").write_text(
+                f"{step}: Time (s): cpu = 00:01:00 ; "
+                "elapsed = 00:01:05 . Memory (MB)\n")
+        # synth_1 was not reset by the build and kept its old log
+        synth = self.outdir / "demo.runs" / "synth_1" / "runme.log"
+        os.utime(synth, (1000, 1000))
+        _, runtimes = collect(prj, since=2000)
+        self.assertEqual(runtimes, {"route_design": 65})
+        build = self.db.record_project(prj, since=2000)
+        self.assertNotIn("synth_design", self.db.runtimes(build))
+
+    def test_trend(self):
+        for i, wns in enumerate([0.5, 0.2, -0.1]):
+            self.db.record("demo", {"wns": wns, "luts": 100 + i},
+                           {"impl": 60 + i}, created=1000 + i)
+        self.db.record("demo", {"wns": -5}, status=3, created=2000)
+        self.db.record("other", {"wns": 1.0}, created=1500)
+        self.assertEqual(self.db.trend("demo", "wns"),
+                         [(1000, 0.5), (1001, 0.2), (1002, -0.1)])
+        self.assertEqual(self.db.trend("demo", "luts", limit=2),
+                         [(1001, 101), (1002, 102)])
+        self.assertEqual(self.db.trend("demo", "wns", since=1002),
+                         [(1002, -0.1)])
+        self.assertEqual(self.db.runtime_trend("demo", "impl")[-1],
+                         (1002, 62))
+        self.assertEqual(len(self.db.builds("demo")), 4)
+        with self.assertRaises(ValueError):
+            self.db.trend("demo", "wns; DROP TABLE builds")
+
+    def test_persistent(self):
+        self.db.record("demo", {"wns": 0.1}, created=1)
+        self.db.close()
+        self.db = ResultsDB(self.outdir / "results.db")
+        self.assertEqual(self.db.trend("demo", "wns"), [(1, 0.1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from xil_builder.project import Project
+from xil_builder.resources import (
+    GiB, cgroup_cpus, cgroup_memory, available_memory, estimate_memory,
+    allocate, ResourceLedger,
+)
+from xil_builder.vivado import Vivado
+
+
+class TestResources(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cgroup_v2(self):
+        (self.root / "cpu.max").write_text("250000 100000\n")
+        (self.root / "memory.max").write_text(f"{16 * GiB}\n")
+        (self.root / "memory.current").write_text(f"{4 * GiB}\n")
+        self.assertEqual(cgroup_cpus(self.root), 3)
+        self.assertEqual(cgroup_memory(self.root), 12 * GiB)
+        (self.root / "cpu.max").write_text("max 100000\n")
+        (self.root / "memory.max").write_text("max\n")
+        self.assertIsNone(cgroup_cpus(self.root))
+        self.assertIsNone(cgroup_memory(self.root))
+
+    def test_cgroup_v1(self):
+        (self.root / "cpu").mkdir()
+        (self.root / "memory").mkdir()
+        (self.root / "cpu" / "cpu.cfs_quota_us").write_text("400000\n")
+        (self.root / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+        (self.root / "memory" / "memory.limit_in_bytes").write_text(
+            f"{8 * GiB}\n")
+        (self.root / "memory" / "memory.usage_in_bytes").write_text(
+            f"{2 * GiB}\n")
+        self.assertEqual(cgroup_cpus(self.root), 4)
+        self.assertEqual(cgroup_memory(self.root), 6 * GiB)
+        (self.root / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+        (self.root / "memory" / "memory.limit_in_bytes").write_text(
+            "9223372036854771712\n")
+        self.assertIsNone(cgroup_cpus(self.root))
+        self.assertIsNone(cgroup_memory(self.root))
+
+    def test_available_memory(self):
+        meminfo = self.root / "meminfo"
+        meminfo.write_text("MemTotal: 33554432 kB\n"
+                           "MemAvailable: 20971520 kB\n")
+        self.assertEqual(available_memory(self.root, meminfo), 20 * GiB)
+        (self.root / "memory.max").write_text(f"{16 * GiB}\n")
+        (self.root / "memory.current").write_text(f"{6 * GiB}\n")
+        self.assertEqual(available_memory(self.root, meminfo), 10 * GiB)
+
+    def test_estimate_memory(self):
+        self.assertEqual(estimate_memory("xc7z010clg400-1"), 2 * GiB)
+        self.assertEqual(estimate_memory("xc7k325tffg900-2"), 8 * GiB)
+        self.assertEqual(estimate_memory("xczu3eg-sbva484-1-e"), 6 * GiB)
+        self.assertEqual(estimate_memory("xczu19eg-ffvc1760-2-i"), 16 * GiB)
+        self.assertEqual(estimate_memory("xcvu9p-flga2104-2L-e"), 32 * GiB)
+        self.assertEqual(estimate_memory("unknown"), 8 * GiB)
+
+    def test_allocate(self):
+        # synth_1 and impl_1 follow each other, each gets all threads
+        a = allocate("xc7z020clg400-1", cpus=8, memory=64 * GiB)
+        self.assertEqual((a.jobs, a.threads), (1, 8))
+        a = allocate("xc7z020clg400-1", cpus=64, memory=256 * GiB)
+        self.assertEqual((a.jobs, a.threads), (1, 8))
+        # parallel runs get the CPUs left over
+        a = allocate("xc7z010clg400-1", cpus=16, memory=64 * GiB, runs=4)
+        self.assertEqual((a.jobs, a.threads), (2, 8))
+        a = allocate("xc7z010clg400-1", cpus=64, memory=4 * GiB, runs=4)
+        self.assertEqual((a.jobs, a.threads), (2, 8))
+        # memory bound
+        a = allocate("xczu19eg-ffvc1760-2-i", cpus=64, memory=40 * GiB,
+                     runs=8)
+        self.assertEqual((a.jobs, a.threads), (2, 8))
+        # never less than one run
+        a = allocate("xcvu9p-flga2104-2L-e", cpus=2, memory=1 * GiB)
+        self.assertEqual((a.jobs, a.threads), (1, 2))
+        self.assertEqual(a.tcl(), "set JOBS 1\nset THREADS 2\n")
+
+
+class TestResourceLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "ledger"
+        self.ledger = ResourceLedger(self.path, cpus=12, memory=12 * GiB)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_admission(self):
+        part = "xc7k325tffg900-2"  # 8 GiB
+        with self.ledger.admit(part) as first:
+            self.assertEqual(first.threads, 8)
+            self.assertEqual(len(self.ledger.reserved()), 1)
+            with self.assertRaises(TimeoutError):
+                with self.ledger.admit(part, timeout=0.05, poll=0.01):
+                    pass
+            # a small run fits next to it
+            with self.ledger.admit("xc7z010clg400-1", runs=2) as second:
+                self.assertEqual(second.threads, 4)
+                self.assertEqual(second.jobs, 1)
+                reserved = list(self.ledger.reserved().values())
+                self.assertEqual(reserved[1]["cpus"], 4)
+                self.assertEqual(reserved[1]["memory"], 2 * GiB)
+        self.assertEqual(self.ledger.reserved(), {})
+
+    def test_builds_share_a_host(self):
+        part = "xc7z020clg400-1"  # 4 GiB
+        ledger = ResourceLedger(self.path, cpus=64, memory=256 * GiB)
+        with ledger.admit(part) as first:
+            self.assertEqual((first.jobs, first.threads), (1, 8))
+            entry = list(ledger.reserved().values())[0]
+            self.assertEqual(entry["cpus"], 8)
+            self.assertEqual(entry["memory"], 4 * GiB)
+            with ledger.admit(part, timeout=0.05, poll=0.01) as second:
+                self.assertEqual(second.threads, 8)
+
+    def test_parallel_runs_are_reserved(self):
+        part = "xc7z010clg400-1"  # 2 GiB
+        ledger = ResourceLedger(self.path, cpus=32, memory=64 * GiB)
+        with ledger.admit(part, runs=3) as first:
+            self.assertEqual((first.jobs, first.threads), (3, 8))
+            entry = list(ledger.reserved().values())[0]
+            self.assertEqual(entry["cpus"], 24)
+            self.assertEqual(entry["memory"], 6 * GiB)
+            with ledger.admit(part, runs=3) as second:
+                self.assertEqual((second.jobs, second.threads), (1, 8))
+
+    def test_waits_for_release(self):
+        part = "xc7k325tffg900-2"
+        admitted = threading.Event()
+        with self.ledger.admit(part):
+            def second():
+                with self.ledger.admit(part, timeout=10, poll=0.01):
+                    admitted.set()
+
+            t = threading.Thread(target=second)
+            t.start()
+            self.assertFalse(admitted.wait(0.1))
+        t.join()
+        self.assertTrue(admitted.is_set())
+
+    def test_first_run_is_always_admitted(self):
+        small = ResourceLedger(self.path, cpus=1, memory=1 * GiB)
+        with small.admit("xcvu9p-flga2104-2L-e") as a:
+            self.assertEqual(a.jobs, 1)
+
+    def test_dead_reservations_are_dropped(self):
+        self.path.write_text(json.dumps({"x": {
+            "pid": 2**22 + 1, "part": "xc7k325t", "cpus": 12,
+            "memory": 12 * GiB, "started": 0}}))
+        self.assertEqual(self.ledger.reserved(), {})
+
+
+class TestVivadoResources(unittest.TestCase):
+    def test_flow_uses_allocation(self):
+        with tempfile.TemporaryDirectory() as d:
+            prj = Project(Path("tests/files/demo.yml"), Path(d))
+            viv = Vivado(prj)
+            tcl = viv.build_tcl.read_text()
+            self.assertIn("set JOBS ", tcl)
+            self.assertIn(f"source {viv.resources_tcl.as_posix()}", tcl)
+            self.assertIn("set_param general.maxThreads $THREADS", tcl)
+            self.assertIn("launch_runs synth_1 -jobs $JOBS", tcl)
+            self.assertNotIn("-jobs 24", tcl)
+            ledger = ResourceLedger(Path(d) / "ledger", cpus=3,
+                                    memory=64 * GiB)
+            viv.resources = ledger
+            with viv._admitted():
+                self.assertEqual(viv.resources_tcl.read_text(),
+                                 "set JOBS 1\nset THREADS 3\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from xil_builder.progress import ProgressEvent
+from xil_builder.sampler import (
+    COLUMNS, ResourceSampler, process_tree, process_usage, tree_rss,
+)
+
+
+class TestSampler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "resources.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_process_tree(self):
+        child = subprocess.Popen([sys.executable, "-c",
+                                  "import time; time.sleep(5)"])
+        try:
+            tree = process_tree(os.getpid())
+            self.assertEqual(tree[0], os.getpid())
+            self.assertIn(child.pid, tree)
+            self.assertGreater(tree_rss(os.getpid()), 0)
+            ticks, rss, read, write = process_usage(child.pid)
+            self.assertGreater(rss, 0)
+        finally:
+            child.kill()
+            child.wait()
+        self.assertIsNone(process_usage(2**22 + 1))
+
+    def test_stage_samples_children(self):
+        sampler = ResourceSampler(self.path, interval=0.05)
+        with sampler.stage("busy"):
+            subprocess.run([sys.executable, "-c",
+                            "import time\n"
+                            "end = time.time() + 0.5\n"
+                            "while time.time() < end: pass\n"])
+        data = json.loads(self.path.read_text())
+        self.assertEqual(data["columns"], COLUMNS)
+        self.assertGreater(len(data["samples"]), 3)
+        self.assertEqual([s["name"] for s in data["stages"]], ["busy"])
+        busy = data["summary"]["busy"]
+        self.assertGreater(busy["cpu_peak"], 0.3)
+        self.assertGreaterEqual(busy["procs_peak"], 2)
+        self.assertIn("total", data["summary"])
+
+    def test_profile_events(self):
+        sampler = ResourceSampler(self.path, interval=0.05)
+        with sampler.stage("vivado"):
+            sampler(ProgressEvent("profile", stage="synth",
+                                  message="XB_PROFILE begin synth 0 0 0"))
+            sampler(ProgressEvent("log", message="ignored"))
+            sampler(ProgressEvent("profile", stage="synth",
+                                  message="XB_PROFILE end synth 9 0 0"))
+            self.assertFalse(self.path.exists())
+        summary = json.loads(self.path.read_text())["summary"]
+        self.assertEqual(set(summary), {"vivado", "synth", "total"})
+
+    def test_summary(self):
+        sampler = ResourceSampler(self.path)
+        sampler.samples = [
+            [0.0, 0.0, 100, 0, 0, 1],
+            [1.0, 2.0, 300, 1000, 10, 3],
+            [2.0, 4.0, 200, 3000, 30, 2],
+            [4.0, 1.0, 100, 0, 50, 1],
+        ]
+        sampler.stages = [{"name": "a", "start": 0.5, "end": 2.5}]
+        summary = sampler.summary()
+        a = summary["a"]
+        self.assertEqual(a["cpu_peak"], 4.0)
+        self.assertEqual(a["cpu_avg"], 3.0)
+        self.assertEqual(a["rss_peak"], 300)
+        self.assertEqual(a["rss_avg"], 250)
+        self.assertEqual(a["read_bytes"], 3000)
+        self.assertEqual(a["write_bytes"], 30)
+        self.assertEqual(a["procs_peak"], 3)
+        total = summary["total"]
+        self.assertEqual(total["duration"], 4.0)
+        self.assertEqual(total["write_bytes"], 10 + 30 + 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
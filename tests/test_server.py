@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from xil_builder.server import VivadoServer, tree_rss
+
+FAKE_VIVADO = (Path("tests/files/bin") / "vivado").resolve()
+
+
+class TestVivadoServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.server = VivadoServer(max_jobs=2, workdir=self.root,
+                                   cmd=[str(FAKE_VIVADO), "-mode", "tcl"])
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def job(self, name, body):
+        tcl = self.root / name
+        tcl.write_text(body)
+        return tcl
+
+    def test_exit_codes(self):
+        ok = self.job("ok.tcl", 'puts "hello"\n')
+        fail = self.job("fail.tcl", "puts step\nexit 3\n")
+        self.assertEqual(self.server.run(ok), 0)
+        pid = self.server.proc.pid
+        self.assertEqual(self.server.run(fail), 3)
+        # same process served both jobs
+        self.assertEqual(self.server.proc.pid, pid)
+
+    def test_log(self):
+        ok = self.job("ok.tcl", 'puts "hello"\n')
+        log = self.root / "job.log"
+        self.server.run(ok, log=log)
+        self.assertIn("hello", log.read_text())
+
+    def test_recycle_after_max_jobs(self):
+        ok = self.job("ok.tcl", "exit 0\n")
+        self.server.run(ok)
+        pid = self.server.proc.pid
+        self.server.run(ok)
+        self.server.run(ok)
+        self.assertNotEqual(self.server.proc.pid, pid)
+        self.assertEqual(self.server.restarts, 1)
+
+    def test_recycle_on_memory(self):
+        ok = self.job("ok.tcl", "exit 0\n")
+        self.server.run(ok)
+        pid = self.server.proc.pid
+        with patch("xil_builder.server.tree_rss",
+                   return_value=self.server.max_rss + 1):
+            self.server.run(ok)
+        self.assertNotEqual(self.server.proc.pid, pid)
+
+    def test_tree_rss(self):
+        self.assertGreater(tree_rss(os.getpid()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
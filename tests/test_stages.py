@@ -0,0 +1,159 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from xil_builder.project import Project
+from xil_builder.stages import StageTracker
+from xil_builder.vivado import NonProjectVivado
+
+
+class TestStageTracker(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "files"
+        shutil.copytree("tests/files", self.root,
+                        ignore=shutil.ignore_patterns(".work"))
+        self.outdir = Path(self.tmp.name) / "prj"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def tracker(self):
+        prj = Project(self.root / "demo.yml", self.outdir)
+        return StageTracker(prj)
+
+    def test_first_build(self):
+        t = self.tracker()
+        self.assertTrue(t.reset_synth())
+        self.assertTrue(t.reset_impl())
+        self.assertFalse(t.reuse_bitstream())
+
+    def test_nothing_changed(self):
+        self.tracker().commit(True, True)
+        t = self.tracker()
+        self.assertFalse(t.reset_synth())
+        self.assertFalse(t.reset_impl())
+
+    def test_reuse_bitstream(self):
+        self.tracker().commit(True, True)
+        deploy = self.outdir / "deploy"
+        deploy.mkdir()
+        (deploy / "latest-demo.bit").write_bytes(b"bit")
+        self.assertTrue(self.tracker().reuse_bitstream())
+
+    def test_xdc_change(self):
+        self.tracker().commit(True, True)
+        (self.root / "xdc" / "demo.xdc").write_text("# new constraint\n")
+        t = self.tracker()
+        self.assertFalse(t.reset_synth())
+        self.assertTrue(t.reset_impl())
+
+    def test_xdc_change_non_project(self):
+        prj = Project(self.root / "demo.yml", self.outdir)
+        StageTracker(prj, xdc_in_synth=True).commit(True, True)
+        (self.root / "xdc" / "demo.xdc").write_text("# new constraint\n")
+        prj = Project(self.root / "demo.yml", self.outdir)
+        t = StageTracker(prj, xdc_in_synth=True)
+        self.assertTrue(t.reset_synth())
+        self.assertTrue(t.reset_impl())
+
+    def test_non_project_skips_sources(self):
+        def flow():
+            prj = Project(self.root / "demo.yml", self.outdir)
+            return NonProjectVivado(prj)
+
+        viv = flow()
+        self.assertIn("xb_stage read_hdl begin", viv.build_tcl.read_text())
+        viv.stages.commit(True, True)
+        viv.synth_checkpoint().write_text("dcp")
+        tcl = flow().build_tcl.read_text()
+        self.assertIn("synthesis is up to date, skipping the sources", tcl)
+        self.assertNotIn("xb_stage read_hdl begin", tcl)
+        self.assertNotIn("synth_ip", tcl.split("proc syn_only")[-1])
+        # a constraint change synthesizes with the new constraints
+        (self.root / "xdc" / "demo.xdc").write_text("# new constraint\n")
+        tcl = flow().build_tcl.read_text()
+        self.assertIn("xb_stage read_xdc begin", tcl)
+        self.assertIn("set reset_syn  1\n", tcl)
+
+    def test_hdl_change(self):
+        self.tracker().commit(True, True)
+        (self.root / "hdl" / "demo.vhd").write_text("-- changed\n")
+        t = self.tracker()
+        self.assertTrue(t.reset_synth())
+        self.assertTrue(t.reset_impl())
+
+    def test_synth_only_commit(self):
+        self.tracker().commit(True, True)
+        (self.root / "hdl" / "demo.vhd").write_text("-- changed\n")
+        self.tracker().commit(syn=True)
+        t = self.tracker()
+        self.assertFalse(t.reset_synth())
+        self.assertTrue(t.reset_impl())
+
+
+class TestBlockDesignReuse(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "files"
+        shutil.copytree("tests/files", self.root,
+                        ignore=shutil.ignore_patterns(".work"))
+        (self.root / "bd0").mkdir()
+        self.script = self.root / "bd0" / "system.tcl"
+        self.script.write_text("create_bd_design system\n")
+        self.outdir = Path(self.tmp.name) / "prj"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def tracker(self):
+        prj = Project(self.root / "demo.yml", self.outdir)
+        return StageTracker(prj)
+
+    def bd(self, t):
+        return t.prj.bd_files[0]
+
+    def generate(self, t):
+        (self.outdir / "demo.xpr").write_text("")
+        for p in t.bd_outputs("system")[:2]:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text("generated")
+
+    def test_first_build(self):
+        t = self.tracker()
+        self.assertFalse(t.reuse_bd(self.bd(t)))
+
+    def test_unchanged(self):
+        t = self.tracker()
+        self.generate(t)
+        t.commit()
+        t = self.tracker()
+        self.assertTrue(t.reuse_bd(self.bd(t)))
+
+    def test_script_changed(self):
+        t = self.tracker()
+        self.generate(t)
+        t.commit()
+        self.script.write_text("create_bd_design system\n# changed\n")
+        t = self.tracker()
+        self.assertFalse(t.reuse_bd(self.bd(t)))
+
+    def test_outputs_changed(self):
+        t = self.tracker()
+        self.generate(t)
+        t.commit()
+        t.bd_outputs("system")[0].write_text("edited in the GUI")
+        t = self.tracker()
+        self.assertFalse(t.reuse_bd(self.bd(t)))
+
+    def test_outputs_missing(self):
+        t = self.tracker()
+        self.generate(t)
+        t.commit()
+        t.bd_outputs("system")[0].unlink()
+        t = self.tracker()
+        self.assertFalse(t.reuse_bd(self.bd(t)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from xil_builder.artifacts import ArtifactStore
+from xil_builder.project import Project
+from xil_builder.sweep import StrategySweep
+from xil_builder.vivado import Vivado, NonProjectVivado
+
+FAKE_BIN = Path("tests/files/bin").resolve()
+
+
+class TestStrategySweep(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = Project(Path('tests/files/demo.yml'),
+                               Path(self.tmp.name) / "prj")
+        self.dcp = Path(self.tmp.name) / "synth.dcp"
+        self.dcp.write_text("dcp")
+        self.strategies = [
+            {"place_design": "Explore"},
+            {"place_design": "ExtraTimingOpt"},
+            {"place_design": "AltSpreadLogic_high"},
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_run_scripts(self):
+        sweep = StrategySweep(self.project, self.dcp, self.strategies)
+        self.assertEqual(len(sweep.runs), 3)
+        tcl = sweep.runs[1].tcl.read_text()
+        self.assertIn("place $NAME $DIR ExtraTimingOpt\n", tcl)
+        self.assertIn("opt $NAME $DIR Explore\n", tcl)
+        self.assertIn(f"open_checkpoint {self.dcp.resolve().as_posix()}",
+                      tcl)
+
+    def test_phys_opt_enable_flags(self):
+        tcl = StrategySweep(self.project, self.dcp, self.strategies) \
+            .runs[0].tcl.read_text()
+        self.assertIn("phys_opt $NAME $DIR AggressiveExplore\n", tcl)
+        self.assertNotIn("set wns [setup_wns]", tcl)
+        self.project.impl_args = {
+            "phys_opt_design": {"is_enabled": False},
+            "post_route_phys_opt_design": {"is_enabled": True,
+                                           "directive": "Explore"},
+        }
+        tcl = StrategySweep(self.project, self.dcp, self.strategies) \
+            .runs[0].tcl.read_text()
+        self.assertNotIn("phys_opt $NAME $DIR", tcl)
+        self.assertIn("phys_opt_design -directive Explore\n"
+                      "set wns [setup_wns]\n", tcl)
+
+    def test_limit_runs(self):
+        sweep = StrategySweep(self.project, self.dcp, runs=2)
+        self.assertEqual(len(sweep.runs), 2)
+
+    def test_missing_checkpoint(self):
+        sweep = StrategySweep(self.project, strategies=self.strategies)
+        with self.assertRaises(AssertionError):
+            sweep.build()
+
+    def test_checkpoint_of_flow(self):
+        outdir = self.project.outdir
+        self.assertEqual(Vivado(self.project).synth_checkpoint(),
+                         outdir / "demo.runs" / "synth_1" / "demo_top.dcp")
+        viv = NonProjectVivado(self.project)
+        dcp = viv.synth_checkpoint()
+        self.assertEqual(dcp, outdir / "demo_post_synth.dcp")
+        # the path the generated flow writes after synthesis
+        self.assertIn("set SYN_DCP $PRJ_DIR/${PRJ_NAME}_post_synth.dcp",
+                      viv.build_tcl.read_text())
+        dcp.write_text("dcp")
+        path = f"{FAKE_BIN}{os.pathsep}{os.environ['PATH']}"
+        with patch.dict(os.environ, {"PATH": path}):
+            sweep = StrategySweep(self.project, dcp, self.strategies)
+            self.assertIsNotNone(sweep.build())
+
+    def test_sweep_prunes_and_promotes(self):
+        path = f"{FAKE_BIN}{os.pathsep}{os.environ['PATH']}"
+        with patch.dict(os.environ, {"PATH": path}):
+            sweep = StrategySweep(self.project, self.dcp, self.strategies)
+            best = sweep.build()
+        self.assertEqual(best.index, 1)
+        self.assertEqual(best.route_wns, 0.15)
+        self.assertEqual(sweep.runs[2].status, "pruned")
+        self.assertEqual(sweep.runs[0].status, "ok")
+        latest = self.project.outdir / "deploy" / "latest-demo.bit"
+        self.assertEqual(latest.read_text(), "ExtraTimingOpt\n")
+
+    def test_promote_to_artifact_store(self):
+        store = ArtifactStore(self.project.outdir / "deploy")
+        path = f"{FAKE_BIN}{os.pathsep}{os.environ['PATH']}"
+        with patch.dict(os.environ, {"PATH": path}):
+            sweep = StrategySweep(self.project, self.dcp, self.strategies,
+                                  artifacts=store, git_sha="abcd123")
+            sweep.build()
+        manifest = store.manifest(name="demo", git_rev="abcd123")
+        self.assertEqual(manifest["wns"], 0.15)
+        self.assertIn("latest-demo.bit", manifest["links"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,30 @@
+import io
+import sys
+import zipfile
+from subprocess import CompletedProcess
 from unittest.mock import patch, call, MagicMock
 import unittest
-from xil_builder.vivado import Vivado, Petalinux
+import tempfile
+from xil_builder.cache import BuildCache
+from xil_builder.ipcache import IpCache
+from xil_builder.library import FType, SrcFile
+from xil_builder.progress import stream, VivadoLogParser
+from xil_builder.vivado import Vivado, NonProjectVivado, Petalinux
 from xil_builder.project import Project
 from pathlib import Path
 
 
 class TestVivado(unittest.TestCase):
     def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
         self.yaml_path = Path('tests/files/demo.yml')
-        self.outdir_path = Path('tests/files/.work')
+        self.outdir_path = Path(self.tmp.name) / "prj"
         self.project = Project(self.yaml_path, self.outdir_path)
         self.vivado = Vivado(self.project, "vhdl")
 
+    def tearDown(self):
+        self.tmp.cleanup()
+
     @patch("xil_builder.vivado.run", return_value=MagicMock())
     def test_build(self, mock_popen):
         mock_popen.return_value.communicate.return_value = ("", "error")
@@ -34,6 +47,206 @@ class TestVivado(unittest.TestCase):
         ]
         mock_popen.assert_has_calls(expected_calls)
 
+    def test_bd_flow_with_fail_fast(self):
+        bd = self.outdir_path / "bd0.tcl"
+        bd.write_text("")
+        self.project.bd_files = [SrcFile(bd, FType.BD)]
+        tcl = Vivado(self.project, "vhdl").build_tcl.read_text()
+        self.assertEqual(tcl.count("xb_catch {                      "
+                                   "add_files -norecurse"), 2)
+        self.assertIn("xb_catch {upgrade_ip [get_ips *]}", tcl)
+        self.assertNotRegex(tcl, r"(?<!xb_)catch \{ ?generate_target")
+        # what Vivado prints for a block design with a VHDL wrapper
+        log = [
+            "Command: make_wrapper -files bd0.bd -top",
+            "XB_CAUGHT begin",
+            "ERROR: [filemgmt 56-12] File 'bd0_wrapper.v' does not exist",
+            "XB_CAUGHT end",
+            "XB_CAUGHT begin",
+            "XB_CAUGHT end",
+            "XB_CAUGHT begin",
+            "ERROR: [Vivado 12-1580] No IPs matched '*'",
+            "XB_CAUGHT end",
+            "INFO: [Vivado 12-3482] done",
+        ]
+        script = "".join(f"print({line!r})\n" for line in log)
+        with tempfile.TemporaryDirectory() as tmp:
+            code = stream([sys.executable, "-c", script], VivadoLogParser(),
+                          log=Path(tmp) / "out.log", fail_fast=True)
+        self.assertEqual(code.returncode, 0)
+
+    def test_build_with_server(self):
+        server = MagicMock()
+        server.run.return_value = 0
+        self.assertEqual(self.vivado.build(True, False, server=server), 0)
+        args, kwargs = server.run.call_args
+        self.assertEqual(args, (self.vivado.build_tcl, [1, 0]))
+        self.assertIsNone(kwargs["log"])
+
+    def test_stage_flags(self):
+        tcl = self.vivado.build_tcl.read_text()
+        reset = int(self.vivado.stages.reset_synth())
+        self.assertIn(f"set reset_syn  {reset}\n", tcl)
+        self.assertIn("set reset_impl", tcl)
+        self.assertIn("set reuse_bit", tcl)
+
+    def test_batched_reads(self):
+        tcl = self.vivado.build_tcl.read_text()
+        self.assertIn("proc xb_read", tcl)
+        self.assertIn("xb_read {read_vhdl -vhdl2008 -library prj} {\n"
+                      "  {tests/files/hdl/demo.vhd}\n}\n", tcl)
+        self.assertIn("xb_read {read_xdc} {\n", tcl)
+        self.assertLess(tcl.index("xb_read_check\n"),
+                        tcl.index("xb_stage bd begin"))
+
+    def test_read_chunks(self):
+        paths = [Path(f"src/file_{i:03}.vhd") for i in range(100)]
+        out = io.StringIO()
+        with patch.object(Vivado, "READ_CHUNK", 200):
+            self.vivado._read_batched(out, "read_vhdl", paths)
+        chunks = out.getvalue().count("xb_read {read_vhdl}")
+        self.assertGreater(chunks, 1)
+        for p in paths:
+            self.assertEqual(out.getvalue().count(p.as_posix()), 1)
+
+    def test_ip_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ip_cache = IpCache(Path(tmp))
+            vivado = Vivado(self.project, "vhdl", ip_cache=ip_cache)
+            tcl = vivado.build_tcl.read_text()
+            loc = ip_cache.location(self.project.part).as_posix()
+            self.assertIn(f"set IP_CACHE {loc}\n", tcl)
+            self.assertIn("config_ip_cache -use_cache_location", tcl)
+            self.assertEqual(tcl.count("config_ip_cache -export"), 1)
+            self.assertIn(ip_cache, vivado.callbacks)
+
+    def test_hdl_deps_unknown_top(self):
+        vivado = Vivado(self.project, "vhdl", hdl_deps=True)
+        tcl = vivado.build_tcl.read_text()
+        self.assertIsNone(vivado.compile_order)
+        self.assertIn("demo.vhd", tcl)
+        self.assertIn("update_compile_order", tcl)
+        self.assertNotIn("source_mgmt_mode", tcl)
+
+    def test_hdl_deps_reorders_project(self):
+        demo = SrcFile(Path("tests/files/hdl/demo.vhd"), FType.VHDL)
+        old = SrcFile(Path("tests/files/hdl/old.vhd"), FType.VHDL)
+        with patch("xil_builder.vivado.DependencyGraph") as graph:
+            graph.return_value.compile_order.return_value = [("prj", demo)]
+            graph.return_value.unused.return_value = [("prj", old)]
+            vivado = Vivado(self.project, "vhdl", hdl_deps=True)
+        tcl = vivado.build_tcl.read_text()
+        self.assertIn("proc xb_order", tcl)
+        self.assertIn("xb_order {\n  {tests/files/hdl/demo.vhd}\n} "
+                      "{\n  {tests/files/hdl/old.vhd}\n}\n", tcl)
+        # the project is reordered after all sources were read
+        self.assertLess(tcl.index("xb_read_check"),
+                        tcl.index("xb_order {\n"))
+        self.assertLess(tcl.index("source_mgmt_mode None"),
+                        tcl.index("xb_order {\n"))
+
+    def test_profile_markers(self):
+        tcl = self.vivado.build_tcl.read_text()
+        self.assertIn("proc xb_stage", tcl)
+        for stage in ["read_hdl", "bd", "synth", "impl", "write_bitstream"]:
+            self.assertIn(f"xb_stage {stage} begin\n", tcl)
+            self.assertIn(f"xb_stage {stage} end\n", tcl)
+        self.assertLess(tcl.index("proc xb_stage"),
+                        tcl.index("xb_stage open_project begin"))
+
+
+class TestNonProjectVivado(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.yaml_path = Path('tests/files/demo.yml')
+        self.outdir_path = Path(self.tmp.name) / "prj"
+        self.project = Project(self.yaml_path, self.outdir_path)
+        self.project.impl_args = {
+            "place_design": {"directive": "ExtraTimingOpt"},
+            "phys_opt_design": {"is_enabled": False},
+        }
+        self.vivado = NonProjectVivado(self.project, "vhdl")
+        self.tcl = self.vivado.build_tcl.read_text()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_flow(self):
+        self.assertIn("create_project -in_memory -part $PART", self.tcl)
+        self.assertIn("synth $PRJ_NAME $PRJ_DIR $SYN_ARGS", self.tcl)
+        self.assertNotIn("launch_runs", self.tcl)
+        self.assertNotIn("update_compile_order", self.tcl)
+
+    def test_syn_args(self):
+        self.assertIn("lappend SYN_ARGS -flatten_hierarchy {rebuild}\n",
+                      self.tcl)
+        self.assertIn("lappend SYN_ARGS -bufg 12\n", self.tcl)
+        self.assertIn("lappend SYN_ARGS -generic {g_major=0}\n", self.tcl)
+        self.assertNotIn("-verbose", self.tcl)
+
+    def test_syn_args_verbose(self):
+        self.project.syn_args["verbose"] = True
+        tcl = NonProjectVivado(self.project, "vhdl").build_tcl.read_text()
+        self.assertIn("lappend SYN_ARGS -verbose\n", tcl)
+
+    def test_directives(self):
+        self.assertIn("set PLACE_DIRECTIVE ExtraTimingOpt\n", self.tcl)
+        self.assertIn("set OPT_DIRECTIVE Default\n", self.tcl)
+        self.assertIn("set ena_phys_opt 0\n", self.tcl)
+        self.assertIn("set ena_post_route_phys_opt 0\n", self.tcl)
+
+    @patch("xil_builder.vivado.run", return_value=MagicMock())
+    def test_build(self, mock_run):
+        self.vivado.build(True, False)
+        args = mock_run.call_args[0][0]
+        self.assertEqual(args[-4:], [self.vivado.build_tcl.as_posix(),
+                                     "-tclargs", "1", "0"])
+
+
+class TestVivadoCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = Project(Path('tests/files/demo.yml'),
+                               Path(self.tmp.name) / "prj")
+        self.cache = BuildCache(Path(self.tmp.name) / "cache")
+        self.vivado = Vivado(self.project, "vhdl", cache=self.cache)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch("xil_builder.vivado.run")
+    def test_miss_then_hit(self, mock_run):
+        deploy = self.project.outdir / "deploy"
+
+        def fake_vivado(pargs):
+            deploy.mkdir(parents=True, exist_ok=True)
+            (deploy / "demo_x.bit").write_bytes(b"bit")
+            (deploy / "latest-demo.bit").symlink_to("demo_x.bit")
+            return MagicMock(returncode=0)
+
+        mock_run.side_effect = fake_vivado
+        self.assertEqual(self.vivado.build(True, True), 0)
+        self.assertEqual(mock_run.call_count, 1)
+
+        (deploy / "latest-demo.bit").unlink()
+        (deploy / "demo_x.bit").unlink()
+        self.assertEqual(self.vivado.build(True, True), 0)
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertEqual((deploy / "latest-demo.bit").read_bytes(), b"bit")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertTrue(self.vivado.cache_hit)
+
+    @patch("xil_builder.vivado.run", return_value=MagicMock(returncode=1))
+    def test_vivado_log(self, mock_run):
+        log = self.project.outdir / "demo.vivado.log"
+        vivado = Vivado(self.project, "vhdl", cache=self.cache,
+                        vivado_log=log)
+        self.assertEqual(vivado.build(True, True), 1)
+        self.assertFalse(vivado.cache_hit)
+        args = mock_run.call_args[0][0]
+        self.assertEqual(args[0:3], ["vivado", "-log", log.as_posix()])
+        self.assertNotIn("-nolog", args)
+
 
 class TestNoPetalinux(unittest.TestCase):
     def setUp(self):
@@ -70,6 +283,15 @@ class TestPetalinux(unittest.TestCase):
             cwd=self.peta.linux_dir,
         )
 
+    @patch("xil_builder.vivado.stream", return_value=MagicMock())
+    def test_build_step_streamed(self, mock_stream):
+        peta = Petalinux(self.prj, callbacks=[print])
+        peta._build()
+        args, kwargs = mock_stream.call_args
+        self.assertEqual(args[0], ["petalinux-build"])
+        self.assertEqual(args[2], [print])
+        self.assertEqual(kwargs["cwd"], self.peta.linux_dir)
+
     @patch("xil_builder.vivado.run", return_value=MagicMock())
     def test_build_step(self, mock_run):
         self.peta._build()
@@ -173,5 +395,51 @@ class TestPetalinux(unittest.TestCase):
         )
 
 
+class TestPetalinuxIncremental(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        prj = Project(Path("./tests/files/demo_linux.yml"), root / "prj")
+        self.peta = Petalinux(prj)
+        self.peta.xsa_dir = root / "deploy"
+        self.peta.xsa_dir.mkdir()
+        self.peta.bitstream = root / "images" / "system.bit"
+        self.xsa = self.peta.xsa_dir / "latest-test_petalinux.xsa"
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_xsa(self, bit):
+        with zipfile.ZipFile(self.xsa, "w") as z:
+            z.writestr("system.bit", bit)
+            z.writestr("system.hwh", "<EDKSYSTEM/>")
+
+    def run_step(self, pargs):
+        self.calls.append(pargs[0:3])
+        return CompletedProcess(pargs, 0)
+
+    def build(self):
+        self.calls = []
+        with patch.object(self.peta, "_run", side_effect=self.run_step):
+            self.peta.build(reconfigure=True, package=True,
+                            incremental=True)
+        return [c[0] if len(c) == 1 else " ".join(c) for c in self.calls]
+
+    def test_incremental(self):
+        self.write_xsa(b"bit")
+        steps = self.build()
+        self.assertIn("petalinux-build", steps)
+        self.assertEqual(len(steps), 3)
+        # unchanged XSA: nothing to do
+        self.assertEqual(self.build(), [])
+        # new bitstream only: repackage BOOT.BIN
+        self.write_xsa(b"new")
+        steps = self.build()
+        self.assertEqual(len(steps), 1)
+        self.assertTrue(steps[0].startswith("petalinux-package"))
+        self.assertEqual(self.peta.bitstream.read_bytes(), b"new")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,164 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from xil_builder.progress import VivadoLogParser, stream
+from xil_builder.watch import InotifyWatcher, PollingWatcher, Watch
+
+YAML = """\
+project:
+  name: "watched"
+  part: "xc7z010clg400-1"
+  top: "top"
+constraints:
+  - "./xdc/*.xdc"
+libraries:
+  prj:
+    - "./hdl/*.vhd"
+"""
+
+
+def wait_for(cond, timeout=10.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > end:
+            raise AssertionError("timeout")
+        time.sleep(0.01)
+
+
+class FakeBuilder:
+    def __init__(self, builds, block):
+        self.builds = builds
+        self.block = block
+
+    def __call__(self, prj, lang, cancel=None):
+        self.cancel = cancel
+        return self
+
+    def build(self, syn=False, impl=False, log=None):
+        self.builds.append("impl" if impl else "synth")
+        if self.block.is_set():
+            self.cancel.wait(10)
+            return -15
+        return 0
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.file = self.root / "a.vhd"
+        self.file.write_text("a\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_polling(self):
+        w = PollingWatcher([self.root], [self.file], interval=0.01)
+        self.assertEqual(w.wait(0.05), set())
+        self.file.write_text("changed\n")
+        self.assertIn(self.file, w.wait(1))
+        (self.root / "b.vhd").write_text("b\n")
+        os.utime(self.root, ns=(0, 0))
+        self.assertEqual(w.wait(1), {self.root})
+
+    def test_inotify(self):
+        try:
+            w = InotifyWatcher([self.root])
+        except OSError:
+            self.skipTest("no inotify")
+        try:
+            self.assertEqual(w.wait(0.05), set())
+            # save by rename like most editors
+            tmp = self.root / ".a.vhd.swp"
+            tmp.write_text("changed\n")
+            os.replace(tmp, self.file)
+            changes = set()
+            while self.file not in changes:
+                more = w.wait(1)
+                self.assertTrue(more)
+                changes |= more
+        finally:
+            w.close()
+
+    def test_stream_cancel(self):
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+        start = time.monotonic()
+        code = stream(["sleep", "10"], VivadoLogParser(), cancel=cancel)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertNotEqual(code.returncode, 0)
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "src"
+        (self.root / "hdl").mkdir(parents=True)
+        (self.root / "xdc").mkdir()
+        self.yaml = self.root / "watched.yml"
+        self.yaml.write_text(YAML)
+        self.hdl = self.root / "hdl" / "top.vhd"
+        self.hdl.write_text("entity top is end;\n")
+        self.xdc = self.root / "xdc" / "pins.xdc"
+        self.xdc.write_text("# pins\n")
+        self.outdir = Path(self.tmp.name) / "out"
+        self.builds = []
+        self.block = threading.Event()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def watch(self, goal="impl"):
+        builder = FakeBuilder(self.builds, self.block)
+        return Watch(self.yaml, self.outdir, builder=builder, goal=goal,
+                     debounce=0.05, interval=0.01)
+
+    def test_required(self):
+        w = self.watch()
+        w._load()
+        self.assertEqual(w._required({self.xdc}), "impl")
+        self.assertEqual(w._required({self.hdl}), "impl")
+        self.assertIsNone(w._required({self.outdir / "watched.tcl"}))
+        # a temporary file reloads the project but changes nothing
+        self.assertIsNone(w._required({self.root / "hdl" / ".top.swp"}))
+        (self.root / "hdl" / "new.vhd").write_text("\n")
+        self.assertEqual(w._required({self.root / "hdl" / "new.vhd"}),
+                         "impl")
+        self.assertIn((self.root / "hdl" / "new.vhd").resolve(), w.files)
+        w.watcher.close()
+
+        w = self.watch(goal="synth")
+        w._load()
+        self.assertEqual(w._required({self.xdc}), "tcl")
+        self.assertEqual(w._required({self.hdl, self.xdc}), "synth")
+        w.watcher.close()
+
+    def test_rebuilds_and_cancels(self):
+        w = self.watch()
+        t = threading.Thread(target=w.run)
+        t.start()
+        try:
+            wait_for(lambda: len(w.results) == 1)
+            self.assertEqual(w.results[0].status, "ok")
+            # a burst of saves is one build
+            self.block.set()
+            for i in range(3):
+                self.hdl.write_text(f"entity top is end; -- {i}\n")
+            wait_for(lambda: len(self.builds) == 2)
+            # a change during the build cancels it
+            self.block.clear()
+            self.xdc.write_text("# new pins\n")
+            wait_for(lambda: len(w.results) == 3)
+        finally:
+            w.stop()
+            t.join()
+        self.assertEqual(self.builds, ["impl", "impl", "impl"])
+        self.assertEqual([r.status for r in w.results],
+                         ["ok", "cancelled", "ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from yaml import safe_load, safe_dump
+from xil_builder.workspace import Workspace
+
+
+def write_variant(root: Path, name: str, depends=None):
+    with open("tests/files/demo.yml") as f:
+        data = safe_load(f)
+    data["project"]["name"] = name
+    data["project"]["external_libs"] = None
+    if depends:
+        data["project"]["depends"] = depends
+    yaml = root / f"{name}.yml"
+    yaml.write_text(safe_dump(data))
+    return yaml
+
+
+class TestWorkspace(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "files"
+        shutil.copytree("tests/files", self.root,
+                        ignore=shutil.ignore_patterns(".work"))
+        self.outdir = Path(self.tmp.name) / "ws"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_order(self):
+        yamls = [
+            write_variant(self.root, "board_a", ["ip"]),
+            write_variant(self.root, "ip"),
+            write_variant(self.root, "board_b", ["board_a"]),
+        ]
+        ws = Workspace(yamls, self.outdir)
+        self.assertEqual(ws.order, ["ip", "board_a", "board_b"])
+
+    def test_cycle(self):
+        yamls = [
+            write_variant(self.root, "a", ["b"]),
+            write_variant(self.root, "b", ["a"]),
+        ]
+        with self.assertRaises(RuntimeError):
+            Workspace(yamls, self.outdir)
+
+    @patch("xil_builder.workspace.Vivado")
+    def test_failed_dependency_skips(self, mock_vivado):
+        yamls = [
+            write_variant(self.root, "ip"),
+            write_variant(self.root, "board", ["ip"]),
+            write_variant(self.root, "other"),
+        ]
+        mock_vivado.side_effect = lambda prj, *a, **kw: \
+            _FakeVivado(prj, 1 if prj.name == "ip" else 0)
+        results = Workspace(yamls, self.outdir).build()
+        status = {r.name: r.status for r in results}
+        self.assertEqual(status,
+                         {"ip": "failed", "board": "skipped", "other": "ok"})
+
+    @patch("xil_builder.workspace.Vivado")
+    def test_concurrency_bound(self, mock_vivado):
+        yamls = [write_variant(self.root, f"p{i}") for i in range(5)]
+        mock_vivado.side_effect = lambda prj, *a, **kw: _FakeVivado(prj, 0)
+        _FakeVivado.peak = 0
+        results = Workspace(yamls, self.outdir, jobs=2).build()
+        self.assertTrue(all(r.status == "ok" for r in results))
+        self.assertEqual(_FakeVivado.peak, 2)
+
+
+class _FakeVivado:
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def __init__(self, prj, code):
+        self.code = code
+
+    def build(self, syn, impl, log=None):
+        with self.lock:
+            _FakeVivado.active += 1
+            _FakeVivado.peak = max(_FakeVivado.peak, _FakeVivado.active)
+        time.sleep(0.05)
+        with self.lock:
+            _FakeVivado.active -= 1
+        return self.code
+
+
+if __name__ == '__main__':
+    unittest.main()
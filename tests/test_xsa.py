@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from xil_builder.xsa import xsa_fingerprint, rebuild_plan, extract_bitstream
+
+HWH = '<MODULE INSTANCE="axi_gpio_0" BASEADDR="0x41200000"/>'
+
+
+def write_xsa(path, bit=b"bit", hwh=HWH, init="ps7_init", date="1",
+              other="x"):
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("system.bit", bit)
+        z.writestr("system.hwh",
+                   f'<EDKSYSTEM TIMESTAMP="{date}">{hwh}</EDKSYSTEM>')
+        z.writestr("ps7_init.c", init)
+        z.writestr("xsa.json", f'{{"date": "{date}", "design": "sys"}}')
+        z.writestr("other.dat", other)
+    return path
+
+
+class TestXsa(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.base = xsa_fingerprint(write_xsa(self.root / "a.xsa"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def plan(self, **kw):
+        return rebuild_plan(
+            self.base, xsa_fingerprint(write_xsa(self.root / "b.xsa", **kw))
+        )
+
+    def test_unknown_previous(self):
+        self.assertEqual(rebuild_plan(None, self.base), ("full", []))
+
+    def test_timestamps_only(self):
+        self.assertEqual(self.plan(date="2"), ("none", []))
+
+    def test_bitstream_only(self):
+        self.assertEqual(self.plan(bit=b"new"), ("package", []))
+
+    def test_devicetree(self):
+        action, components = self.plan(hwh=HWH.replace("0x4120", "0x4130"))
+        self.assertEqual(action, "components")
+        # image.ub embeds the device tree, the kernel FIT image follows it
+        self.assertEqual(components, ["device-tree", "u-boot", "kernel"])
+
+    def test_boot(self):
+        self.assertEqual(self.plan(init="changed"),
+                         ("components", ["bootloader"]))
+
+    def test_other(self):
+        self.assertEqual(self.plan(other="changed"), ("full", []))
+
+    def test_extract_bitstream(self):
+        dst = self.root / "images" / "system.bit"
+        self.assertTrue(extract_bitstream(self.root / "a.xsa", dst))
+        self.assertEqual(dst.read_bytes(), b"bit")
+
+
+if __name__ == '__main__':
+    unittest.main()
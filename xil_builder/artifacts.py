@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+import fcntl
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from xil_builder.fingerprint import hash_file
+
+# the deploy names end with _<WNS>ns, see synth.tcl
+WNS = re.compile(r"_(-?\d+(?:\.\d+)?)ns$")
+
+
+class ArtifactStore:
+    def __init__(self, deploy: Path, keep_last: int = None,
+                 max_bytes: int = None):
+        """
+        Initializes an ArtifactStore object.
+
+        The store keeps one copy of every distinct artifact of the deploy
+        directory, addressed by its content digest. The files in the deploy
+        directory stay where the flows wrote them, but become hardlinks to
+        the stored objects, so byte-identical bitstreams, XSAs and archives
+        of different builds share their disk space. A manifest per build
+        records its files, the git revision, the WNS and the time.
+
+        Everything lives in deploy/.store, the hardlinks need the same file
+        system:
+
+          objects/<digest>      the content of every distinct artifact
+          builds/<build>.json   the manifest of every build
+          revs/<name>_<rev>.json  the manifest of the newest build of a
+                                revision
+
+        Args:
+          deploy (Path): The deploy directory.
+          keep_last (int, optional): Number of builds per project kept by
+              prune(). Defaults to None (no limit).
+          max_bytes (int, optional): Size limit of all stored objects
+              enforced by prune(). Defaults to None (no limit).
+        """
+        self.deploy = Path(deploy)
+        self.root = self.deploy / ".store"
+        self.objects = self.root / "objects"
+        self.builds = self.root / "builds"
+        self.revs = self.root / "revs"
+        for d in [self.objects, self.builds, self.revs]:
+            d.mkdir(parents=True, exist_ok=True)
+        self.keep_last = keep_last
+        self.max_bytes = max_bytes
+        self.lock_file = self.root / ".lock"
+
+    @contextmanager
+    def _locked(self):
+        with self.lock_file.open("a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _object(self, digest: str) -> Path:
+        return self.objects / digest
+
+    def _add(self, path: Path) -> str:
+        """
+        Moves a deploy file into the store and replaces it by a hardlink.
+
+        Args:
+          path (Path): The deploy file.
+
+        Returns:
+          str: The content digest.
+        """
+        digest = hash_file(path)
+        obj = self._object(digest)
+        if not obj.exists():
+            os.link(path, obj)
+            obj.chmod(0o444)
+        elif not os.path.samefile(path, obj):
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            os.link(obj, tmp)
+            os.replace(tmp, path)
+        return digest
+
+    def ingest(self, name: str, git_rev: str = None, wns: float = None):
+        """
+        Adds the latest build of a project to the store.
+
+        The build consists of the files the latest-<name>.* links point to.
+
+        Args:
+          name (str): The project name.
+          git_rev (str, optional): The built revision. Defaults to None.
+          wns (float, optional): The post route WNS. Defaults to the value
+              in the deploy names.
+
+        Returns:
+          dict: The manifest of the build or None without artifacts.
+        """
+        links = {}
+        for link in sorted(self.deploy.glob(f"latest-{name}.*")):
+            if link.is_symlink() and link.resolve().is_file():
+                links[link.name] = os.readlink(link)
+        if not links:
+            return None
+        build = Path(sorted(links.values())[0]).stem
+        if wns is None:
+            m = WNS.search(build)
+            wns = float(m.group(1)) if m else None
+
+        with self._locked():
+            files = {}
+            for target in links.values():
+                path = self.deploy / target
+                files[path.name] = {"digest": self._add(path),
+                                    "size": path.stat().st_size}
+            manifest = {
+                "build": build,
+                "project": name,
+                "created": time.time(),
+                "git_rev": git_rev,
+                "wns": wns,
+                "files": files,
+                "links": links,
+            }
+            blob = json.dumps(manifest, indent=2)
+            self._write(self.builds / f"{build}.json", blob)
+            if git_rev is not None:
+                self._write(self.revs / f"{name}_{git_rev}.json", blob)
+        return manifest
+
+    @staticmethod
+    def _write(path: Path, blob: str):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(blob)
+        os.replace(tmp, path)
+
+    def manifest(self, build: str = None, name: str = None,
+                 git_rev: str = None):
+        """
+        Looks up the manifest of a build by its name or by the revision.
+
+        Args:
+          build (str, optional): The build name (the stem of its deploy
+              files). Defaults to None.
+          name (str, optional): The project name, used with git_rev.
+              Defaults to None.
+          git_rev (str, optional): The revision. Defaults to None.
+
+        Returns:
+          dict: The manifest or None if unknown.
+        """
+        if build is not None:
+            path = self.builds / f"{build}.json"
+        else:
+            path = self.revs / f"{name}_{git_rev}.json"
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def artifacts(self, build: str = None, name: str = None,
+                  git_rev: str = None) -> dict:
+        """
+        Returns the stored artifacts of a build.
+
+        Args:
+          build (str, optional): The build name. Defaults to None.
+          name (str, optional): The project name. Defaults to None.
+          git_rev (str, optional): The revision. Defaults to None.
+
+        Returns:
+          dict: The object path per file name, empty if unknown.
+        """
+        manifest = self.manifest(build, name, git_rev)
+        if manifest is None:
+            return {}
+        return {f: self._object(e["digest"])
+                for f, e in manifest["files"].items()}
+
+    def _manifests(self):
+        manifests = []
+        for path in self.builds.glob("*.json"):
+            try:
+                manifests.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return sorted(manifests, key=lambda m: m["created"])
+
+    def _drop(self, manifest: dict):
+        for f, e in manifest["files"].items():
+            path = self.deploy / f
+            obj = self._object(e["digest"])
+            # only remove deploy files that still are the stored artifact
+            if path.is_file() and obj.exists() and \
+                    os.path.samefile(path, obj):
+                path.unlink()
+        (self.builds / f"{manifest['build']}.json").unlink(missing_ok=True)
+        rev = self.revs / f"{manifest['project']}_{manifest['git_rev']}.json"
+        try:
+            if json.loads(rev.read_text())["build"] == manifest["build"]:
+                rev.unlink()
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _collect(self, manifests) -> int:
+        # remove the objects no manifest references anymore
+        used = {e["digest"] for m in manifests for e in m["files"].values()}
+        removed = 0
+        for obj in self.objects.iterdir():
+            if obj.name not in used:
+                obj.unlink()
+                removed += 1
+        return removed
+
+    def prune(self, keep_last: int = None, max_bytes: int = None) -> list:
+        """
+        Removes old builds and the artifacts no remaining build uses.
+
+        The newest keep_last builds of every project are kept. If the
+        stored objects exceed max_bytes, the oldest remaining builds are
+        removed as well; the newest build is never removed.
+
+        Args:
+          keep_last (int, optional): Defaults to the store setting.
+          max_bytes (int, optional): Defaults to the store setting.
+
+        Returns:
+          List[str]: The removed builds.
+        """
+        keep_last = self.keep_last if keep_last is None else keep_last
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        assert keep_last is None or keep_last > 0, \
+            "the latest build has to be kept"
+        removed = []
+        with self._locked():
+            manifests = self._manifests()
+            if keep_last is not None:
+                per_project = {}
+                for m in reversed(manifests):
+                    n = per_project.get(m["project"], 0)
+                    per_project[m["project"]] = n + 1
+                    if n >= keep_last:
+                        removed.append(m)
+            kept = [m for m in manifests if m not in removed]
+            if max_bytes is not None:
+                sizes = {}
+                for m in kept:
+                    for e in m["files"].values():
+                        sizes[e["digest"]] = e["size"]
+                total = sum(sizes.values())
+                refs = {}
+                for m in kept:
+                    for d in {e["digest"] for e in m["files"].values()}:
+                        refs[d] = refs.get(d, 0) + 1
+                for m in kept[:-1]:
+                    if total <= max_bytes:
+                        break
+                    removed.append(m)
+                    for d in {e["digest"] for e in m["files"].values()}:
+                        refs[d] -= 1
+                        if refs[d] == 0:
+                            total -= sizes[d]
+                kept = [m for m in kept if m not in removed]
+            for m in removed:
+                self._drop(m)
+            self._collect(kept)
+        return [m["build"] for m in removed]
+
+    def stats(self) -> dict:
+        """
+        Returns the store statistics.
+
+        Returns:
+          dict: builds, objects, bytes (stored) and logical_bytes (the
+          size without deduplication).
+        """
+        manifests = self._manifests()
+        objects = list(self.objects.iterdir())
+        return {
+            "builds": len(manifests),
+            "objects": len(objects),
+            "bytes": sum(o.stat().st_size for o in objects),
+            "logical_bytes": sum(e["size"] for m in manifests
+                                 for e in m["files"].values()),
+        }
+
+    def print(self):
+        """
+        Prints the store statistics.
+        """
+        s = self.stats()
+        print(
+            f"artifacts: {s['builds']} builds, {s['objects']} objects, "
+            f"{s['bytes'] / 2**20:.1f} MiB "
+            f"({s['logical_bytes'] / 2**20:.1f} MiB before deduplication)"
+        )
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+import fcntl
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class BuildCache:
+    def __init__(self, root: Path, max_bytes: int = 10 * 2**30):
+        """
+        Initializes a BuildCache object.
+
+        The cache stores the deploy artifacts of a successful build under the
+        fingerprint of the project it was built from. Every entry is a
+        directory holding the artifacts and a manifest.json describing the
+        latest-* links to restore.
+
+        Args:
+          root (Path): The cache directory.
+          max_bytes (int, optional): Size limit of the cache. The least
+              recently used entries are evicted once it is exceeded.
+              Defaults to 10 GiB.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats_file = self.root / "stats.json"
+        self.lock_file = self.root / ".lock"
+
+    @contextmanager
+    def _locked(self):
+        with self.lock_file.open("a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _count(self, key, n=1):
+        stats = self._read_stats()
+        stats[key] = stats.get(key, 0) + n
+        self.stats_file.write_text(json.dumps(stats, indent=2))
+
+    def _read_stats(self):
+        if not self.stats_file.is_file():
+            return {}
+        try:
+            return json.loads(self.stats_file.read_text())
+        except ValueError:
+            return {}
+
+    def _entries(self):
+        return [
+            d for d in self.root.iterdir()
+            if d.is_dir() and (d / "manifest.json").is_file()
+        ]
+
+    @staticmethod
+    def _entry_size(entry: Path):
+        return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+    def entry(self, key: str) -> Path:
+        """
+        Returns the directory of a cache entry.
+
+        Args:
+          key (str): The project fingerprint.
+
+        Returns:
+          Path: The entry directory (it may not exist).
+        """
+        return self.root / key
+
+    def contains(self, key: str) -> bool:
+        """
+        Checks whether an entry exists without touching the statistics.
+
+        Args:
+          key (str): The project fingerprint.
+
+        Returns:
+          bool: True if the entry exists.
+        """
+        return (self.entry(key) / "manifest.json").is_file()
+
+    def restore(self, key: str, deploy: Path) -> bool:
+        """
+        Restores the artifacts of a cache entry into a deploy directory.
+
+        Args:
+          key (str): The project fingerprint.
+          deploy (Path): The deploy directory to restore into.
+
+        Returns:
+          bool: True on a cache hit, False on a miss.
+        """
+        with self._locked():
+            if not self.contains(key):
+                self._count("misses")
+                return False
+            entry = self.entry(key)
+            manifest = json.loads((entry / "manifest.json").read_text())
+            deploy = Path(deploy)
+            deploy.mkdir(parents=True, exist_ok=True)
+            for name in manifest.get("files", []):
+                dst = deploy / name
+                if not dst.exists():
+                    shutil.copy2(entry / name, dst)
+            for link, target in manifest.get("links", {}).items():
+                dst = deploy / link
+                if dst.is_symlink() or dst.exists():
+                    dst.unlink()
+                dst.symlink_to(target)
+            # mark as recently used for the eviction policy
+            os.utime(entry / "manifest.json")
+            self._count("hits")
+        return True
+
+    def store(self, key: str, deploy: Path, name: str) -> bool:
+        """
+        Stores the latest artifacts of a deploy directory in the cache.
+
+        Only the files referenced by the latest-<name>.* links are stored.
+
+        Args:
+          key (str): The project fingerprint.
+          deploy (Path): The deploy directory of the build.
+          name (str): The project name.
+
+        Returns:
+          bool: True if an entry was stored.
+        """
+        deploy = Path(deploy)
+        links = {}
+        for link in sorted(deploy.glob(f"latest-{name}.*")):
+            if link.is_symlink() and link.resolve().is_file():
+                links[link.name] = os.readlink(link)
+        if not links:
+            return False
+
+        tmp = self.root / f".{key}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        files = []
+        for target in links.values():
+            src = deploy / target
+            shutil.copy2(src, tmp / src.name)
+            files.append(src.name)
+        manifest = {
+            "files": files,
+            "links": links,
+            "created": time.time(),
+        }
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+        with self._locked():
+            entry = self.entry(key)
+            if entry.exists():
+                shutil.rmtree(entry)
+            tmp.rename(entry)
+            self._count("stores")
+            self._evict()
+        return True
+
+    def _evict(self):
+        entries = self._entries()
+        sizes = {e: self._entry_size(e) for e in entries}
+        total = sum(sizes.values())
+        lru = sorted(
+            entries, key=lambda e: (e / "manifest.json").stat().st_mtime
+        )
+        evicted = 0
+        # never evict the most recently used entry
+        for e in lru[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= sizes[e]
+            shutil.rmtree(e)
+            evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+    def stats(self) -> dict:
+        """
+        Returns the cache statistics.
+
+        Returns:
+          dict: hits, misses, stores, evictions, hit_rate, entries and bytes.
+        """
+        stats = self._read_stats()
+        hits = stats.get("hits", 0)
+        misses = stats.get("misses", 0)
+        entries = self._entries()
+        return {
+            "hits": hits,
+            "misses": misses,
+            "stores": stats.get("stores", 0),
+            "evictions": stats.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": len(entries),
+            "bytes": sum(self._entry_size(e) for e in entries),
+        }
+
+    def print(self):
+        """
+        Prints the cache statistics.
+        """
+        s = self.stats()
+        print(
+            f"build cache: {s['hits']} hits, {s['misses']} misses "
+            f"({s['hit_rate']:.0%}), {s['entries']} entries, "
+            f"{s['bytes'] / 2**20:.1f} MiB"
+        )
@@ -0,0 +1,620 @@
+#!/usr/bin/env python3
+import argparse
+import base64
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from xil_builder.fingerprint import hash_data
+from xil_builder.project import Project
+from xil_builder.vivado import Vivado, NonProjectVivado
+
+# progress events kept per job
+MAX_EVENTS = 500
+# artifacts are uploaded in chunks of this size
+CHUNK = 2**20
+
+
+class Job:
+    def __init__(self, job_id: str, request: dict):
+        """
+        Initializes a Job object.
+
+        Args:
+          job_id (str): The job id.
+          request (dict): yaml, rev, syn, impl and mode of the build.
+        """
+        self.id = job_id
+        self.request = request
+        self.key = request_key(request)
+        self.state = "pending"
+        self.worker = None
+        self.returncode = None
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.artifacts = []
+        self.submitted = 1
+        self.created = time.time()
+        self.finished = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job": self.id,
+            "request": self.request,
+            "state": self.state,
+            "worker": self.worker,
+            "returncode": self.returncode,
+            "events": list(self.events),
+            "artifacts": self.artifacts,
+            "submitted": self.submitted,
+        }
+
+
+def request_key(request: dict) -> str:
+    """
+    Returns the key identical build requests share.
+
+    Args:
+      request (dict): The build request.
+
+    Returns:
+      str: The hex digest.
+    """
+    return hash_data({
+        "yaml": Path(request["yaml"]).as_posix(),
+        "rev": request.get("rev"),
+        "syn": bool(request.get("syn", True)),
+        "impl": bool(request.get("impl", True)),
+        "mode": request.get("mode", "project"),
+    })
+
+
+def resolve_rev(repo: Path, rev: str) -> str:
+    """
+    Resolves a git revision (branch, tag or sha) to a commit sha.
+
+    Args:
+      repo (Path): The repository.
+      rev (str): The revision.
+
+    Returns:
+      str: The full commit sha.
+
+    Raises:
+      ValueError: If the revision is unknown.
+    """
+    res = subprocess.run(["git", "-C", str(repo), "rev-parse", "--verify",
+                          "--quiet", f"{rev}^{{commit}}"],
+                         capture_output=True, text=True)
+    if res.returncode != 0:
+        raise ValueError(f"unknown revision {rev}")
+    return res.stdout.strip()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        coordinator = self.server.coordinator
+        # jobs handed out over this connection
+        owned = set()
+        try:
+            for line in self.rfile:
+                try:
+                    reply = coordinator.handle(json.loads(line), owned)
+                except (ValueError, KeyError) as e:
+                    reply = {"error": str(e)}
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+                self.wfile.flush()
+        except ConnectionError:
+            pass
+        finally:
+            # the worker went away before it finished
+            coordinator.requeue(owned)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Coordinator:
+    def __init__(self, outdir: Path, host: str = "127.0.0.1", port: int = 0,
+                 repo: Path = None):
+        """
+        Initializes a Coordinator object.
+
+        The coordinator queues build requests, hands them to the workers
+        asking for work and collects their progress and artifacts. A
+        request identical to a pending or running one is not queued again,
+        the submitter gets the id of the existing job. With a repository,
+        the revision of a request is resolved to its commit sha first, so
+        requests for a branch are only coalesced while it did not move.
+
+        Clients and workers talk to it over TCP, every message is one JSON
+        object per line answered by one JSON object per line:
+
+          submit   {yaml, rev, syn, impl, mode} -> {job, coalesced}
+          status   {job}                        -> the job
+          fetch    {worker, timeout}            -> {job} (null if idle)
+          progress {job, event}                 -> {}
+          upload   {job, name, offset, data}    -> {}
+          done     {job, returncode, files, links} -> {}
+
+        Args:
+          outdir (Path): The artifacts are stored in <outdir>/<job id>.
+          host (str, optional): Listen address. Defaults to "127.0.0.1".
+          port (int, optional): Listen port, 0 picks a free port.
+              Defaults to 0.
+          repo (Path, optional): The repository the revisions are
+              resolved in. Defaults to None (the workers resolve them).
+        """
+        self.outdir = Path(outdir)
+        self.repo = repo
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        self.jobs = {}
+        self.queue = deque()
+        self.active = {}
+        self.cond = threading.Condition()
+        self.counter = 0
+        self.server = _Server((host, port), _Handler)
+        self.server.coordinator = self
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def start(self):
+        """
+        Serves the clients and workers in a background thread.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops serving.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def submit(self, request: dict):
+        """
+        Queues a build request unless an identical one is pending or
+        running.
+
+        Args:
+          request (dict): The build request.
+
+        Returns:
+          Tuple[Job, bool]: The job and whether the request was coalesced.
+
+        Raises:
+          ValueError: If the revision is unknown.
+        """
+        if self.repo is not None and request.get("rev"):
+            request = dict(request, ref=request["rev"],
+                           rev=resolve_rev(self.repo, request["rev"]))
+        key = request_key(request)
+        with self.cond:
+            job = self.active.get(key)
+            if job is not None:
+                job.submitted += 1
+                return job, True
+            self.counter += 1
+            job = Job(f"{self.counter:06d}", request)
+            self.jobs[job.id] = job
+            self.active[key] = job
+            self.queue.append(job)
+            self.cond.notify_all()
+        return job, False
+
+    def fetch(self, worker: str, timeout: float = 0):
+        """
+        Hands the oldest pending job to a worker.
+
+        Args:
+          worker (str): The worker name.
+          timeout (float, optional): Seconds to wait for a job.
+              Defaults to 0.
+
+        Returns:
+          Job: The job or None.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.queue, timeout):
+                return None
+            job = self.queue.popleft()
+            job.state = "running"
+            job.worker = worker
+        return job
+
+    def requeue(self, job_ids):
+        """
+        Puts running jobs back at the front of the queue.
+
+        Args:
+          job_ids (Iterable[str]): The job ids.
+        """
+        with self.cond:
+            for job_id in job_ids:
+                job = self.jobs[job_id]
+                if job.state != "running":
+                    continue
+                print(f"worker {job.worker} lost, requeueing job {job_id}")
+                job.state = "pending"
+                job.worker = None
+                self.queue.appendleft(job)
+            self.cond.notify_all()
+
+    def progress(self, job_id: str, event: dict):
+        with self.cond:
+            self.jobs[job_id].events.append(event)
+
+    def upload(self, job_id: str, name: str, offset: int, data: str):
+        """
+        Writes a chunk of an artifact of a job.
+
+        Args:
+          job_id (str): The job id.
+          name (str): The file name.
+          offset (int): The position of the chunk in the file.
+          data (str): The chunk (base64).
+        """
+        job_id = self.jobs[job_id].id
+        jobdir = self.outdir / job_id
+        jobdir.mkdir(parents=True, exist_ok=True)
+        with (jobdir / Path(name).name).open("r+b" if offset else "wb") as f:
+            f.seek(offset)
+            f.write(base64.b64decode(data))
+
+    def done(self, job_id: str, returncode: int, files: list, links: dict):
+        """
+        Stores the result of a job and links its uploaded artifacts.
+
+        Args:
+          job_id (str): The job id.
+          returncode (int): The build return code.
+          files (List[str]): The names of the uploaded artifacts.
+          links (dict): The latest-* links by link name.
+        """
+        jobdir = self.outdir / job_id
+        jobdir.mkdir(parents=True, exist_ok=True)
+        for link, target in links.items():
+            dst = jobdir / Path(link).name
+            if dst.is_symlink() or dst.exists():
+                dst.unlink()
+            dst.symlink_to(Path(target).name)
+        with self.cond:
+            job = self.jobs[job_id]
+            job.returncode = returncode
+            job.state = "done" if returncode == 0 else "failed"
+            job.artifacts = sorted(list(files) + list(links))
+            job.finished = time.time()
+            if self.active.get(job.key) is job:
+                del self.active[job.key]
+            self.cond.notify_all()
+
+    def wait(self, job_id: str, timeout: float = None) -> Job:
+        """
+        Waits until a job finished.
+
+        Args:
+          job_id (str): The job id.
+          timeout (float, optional): Seconds to wait. Defaults to None.
+
+        Returns:
+          Job: The job, finished unless the timeout expired.
+        """
+        with self.cond:
+            job = self.jobs[job_id]
+            self.cond.wait_for(lambda: job.state in ["done", "failed"],
+                               timeout)
+        return job
+
+    def handle(self, msg: dict, owned: set = None) -> dict:
+        """
+        Answers one protocol message.
+
+        Args:
+          msg (dict): The message.
+          owned (set, optional): The ids of the jobs fetched over the
+              connection of the message. Defaults to None.
+
+        Returns:
+          dict: The reply.
+        """
+        op = msg["op"]
+        if op == "submit":
+            job, coalesced = self.submit(msg["request"])
+            return {"job": job.id, "coalesced": coalesced}
+        if op == "status":
+            with self.cond:
+                return self.jobs[msg["job"]].to_dict()
+        if op == "fetch":
+            job = self.fetch(msg["worker"], msg.get("timeout", 0))
+            if job is None:
+                return {"job": None}
+            if owned is not None:
+                owned.add(job.id)
+            return {"job": job.to_dict()}
+        if op == "progress":
+            self.progress(msg["job"], msg["event"])
+            return {}
+        if op == "upload":
+            self.upload(msg["job"], msg["name"], msg["offset"], msg["data"])
+            return {}
+        if op == "done":
+            self.done(msg["job"], msg["returncode"], msg.get("files", []),
+                      msg.get("links", {}))
+            if owned is not None:
+                owned.discard(msg["job"])
+            return {}
+        raise ValueError(f"unknown op {op}")
+
+
+class Connection:
+    def __init__(self, address):
+        """
+        Initializes a Connection object, a client of the coordinator.
+
+        Args:
+          address (Tuple[str, int]): Host and port of the coordinator.
+        """
+        self.sock = socket.create_connection(address)
+        self.file = self.sock.makefile("rw")
+
+    def call(self, op: str, **kwargs) -> dict:
+        """
+        Sends a message and returns the reply.
+
+        Args:
+          op (str): The operation.
+
+        Returns:
+          dict: The reply.
+        """
+        kwargs["op"] = op
+        self.file.write(json.dumps(kwargs) + "\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("coordinator closed the connection")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+class Worker:
+    def __init__(self, address, repo: Path, workdir: Path, name: str = None):
+        """
+        Initializes a Worker object.
+
+        A worker builds the jobs of a coordinator from its own checkout of
+        the repository. Jobs for a git revision are built in a detached
+        worktree of that revision, jobs without one in the checkout.
+
+        Args:
+          address (Tuple[str, int]): Host and port of the coordinator.
+          repo (Path): The repository checkout.
+          workdir (Path): Worktrees and build directories are created here.
+          name (str, optional): The worker name. Defaults to host:pid.
+        """
+        self.address = address
+        self.repo = Path(repo).resolve()
+        self.workdir = Path(workdir).resolve()
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.conn = None
+
+    def _source(self, rev: str) -> Path:
+        if not rev:
+            return self.repo
+        # a branch moves, the worktree of a commit never changes
+        sha = resolve_rev(self.repo, rev)
+        tree = self.workdir / "src" / sha
+        if not tree.is_dir():
+            subprocess.run(["git", "-C", str(self.repo), "worktree", "add",
+                            "--detach", str(tree), sha], check=True)
+        return tree
+
+    def _upload(self, job_id: str, prj: Project):
+        """
+        Uploads the latest-* artifacts of a build in chunks.
+
+        Args:
+          job_id (str): The job id.
+          prj (Project): The project of the build.
+
+        Returns:
+          Tuple[List[str], dict]: The uploaded file names and the latest-*
+          links.
+        """
+        deploy = prj.outdir / "deploy"
+        files = []
+        links = {}
+        for link in sorted(deploy.glob(f"latest-{prj.name}.*")):
+            if not (link.is_symlink() and link.resolve().is_file()):
+                continue
+            target = link.resolve()
+            links[link.name] = target.name
+            files.append(target.name)
+            offset = 0
+            with target.open("rb") as f:
+                while True:
+                    data = f.read(CHUNK)
+                    if not data and offset:
+                        break
+                    self.conn.call("upload", job=job_id, name=target.name,
+                                   offset=offset,
+                                   data=base64.b64encode(data).decode())
+                    offset += len(data)
+                    if not data:
+                        break
+        return files, links
+
+    def build(self, job: dict):
+        """
+        Builds one job and reports its progress.
+
+        Args:
+          job (dict): The job as handed out by the coordinator.
+
+        Returns:
+          Tuple[int, List[str], dict]: The return code, the uploaded
+          artifacts and the latest-* links.
+        """
+        request = job["request"]
+        src = self._source(request.get("rev"))
+        # paths in the project files and the git generics are relative to
+        # the repository root, like for a local build
+        cwd = os.getcwd()
+        os.chdir(src)
+        try:
+            outdir = self.workdir / "jobs" / job["job"]
+            prj = Project(src / request["yaml"], outdir)
+            builder = Vivado
+            if request.get("mode") == "non_project":
+                builder = NonProjectVivado
+
+            def report(ev):
+                self.conn.call("progress", job=job["job"], event={
+                    "kind": ev.kind, "stage": ev.stage,
+                    "message": ev.message, "time": ev.time,
+                })
+
+            viv = builder(prj, "vhdl", callbacks=[report])
+            code = viv.build(request.get("syn", True),
+                             request.get("impl", True),
+                             log=outdir / f"{prj.name}.log")
+        finally:
+            os.chdir(cwd)
+        files, links = self._upload(job["job"], prj)
+        return code, files, links
+
+    def run(self, max_jobs: int = None, idle: float = None,
+            poll: float = 1.0):
+        """
+        Fetches and builds jobs until stopped.
+
+        Args:
+          max_jobs (int, optional): Stop after this many jobs.
+              Defaults to None.
+          idle (float, optional): Stop after this many seconds without a
+              job. Defaults to None.
+          poll (float, optional): Seconds a fetch waits for a job.
+              Defaults to 1.0.
+
+        Returns:
+          int: The number of jobs built.
+        """
+        self.conn = Connection(self.address)
+        built = 0
+        last = time.monotonic()
+        try:
+            while max_jobs is None or built < max_jobs:
+                job = self.conn.call("fetch", worker=self.name,
+                                     timeout=poll)["job"]
+                if job is None:
+                    if idle is not None and time.monotonic() - last > idle:
+                        break
+                    continue
+                print(f"{self.name}: building job {job['job']}")
+                try:
+                    code, files, links = self.build(job)
+                except Exception as e:
+                    print(f"{self.name}: job {job['job']} failed: {e}")
+                    code, files, links = 1, [], {}
+                self.conn.call("done", job=job["job"], returncode=code,
+                               files=files, links=links)
+                built += 1
+                last = time.monotonic()
+        finally:
+            self.conn.close()
+        return built
+
+
+def submit(address, yaml: str, rev: str = None, syn=True, impl=True,
+           mode: str = "project") -> dict:
+    """
+    Submits a build request to a coordinator.
+
+    Args:
+      address (Tuple[str, int]): Host and port of the coordinator.
+      yaml (str): The project YAML, relative to the repository root.
+      rev (str, optional): The git revision. Defaults to None (the
+          workers' checkout).
+      syn (bool, optional): Run synthesis. Defaults to True.
+      impl (bool, optional): Run implementation. Defaults to True.
+      mode (str, optional): "project" or "non_project".
+          Defaults to "project".
+
+    Returns:
+      dict: The job id and whether the request was coalesced.
+    """
+    conn = Connection(address)
+    try:
+        return conn.call("submit", request={
+            "yaml": yaml, "rev": rev, "syn": syn, "impl": impl,
+            "mode": mode,
+        })
+    finally:
+        conn.close()
+
+
+def _address(s: str):
+    host, port = s.rsplit(":", 1)
+    return host, int(port)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Distributed FPGA builds")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("coordinator", help="Run the job queue")
+    p.add_argument("--listen", type=str, default="127.0.0.1:7373")
+    p.add_argument("-o", "--output", type=str, default="artifacts",
+                   help="Artifact directory")
+    p.add_argument("--repo", type=str,
+                   help="Resolve the revisions of the requests in this "
+                        "repository")
+    p = sub.add_parser("worker", help="Build jobs of a coordinator")
+    p.add_argument("--connect", type=str, required=True)
+    p.add_argument("--repo", type=str, default=".")
+    p.add_argument("--workdir", type=str, default=".xb_worker")
+    p.add_argument("--max-jobs", type=int)
+    p.add_argument("--idle", type=float)
+    p = sub.add_parser("submit", help="Submit a build request")
+    p.add_argument("--connect", type=str, required=True)
+    p.add_argument("yaml", type=str)
+    p.add_argument("--rev", type=str)
+    p.add_argument("-m", "--mode", choices=["project", "non_project"],
+                   default="project")
+    p.add_argument("--synth-only", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.cmd == "coordinator":
+        host, port = _address(args.listen)
+        coordinator = Coordinator(Path(args.output), host, port,
+                                  Path(args.repo) if args.repo else None)
+        print(f"listening on {host}:{coordinator.address[1]}")
+        coordinator.server.serve_forever()
+    elif args.cmd == "worker":
+        worker = Worker(_address(args.connect), Path(args.repo),
+                        Path(args.workdir))
+        worker.run(max_jobs=args.max_jobs, idle=args.idle)
+    else:
+        print(submit(_address(args.connect), args.yaml, args.rev,
+                     impl=not args.synth_only, mode=args.mode))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+import os
+import threading
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePosixPath
+
+MAGIC = set("*?[")
+
+
+def _is_magic(part: str) -> bool:
+    return any(c in MAGIC for c in part)
+
+
+class FileIndex:
+    """
+    Directory listing cache resolving the glob patterns of project files.
+
+    Every directory is read with a single os.scandir call and its entries
+    are kept in memory, so patterns sharing directories (or recursive **
+    patterns over a large tree) do not walk the file system again. A
+    listing is only read again when the mtime of its directory changed,
+    which happens whenever an entry is added, removed or renamed.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._dirs = {}
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    @classmethod
+    def shared(cls):
+        """
+        Returns the index shared by all Project objects of the process.
+
+        Returns:
+          FileIndex: The shared index.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def mtime(d: str):
+        """
+        Returns the mtime of a directory, None if it does not exist.
+
+        Args:
+          d (str): The directory.
+
+        Returns:
+          int: The mtime in ns.
+        """
+        try:
+            return os.stat(d).st_mtime_ns
+        except OSError:
+            return None
+
+    def _listing(self, d: str, watch: dict = None):
+        """
+        Returns the subdirectories and files of a directory.
+
+        Args:
+          d (str): The directory.
+          watch (dict, optional): Records the mtime of the directory.
+              Defaults to None.
+
+        Returns:
+          Tuple[List[str], List[str]]: The directory and file names.
+        """
+        mtime = self.mtime(d)
+        if watch is not None:
+            watch[d] = mtime
+        if mtime is None:
+            return [], []
+        with self._lock:
+            hit = self._dirs.get(d)
+        if hit is not None and hit[0] == mtime:
+            return hit[1], hit[2]
+        dirs = []
+        files = []
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    try:
+                        if e.is_dir():
+                            dirs.append(e.name)
+                        else:
+                            files.append(e.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return [], []
+        dirs.sort()
+        files.sort()
+        with self._lock:
+            self._dirs[d] = (mtime, dirs, files)
+            self.scans += 1
+        return dirs, files
+
+    def _match(self, d: str, parts, out: dict, watch: dict):
+        part, rest = parts[0], parts[1:]
+        dirs, files = self._listing(d, watch)
+        if part == "**":
+            if rest:
+                self._match(d, rest, out, watch)
+            for name in dirs:
+                sub = os.path.join(d, name)
+                # do not follow symlinked directories, they may loop
+                if not os.path.islink(sub):
+                    self._match(sub, parts, out, watch)
+            return
+        if not rest:
+            if _is_magic(part):
+                for name in files:
+                    if fnmatchcase(name, part):
+                        out[os.path.join(d, name)] = None
+            elif part in files:
+                out[os.path.join(d, part)] = None
+            return
+        if _is_magic(part):
+            for name in dirs:
+                if fnmatchcase(name, part):
+                    self._match(os.path.join(d, name), rest, out, watch)
+        elif part in dirs:
+            self._match(os.path.join(d, part), rest, out, watch)
+
+    def glob(self, root: Path, pattern: str):
+        """
+        Returns the files matching a pattern, like Path.glob but sorted and
+        without directories.
+
+        Args:
+          root (Path): The directory the pattern is relative to.
+          pattern (str): The glob pattern, e.g. "./hdl/**/*.vhd".
+
+        Returns:
+          List[Path]: The matching files.
+        """
+        return self.resolve(root, [pattern])
+
+    def resolve(self, root: Path, patterns, watch: dict = None):
+        """
+        Resolves several patterns at once. Files matched by more than one
+        pattern are returned once, at the position of their first match.
+
+        Args:
+          root (Path): The directory the patterns are relative to.
+          patterns (List[str]): The glob patterns.
+          watch (dict, optional): Filled with the mtime of every directory
+              the result depends on. Defaults to None.
+
+        Returns:
+          List[Path]: The matching files.
+        """
+        out = {}
+        for pattern in patterns:
+            parts = [p for p in PurePosixPath(pattern).parts if p != "."]
+            if not parts:
+                continue
+            base = Path(root)
+            # the literal prefix is joined, not matched, which also keeps
+            # ".." and absolute paths working
+            while len(parts) > 1 and not _is_magic(parts[0]):
+                base = base / parts[0]
+                parts = parts[1:]
+            self._match(str(base), parts, out, watch)
+        return [Path(p) for p in out]
+
+    def clear(self):
+        """
+        Drops all cached listings.
+        """
+        with self._lock:
+            self._dirs.clear()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from xil_builder.project import Project
+
+TCL_DIR = Path(__file__).parent / "tcl"
+
+# (path, mtime_ns, size) -> sha256 hex digest
+_HASH_MEMO = {}
+
+
+def hash_file(path: Path) -> str:
+    """
+    Returns the sha256 hex digest of a file's content.
+
+    Digests are memoized per process on (path, mtime, size), so hashing
+    the same unchanged file twice only reads it once.
+
+    Args:
+      path (Path): The file to hash.
+
+    Returns:
+      str: The hex digest.
+    """
+    p = Path(path)
+    st = p.stat()
+    memo_key = (str(p.resolve()), st.st_mtime_ns, st.st_size)
+    digest = _HASH_MEMO.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with p.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _HASH_MEMO[memo_key] = digest
+    return digest
+
+
+def hash_tree(path: Path) -> str:
+    """
+    Returns a digest over all files below a directory (names and content).
+
+    Args:
+      path (Path): The directory to hash. A missing directory hashes to
+          the digest of an empty tree.
+
+    Returns:
+      str: The hex digest.
+    """
+    h = hashlib.sha256()
+    root = Path(path)
+    if root.is_dir():
+        for f in sorted(p for p in root.rglob("*") if p.is_file()):
+            h.update(f.relative_to(root).as_posix().encode())
+            h.update(hash_file(f).encode())
+    elif root.is_file():
+        h.update(hash_file(root).encode())
+    return h.hexdigest()
+
+
+def hash_data(data) -> str:
+    """
+    Returns a digest of a JSON serializable object.
+
+    Args:
+      data: The object to hash.
+
+    Returns:
+      str: The hex digest.
+    """
+    blob = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def tool_version() -> str:
+    """
+    Returns the Vivado version in use without starting Vivado.
+
+    The version is taken from the XILINX_VIVADO environment variable set by
+    the Vivado settings script (e.g. /tools/Xilinx/Vivado/2023.1).
+
+    Returns:
+      str: The tool version or "unknown".
+    """
+    install = os.environ.get("XILINX_VIVADO")
+    if not install:
+        return "unknown"
+    return Path(install).name
+
+
+def file_entries(prj: Project, files) -> list:
+    """
+    Returns the fingerprint entries of a list of source files.
+
+    Paths are stored relative to the project root so that the same sources
+    checked out in different workspaces produce the same entries.
+
+    Args:
+      prj (Project): The project the files belong to.
+      files (List[SrcFile]): The source files.
+
+    Returns:
+      list: One [path, type, digest] entry per file.
+    """
+    entries = []
+    for s in files:
+        p = s.get_path()
+        try:
+            rel = p.resolve().relative_to(prj.root.resolve()).as_posix()
+        except ValueError:
+            rel = p.resolve().as_posix()
+        entries.append([rel, s.get_type().name, hash_file(p)])
+    return entries
+
+
+def template_digest() -> str:
+    """
+    Returns a digest over the packaged Tcl templates.
+
+    Returns:
+      str: The hex digest.
+    """
+    return hash_tree(TCL_DIR)
+
+
+def project_fingerprint(prj: Project, extra: dict = None) -> str:
+    """
+    Computes the fingerprint of a fully resolved project.
+
+    The fingerprint covers the YAML file, the content of every source file,
+    generics, synthesis and implementation arguments, the part, the packaged
+    Tcl templates and the tool version. Any change to one of them yields a
+    different fingerprint.
+
+    Args:
+      prj (Project): The project to fingerprint.
+      extra (dict, optional): Additional build inputs (e.g. language or git
+          revision) to include. Defaults to None.
+
+    Returns:
+      str: The hex digest.
+    """
+    data = {
+        "yaml": hash_file(prj.yaml),
+        "name": prj.name,
+        "part": prj.part,
+        "top": prj.top,
+        "generics": prj.generics,
+        "syn_args": prj.syn_args,
+        "impl_args": prj.impl_args,
+        "external_libs": [
+            hash_tree(Path(lib)) for lib in prj.external_libs or []
+        ],
+        "bd_files": file_entries(prj, prj.bd_files),
+        "ip_files": file_entries(prj, prj.ip_files),
+        "xdc_files": file_entries(prj, prj.xdc_files),
+        "libraries": [
+            [lib.get_name(), file_entries(prj, lib.get_files())]
+            for lib in prj.libs
+        ],
+        "templates": template_digest(),
+        "tool": tool_version(),
+        "extra": extra,
+    }
+    return hash_data(data)
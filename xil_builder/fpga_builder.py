@@ -1,7 +1,20 @@
 import argparse
 from pathlib import Path
+from xil_builder.artifacts import ArtifactStore
+from xil_builder.cache import BuildCache
+from xil_builder.ipcache import IpCache
+from xil_builder.pipeline import Pipeline
+from xil_builder.preflight import PreflightError, preflight
+from xil_builder.profile import BuildProfile
+from xil_builder.progress import ConsoleReporter
 from xil_builder.project import Project
-from xil_builder.vivado import Vivado, Petalinux
+from xil_builder.reports import ResultsDB
+from xil_builder.resources import ResourceLedger
+from xil_builder.sampler import ResourceSampler
+from xil_builder.sweep import StrategySweep
+from xil_builder.vivado import Vivado, NonProjectVivado, Petalinux
+from xil_builder.watch import Watch
+from xil_builder.workspace import Workspace
 import logging
 
 
@@ -10,6 +23,63 @@ def parse_arguments():
     parser.add_argument("-o", "--output", type=str, help="Output directory")
     parser.add_argument("-c", "--config", type=str, help="Config file")
     parser.add_argument("-d", "--debug", action="store_true", help="Debugging")
+    parser.add_argument("-m", "--mode", choices=["project", "non_project"],
+                        default="project", help="Vivado flow")
+    parser.add_argument("-w", "--workspace", type=str, nargs="+",
+                        help="Build several config files as a workspace")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Concurrent Vivado instances (workspace, sweep)")
+    parser.add_argument("--sweep", type=int, nargs="?", const=0,
+                        help="Implementation strategy sweep with N runs "
+                             "(default: all strategies)")
+    parser.add_argument("--progress", action="store_true",
+                        help="Report build phases and ETA")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="Abort a build on the first ERROR")
+    parser.add_argument("--hdl-deps", action="store_true",
+                        help="Compile order and pruning of unused HDL files "
+                             "by the Python dependency scanner")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Import the XSA into petalinux and rebuild "
+                             "only what its changes require")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Build petalinux while Vivado runs")
+    parser.add_argument("--vivado-cpus", type=int,
+                        help="CPUs reserved for Vivado in pipeline mode")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a time and memory profile of all stages")
+    parser.add_argument("--sample", type=float, nargs="?", const=1.0,
+                        help="Sample CPU, memory and I/O of all build "
+                             "processes every N seconds (default: 1)")
+    parser.add_argument("--watch", nargs="?", const="impl",
+                        choices=["synth", "impl"],
+                        help="Rebuild up to synth or impl (default) whenever "
+                             "a project file changes")
+    parser.add_argument("--preflight", action="store_true",
+                        help="Validate the project before starting Vivado")
+    parser.add_argument("--project-cache", action="store_true",
+                        help="Cache the resolved project in the output "
+                             "directory")
+    parser.add_argument("--cache", type=str, help="Build cache directory")
+    parser.add_argument("--cache-size", type=int, default=10240,
+                        help="Build cache size limit in MiB")
+    parser.add_argument("--ip-cache", type=str,
+                        help="IP cache directory shared by all projects")
+    parser.add_argument("--ip-cache-size", type=int, default=20480,
+                        help="IP cache size limit in MiB")
+    parser.add_argument("--keep-builds", type=int,
+                        help="Deduplicate the deploy artifacts and keep the "
+                             "last N builds")
+    parser.add_argument("--deploy-size", type=int,
+                        help="Deduplicate the deploy artifacts and limit "
+                             "them to this size in MiB")
+    parser.add_argument("--admission", type=str, nargs="?", const="",
+                        help="Start Vivado only when the CPUs and memory "
+                             "reserved in this ledger file (default: in the "
+                             "temp directory) allow it")
+    parser.add_argument("--results-db", type=str,
+                        help="SQLite database the timing, utilization and "
+                             "runtime results of the build are stored in")
     return parser.parse_args()
 
 
@@ -24,6 +94,33 @@ if __name__ == "__main__":
         )
         output_dir = Path.cwd()
 
+    builder = Vivado if args.mode == "project" else NonProjectVivado
+    cache = None
+    if args.cache is not None:
+        cache = BuildCache(Path(args.cache), args.cache_size * 2**20)
+    ip_cache = None
+    if args.ip_cache is not None:
+        ip_cache = IpCache(Path(args.ip_cache), args.ip_cache_size * 2**20)
+
+    resources = None
+    if args.admission is not None:
+        resources = ResourceLedger(Path(args.admission) if args.admission
+                                   else None)
+
+    if args.workspace is not None:
+        ws = Workspace([Path(c) for c in args.workspace], output_dir,
+                       jobs=args.jobs, cache=cache, debug=debug,
+                       builder=builder, ip_cache=ip_cache,
+                       resources=resources,
+                       project_cache=args.project_cache)
+        results = ws.build(True, True)
+        ws.print_results(results)
+        if cache is not None:
+            cache.print()
+        if ip_cache is not None:
+            ip_cache.print()
+        exit(int(any(r.status != "ok" for r in results)))
+
     try:
         config_file = Path(args.config)
     except TypeError:
@@ -33,12 +130,112 @@ if __name__ == "__main__":
     if not config_file.exists():
         raise FileNotFoundError("Config file not found")
 
-    prj_def = Project(config_file, output_dir, debug=debug)
+    prj_def = Project(config_file, output_dir, debug=debug,
+                      use_cache=args.project_cache)
+    if args.preflight:
+        errors = preflight(prj_def)
+        if errors:
+            print(PreflightError(errors))
+            exit(1)
 
-    prj = Vivado(prj_def, 'vhdl')
-    ret = prj.build(True, True)
+    callbacks = [ConsoleReporter()] if args.progress else None
+    profile = None
+    if args.profile:
+        profile = BuildProfile(
+            prj_def.outdir / "deploy" / f"{prj_def.name}_profile.json"
+        )
+    sampler = None
+    if args.sample is not None:
+        sampler = ResourceSampler(
+            prj_def.outdir / "deploy" / f"{prj_def.name}_resources.json",
+            interval=args.sample,
+        )
+    artifacts = None
+    if args.keep_builds is not None or args.deploy_size is not None:
+        max_bytes = None
+        if args.deploy_size is not None:
+            max_bytes = args.deploy_size * 2**20
+        artifacts = ArtifactStore(prj_def.outdir / "deploy",
+                                  keep_last=args.keep_builds,
+                                  max_bytes=max_bytes)
+    if args.watch is not None:
+        watch = Watch(config_file, output_dir, builder=builder,
+                      goal=args.watch, debug=debug, cache=cache,
+                      callbacks=callbacks, fail_fast=args.fail_fast,
+                      profile=profile, hdl_deps=args.hdl_deps,
+                      ip_cache=ip_cache, artifacts=artifacts,
+                      resources=resources, sampler=sampler,
+                      preflight=args.preflight)
+        try:
+            watch.run()
+        except KeyboardInterrupt:
+            pass
+        exit(0)
+    # the runs of a project log their runtimes to runme.log, a non-project
+    # flow only to the Vivado log
+    vivado_log = None
+    if args.results_db is not None and builder is NonProjectVivado:
+        vivado_log = prj_def.outdir / f"{prj_def.name}.vivado.log"
+    prj = builder(prj_def, 'vhdl', cache=cache, callbacks=callbacks,
+                  fail_fast=args.fail_fast, profile=profile,
+                  hdl_deps=args.hdl_deps, ip_cache=ip_cache,
+                  artifacts=artifacts, resources=resources,
+                  sampler=sampler, vivado_log=vivado_log)
+    if args.pipeline:
+        peta = Petalinux(prj_def, callbacks=callbacks,
+                         fail_fast=args.fail_fast, profile=profile,
+                         sampler=sampler)
+        pipe = Pipeline(prj, peta, vivado_cpus=args.vivado_cpus,
+                        incremental=args.incremental)
+        ret = pipe.build()
+        if profile is not None:
+            profile.print()
+        if sampler is not None:
+            sampler.print()
+        exit(ret)
+    if args.sweep is not None:
+        ret = prj.build(True, False)
+        if ret:
+            exit(ret)
+        sweep = StrategySweep(prj_def, prj.synth_checkpoint(),
+                              runs=args.sweep or None,
+                              jobs=args.jobs if args.jobs > 1 else None,
+                              artifacts=artifacts, git_sha=prj.git_sha)
+        ret = int(sweep.build() is None)
+    else:
+        ret = prj.build(True, True)
+    if args.results_db is not None:
+        results_db = ResultsDB(Path(args.results_db))
+        if prj.cache_hit:
+            print("build cache hit, no results recorded")
+        elif ret:
+            # the reports on disk belong to an earlier build
+            results_db.record(prj_def.name, {}, git_sha=prj.git_sha,
+                              status=ret)
+        else:
+            results_db.record_project(prj_def, vivado_log,
+                                      git_sha=prj.git_sha, status=ret,
+                                      since=prj.started)
+        results_db.print(prj_def.name)
+        results_db.close()
+    if cache is not None:
+        cache.print()
+    if ip_cache is not None:
+        ip_cache.print()
+    if artifacts is not None:
+        artifacts.print()
     if ret:
+        if sampler is not None:
+            sampler.print()
         exit(ret)
 
-    peta = Petalinux(prj_def)
-    peta.build()
+    peta = Petalinux(prj_def, callbacks=callbacks, fail_fast=args.fail_fast,
+                     profile=profile, sampler=sampler)
+    if args.incremental:
+        peta.build(reconfigure=True, package=True, incremental=True)
+    else:
+        peta.build()
+    if profile is not None:
+        profile.print()
+    if sampler is not None:
+        sampler.print()
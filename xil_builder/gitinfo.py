@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+from pathlib import Path
+from subprocess import run, PIPE, DEVNULL
+
+
+class GitSnapshot:
+    def __init__(self, sha: str, describe: str, branch: str, dirty: bool):
+        """
+        Initializes a GitSnapshot object.
+
+        Args:
+          sha (str): The full commit hash of HEAD.
+          describe (str): The output of git describe --always.
+          branch (str): The current branch, empty if detached.
+          dirty (bool): Whether a source file of the project differs from
+              HEAD.
+        """
+        self.sha = sha
+        self.describe = describe
+        self.branch = branch
+        self.dirty = dirty
+
+    @property
+    def short_sha(self) -> str:
+        return self.sha[0:8]
+
+    @property
+    def revision(self) -> str:
+        """
+        The revision as reported by git describe --always --dirty.
+        """
+        return self.describe + ("-dirty" if self.dirty else "")
+
+    def to_dict(self) -> dict:
+        return {"sha": self.sha, "describe": self.describe,
+                "branch": self.branch, "dirty": self.dirty}
+
+    def tcl(self) -> str:
+        """
+        Returns the Tcl variables the git procedures of the flows use.
+
+        Returns:
+          str: The set commands.
+        """
+        branch = self.branch.replace("/", "-")
+        return (f"set GIT_SHA {{{self.short_sha}}}\n"
+                f"set GIT_REV {{{self.revision}}}\n"
+                f"set GIT_BRANCH {{{branch}}}\n")
+
+
+def _git(args, cwd=None) -> str:
+    code = run(["git"] + args, cwd=cwd, stdout=PIPE, stderr=DEVNULL,
+               text=True)
+    if code.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args[0:2])} failed, "
+                           f"is {Path(cwd or '.').resolve()} a git "
+                           "repository?")
+    return code.stdout
+
+
+def _head_branch(git_dir: Path) -> str:
+    # reading HEAD is cheaper than starting git branch --show-current
+    head = (git_dir / "HEAD").read_text().strip()
+    if head.startswith("ref: refs/heads/"):
+        return head[len("ref: refs/heads/"):]
+    return ""
+
+
+def _stat(path: Path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _cache_key(git_dir: Path, sha: str, sources) -> str:
+    h = hashlib.sha256()
+    state = [
+        sha,
+        (git_dir / "HEAD").read_text(),
+        # a refreshed index or a new tag may change the snapshot
+        _stat(git_dir / "index"),
+        _stat(git_dir / "packed-refs"),
+        _stat(git_dir / "refs" / "tags"),
+    ]
+    h.update(json.dumps(state).encode())
+    for p in sources:
+        h.update(f"{p}\0{_stat(p)}\0".encode())
+    return h.hexdigest()
+
+
+def _pathspecs(top: Path, sources):
+    # the directories of the sources, nested ones are covered by a parent
+    dirs = sorted({p.parent for p in sources})
+    specs = []
+    for d in dirs:
+        if specs and d.is_relative_to(specs[-1]):
+            continue
+        specs.append(d)
+    return [d.relative_to(top).as_posix() or "." for d in specs]
+
+
+def _dirty(top: Path, sources) -> bool:
+    """
+    Checks the sources for modifications against HEAD.
+
+    Only the directories of the sources are scanned, untracked sources
+    count as modified, changes to other files of the repository are
+    ignored.
+
+    Args:
+      top (Path): The top level directory of the working tree.
+      sources (List[Path]): The resolved sources inside the working tree.
+
+    Returns:
+      bool: True if a source is modified, staged or untracked.
+    """
+    if not sources:
+        return False
+    names = {p.relative_to(top).as_posix() for p in sources}
+    out = _git(["status", "--porcelain", "-z", "--untracked-files=all",
+                "--"] + _pathspecs(top, sources), cwd=top)
+    entries = out.split("\0")
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        i += 1
+        if len(entry) < 4:
+            continue
+        if entry[0] in "RC":
+            # renames are followed by the original path
+            if entries[i] in names:
+                return True
+            i += 1
+        if entry[3:] in names:
+            return True
+    return False
+
+
+def snapshot(sources=(), cache_file: Path = None, cwd=None) -> GitSnapshot:
+    """
+    Collects the git metadata of a build in one go.
+
+    The dirty state only covers the given sources. The snapshot is stored
+    in the cache file and reused as long as HEAD, the index, the tags and
+    the stat information of every source are unchanged.
+
+    Args:
+      sources (List[Path], optional): The files the dirty state is
+          checked for. Sources outside the working tree are ignored.
+          Defaults to ().
+      cache_file (Path, optional): The file the snapshot is cached in.
+          Defaults to None (no caching).
+      cwd (Path, optional): A directory inside the working tree. Defaults
+          to the current directory.
+
+    Returns:
+      GitSnapshot: The snapshot.
+    """
+    git_dir, top, sha = _git(
+        ["rev-parse", "--absolute-git-dir", "--show-toplevel", "HEAD"],
+        cwd=cwd).splitlines()
+    git_dir, top = Path(git_dir), Path(top).resolve()
+    resolved = []
+    for p in sources:
+        p = Path(cwd or ".", p).resolve()
+        if p.is_relative_to(top):
+            resolved.append(p)
+    resolved = sorted(set(resolved))
+
+    key = _cache_key(git_dir, sha, resolved)
+    if cache_file is not None and Path(cache_file).is_file():
+        try:
+            cached = json.loads(Path(cache_file).read_text())
+            if cached.get("key") == key:
+                return GitSnapshot(**cached["snapshot"])
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+
+    snap = GitSnapshot(
+        sha=sha,
+        describe=_git(["describe", "--always"], cwd=top).strip(),
+        branch=_head_branch(git_dir),
+        dirty=_dirty(top, resolved),
+    )
+    if cache_file is not None:
+        # git status refreshes the index, the key has to be taken after it
+        key = _cache_key(git_dir, sha, resolved)
+        tmp = Path(cache_file).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"key": key, "snapshot": snap.to_dict()}))
+        os.replace(tmp, cache_file)
+    return snap
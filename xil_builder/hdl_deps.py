@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from xil_builder.library import FType
+
+VHDL_COMMENT = re.compile(r"--[^\n]*")
+VHDL_ENTITY = re.compile(r"^\s*entity\s+(\w+)\s+is\b", re.I | re.M)
+VHDL_PACKAGE = re.compile(r"^\s*package\s+(\w+)\s+is\b", re.I | re.M)
+VHDL_BODY = re.compile(r"^\s*package\s+body\s+(\w+)\s+is\b", re.I | re.M)
+VHDL_ARCH = re.compile(r"^\s*architecture\s+\w+\s+of\s+(\w+)\s+is\b",
+                       re.I | re.M)
+VHDL_USE = re.compile(r"\buse\s+(\w+)\.(\w+)", re.I)
+VHDL_INST = re.compile(r"\bentity\s+(\w+)\.(\w+)", re.I)
+VHDL_COMP = re.compile(
+    r"\b\w+\s*:\s*(?:component\s+)?(\w+)\s+(?:generic|port)\s+map\b", re.I
+)
+
+VERILOG_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+VERILOG_MODULE = re.compile(r"\bmodule\s+(\w+)")
+VERILOG_INST = re.compile(
+    r"^\s*(\w+)\s*(?:#\s*\((?:[^()]|\([^()]*\))*\)\s*)?\w+\s*\(", re.M
+)
+
+
+@lru_cache(maxsize=None)
+def _scan(path: str, type: FType, mtime_ns: int, size: int):
+    text = Path(path).read_text(errors="replace")
+    provides = set()
+    requires = set()
+    if type == FType.VHDL:
+        text = VHDL_COMMENT.sub("", text)
+        provides.update(m.lower() for m in VHDL_ENTITY.findall(text))
+        provides.update(m.lower() for m in VHDL_PACKAGE.findall(text))
+        for name in VHDL_BODY.findall(text) + VHDL_ARCH.findall(text):
+            requires.add((None, name.lower()))
+        for lib, name in VHDL_USE.findall(text) + VHDL_INST.findall(text):
+            requires.add((lib.lower(), name.lower()))
+        requires.update((None, m.lower()) for m in VHDL_COMP.findall(text))
+    else:
+        text = VERILOG_COMMENT.sub("", text)
+        provides.update(VERILOG_MODULE.findall(text))
+        # keywords and types are matched as well, they are dropped
+        # because no file provides them
+        requires.update((None, m) for m in VERILOG_INST.findall(text))
+    return frozenset(provides), frozenset(requires)
+
+
+def scan(src) -> tuple:
+    """
+    Extracts the design units a file provides and requires.
+
+    VHDL files provide entities and packages and require the units named
+    in use clauses, direct entity instantiations, component
+    instantiations, architectures and package bodies. Verilog files
+    provide modules and require the instantiated modules. The result is
+    cached while the file is unchanged.
+
+    Args:
+      src (SrcFile): The source file.
+
+    Returns:
+      Tuple[Set[str], Set[Tuple[str, str]]]: The provided unit names and
+      the required (library, unit) pairs, library None if not given.
+    """
+    path = src.get_path()
+    st = os.stat(path)
+    return _scan(str(path), src.get_type(), st.st_mtime_ns, st.st_size)
+
+
+class DependencyGraph:
+    HDL = [FType.VHDL, FType.VERILOG, FType.SYSTEMVERILOG]
+
+    def __init__(self, libs):
+        """
+        Initializes a DependencyGraph object.
+
+        Args:
+          libs (List[Library]): The libraries of the project.
+        """
+        # (library name, SrcFile) in project order
+        self.files = []
+        self.units = {}
+        self.by_name = {}
+        for lib in libs:
+            libname = lib.get_name()
+            for src in lib.get_files():
+                if src.get_type() not in self.HDL:
+                    continue
+                idx = len(self.files)
+                self.files.append((libname, src))
+                provides, _ = scan(src)
+                for name in provides:
+                    key = (libname.lower(), name.lower())
+                    self.units.setdefault(key, idx)
+                    self.by_name.setdefault(name.lower(), []).append(idx)
+        self.deps = [self._deps(i) for i in range(len(self.files))]
+
+    def _lookup(self, own_lib: str, lib: str, name: str):
+        if lib is None or lib == "work":
+            lib = own_lib
+        idx = self.units.get((lib, name))
+        if idx is not None:
+            return idx
+        if lib != own_lib:
+            # ieee, unisim, ... or a library not part of the project
+            return None
+        # components and modules may live in any library
+        candidates = self.by_name.get(name)
+        return candidates[0] if candidates else None
+
+    def _deps(self, idx: int):
+        libname, src = self.files[idx]
+        _, requires = scan(src)
+        deps = set()
+        for lib, name in requires:
+            dep = self._lookup(libname.lower(), lib, name.lower())
+            if dep is not None and dep != idx:
+                deps.add(dep)
+        return sorted(deps)
+
+    def top_files(self, top: str):
+        """
+        Returns the files providing the top unit.
+
+        Args:
+          top (str): The top entity or module.
+
+        Returns:
+          List[int]: The file indices.
+        """
+        return self.by_name.get(top.lower(), [])
+
+    def _order(self, roots):
+        order = []
+        state = {}
+        for root in roots:
+            # iterative post-order DFS, deep hierarchies exceed the
+            # recursion limit
+            stack = [(root, iter(self.deps[root]))]
+            state[root] = "open"
+            while stack:
+                node, it = stack[-1]
+                child = next(it, None)
+                if child is None:
+                    stack.pop()
+                    state[node] = "done"
+                    order.append(node)
+                elif child not in state:
+                    state[child] = "open"
+                    stack.append((child, iter(self.deps[child])))
+        return order
+
+    def compile_order(self, top: str):
+        """
+        Returns the files the top unit depends on, every file after all
+        files it depends on.
+
+        Args:
+          top (str): The top entity or module.
+
+        Returns:
+          List[Tuple[str, SrcFile]]: The (library name, file) pairs, None
+          if no file provides the top unit.
+        """
+        roots = self.top_files(top)
+        if not roots:
+            return None
+        return [self.files[i] for i in self._order(roots)]
+
+    def unused(self, top: str):
+        """
+        Returns the files not referenced from the top unit.
+
+        Args:
+          top (str): The top entity or module.
+
+        Returns:
+          List[Tuple[str, SrcFile]]: The (library name, file) pairs.
+        """
+        used = set(self._order(self.top_files(top)))
+        return [f for i, f in enumerate(self.files) if i not in used]
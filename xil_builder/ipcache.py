@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+from xil_builder.fingerprint import tool_version
+from xil_builder.progress import ProgressEvent
+
+
+class IpCache:
+    def __init__(self, root: Path, max_bytes: int = 20 * 2**30):
+        """
+        Initializes an IpCache object.
+
+        The cache manages the Vivado IP cache directories shared by all
+        projects and builds. Every part and tool version gets its own
+        directory, which the generated flows pass to Vivado as IP output
+        repository. Vivado fills and reads it, this class keeps the
+        statistics and evicts the least recently used entries.
+
+        Builds hold a shared lock on the cache while Vivado runs, eviction
+        needs the exclusive lock and is skipped while any build is running.
+
+        Args:
+          root (Path): The cache directory.
+          max_bytes (int, optional): Size limit of the cache. Defaults to
+              20 GiB.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats_file = self.root / "stats.json"
+        self.lock_file = self.root / ".lock"
+        self.use_file = self.root / ".use"
+
+    @contextmanager
+    def _locked(self):
+        with self.lock_file.open("a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _count(self, key, n=1):
+        with self._locked():
+            stats = self._read_stats()
+            stats[key] = stats.get(key, 0) + n
+            self.stats_file.write_text(json.dumps(stats, indent=2))
+
+    def _read_stats(self):
+        if not self.stats_file.is_file():
+            return {}
+        try:
+            return json.loads(self.stats_file.read_text())
+        except ValueError:
+            return {}
+
+    def location(self, part: str) -> Path:
+        """
+        Returns the cache directory of a part for the Vivado in use.
+
+        Args:
+          part (str): The FPGA part.
+
+        Returns:
+          Path: The directory, created if needed.
+        """
+        loc = (self.root / f"{tool_version()}_{part}").resolve()
+        loc.mkdir(parents=True, exist_ok=True)
+        return loc
+
+    def _locations(self):
+        return [d for d in self.root.iterdir() if d.is_dir()]
+
+    def _entries(self):
+        entries = []
+        for loc in self._locations():
+            entries += [e for e in loc.iterdir() if e.is_dir()]
+        return entries
+
+    @staticmethod
+    def _entry_usage(entry: Path):
+        # size and last use (read or write) of all files of an entry
+        size = 0
+        used = entry.stat().st_mtime
+        for d, _, files in os.walk(entry):
+            for name in files:
+                st = os.stat(os.path.join(d, name))
+                size += st.st_size
+                used = max(used, st.st_atime, st.st_mtime)
+        return size, used
+
+    @contextmanager
+    def session(self, part: str):
+        """
+        Holds the shared lock while a build uses the cache. New entries
+        are counted as misses, eviction runs afterwards.
+
+        Args:
+          part (str): The FPGA part of the build.
+        """
+        loc = self.location(part)
+        with self.use_file.open("a") as uf:
+            fcntl.flock(uf, fcntl.LOCK_SH)
+            try:
+                before = {e.name for e in loc.iterdir()}
+                yield loc
+                new = {e.name for e in loc.iterdir()} - before
+                if new:
+                    self._count("misses", len(new))
+            finally:
+                fcntl.flock(uf, fcntl.LOCK_UN)
+        self.evict()
+
+    def __call__(self, ev: ProgressEvent):
+        if ev.kind == "ip_cache":
+            self._count("hits")
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used entries until the cache fits the
+        size limit. Nothing is removed while a build holds the cache.
+
+        Returns:
+          int: The number of evicted entries.
+        """
+        with self.use_file.open("a") as uf:
+            try:
+                fcntl.flock(uf, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            try:
+                usage = {e: self._entry_usage(e) for e in self._entries()}
+                total = sum(size for size, _ in usage.values())
+                lru = sorted(usage, key=lambda e: usage[e][1])
+                evicted = 0
+                for e in lru:
+                    if total <= self.max_bytes:
+                        break
+                    total -= usage[e][0]
+                    shutil.rmtree(e, ignore_errors=True)
+                    evicted += 1
+            finally:
+                fcntl.flock(uf, fcntl.LOCK_UN)
+        if evicted:
+            self._count("evictions", evicted)
+        return evicted
+
+    def stats(self) -> dict:
+        """
+        Returns the cache statistics.
+
+        Returns:
+          dict: hits, misses, evictions, hit_rate, entries and bytes.
+        """
+        stats = self._read_stats()
+        hits = stats.get("hits", 0)
+        misses = stats.get("misses", 0)
+        usage = [self._entry_usage(e) for e in self._entries()]
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": stats.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": len(usage),
+            "bytes": sum(size for size, _ in usage),
+        }
+
+    def print(self):
+        """
+        Prints the cache statistics.
+        """
+        s = self.stats()
+        print(
+            f"ip cache: {s['hits']} hits, {s['misses']} misses "
+            f"({s['hit_rate']:.0%}), {s['entries']} entries, "
+            f"{s['bytes'] / 2**20:.1f} MiB"
+        )
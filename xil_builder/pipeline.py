@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from xil_builder.vivado import Vivado, Petalinux
+
+# petalinux components that do not depend on the hardware description
+PREBUILD = ["kernel", "rootfs"]
+
+
+def split_cpus(vivado_cpus: int = None):
+    """
+    Splits the CPUs available to the process between Vivado and petalinux.
+
+    Args:
+      vivado_cpus (int, optional): CPUs for Vivado. Defaults to half of the
+          CPUs, at most 8 (implementation does not scale beyond).
+
+    Returns:
+      Tuple[Set[int], Set[int]]: The Vivado and the petalinux CPUs.
+    """
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < 2:
+        return set(cpus), set(cpus)
+    if vivado_cpus is None:
+        vivado_cpus = min(8, len(cpus) // 2)
+    vivado_cpus = max(1, min(vivado_cpus, len(cpus) - 1))
+    return set(cpus[:vivado_cpus]), set(cpus[vivado_cpus:])
+
+
+def _pin(cpus):
+    # the affinity of a thread is inherited by the processes it starts
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+
+class Pipeline:
+    def __init__(self, vivado: Vivado, petalinux: Petalinux,
+                 vivado_cpus: int = None, incremental=False):
+        """
+        Initializes a Pipeline object.
+
+        The pipeline builds the hardware independent petalinux components
+        (kernel, rootfs) while Vivado runs synthesis and implementation.
+        Once the XSA is deployed, only the steps depending on it and the
+        packaging of BOOT.BIN are left. Vivado and petalinux run pinned to
+        disjoint CPU sets so neither starves the other; bitbake derives its
+        thread count from the affinity.
+
+        Args:
+          vivado (Vivado): The Vivado builder.
+          petalinux (Petalinux): The petalinux builder.
+          vivado_cpus (int, optional): CPUs reserved for Vivado. Defaults
+              to None (see split_cpus).
+          incremental (bool, optional): Use the incremental petalinux
+              rebuild for the XSA dependent steps. Defaults to False.
+        """
+        self.vivado = vivado
+        self.petalinux = petalinux
+        self.vivado_cpus, self.petalinux_cpus = split_cpus(vivado_cpus)
+        self.incremental = incremental
+        self.log = vivado.prj.outdir / f"{vivado.prj.name}.log"
+
+    def _configured(self) -> bool:
+        # without an imported hardware description nothing can be built
+        linux_dir = Path(self.petalinux.linux_dir)
+        return (linux_dir / "project-spec" / "hw-description").is_dir()
+
+    def _hardware(self, syn, impl):
+        _pin(self.vivado_cpus)
+        return self.vivado.build(syn, impl, log=self.log)
+
+    def _prebuild(self):
+        _pin(self.petalinux_cpus)
+        if not self._configured():
+            print("petalinux project not configured yet, no prebuild")
+            return False
+        for component in PREBUILD:
+            code = self.petalinux._build(component)
+            if code.returncode != 0:
+                print(f"petalinux prebuild of {component} failed, "
+                      "continuing with the full build")
+                return False
+        return True
+
+    def build(self, syn=True, impl=True, package=True):
+        """
+        Runs Vivado and the petalinux prebuild concurrently, then the XSA
+        dependent petalinux steps.
+
+        Args:
+          syn (bool, optional): Run synthesis. Defaults to True.
+          impl (bool, optional): Run implementation. Defaults to True.
+          package (bool, optional): Package BOOT.BIN. Defaults to True.
+
+        Returns:
+          int: The Vivado return code, 0 if everything succeeded.
+        """
+        print(f"vivado cpus: {sorted(self.vivado_cpus)}, "
+              f"petalinux cpus: {sorted(self.petalinux_cpus)}")
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            hw = ex.submit(self._hardware, syn, impl)
+            sw = ex.submit(self._prebuild)
+            code = hw.result()
+            sw.result()
+        if code != 0:
+            print(f"vivado failed ({code}), see {self.log}")
+            return code
+        self.petalinux.build(reconfigure=True, package=package,
+                             incremental=self.incremental)
+        return 0
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+import difflib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from yaml import load
+
+try:
+    from yaml import CLoader as Loader
+except ImportError:
+    from yaml import Loader
+
+from xil_builder.hdl_deps import DependencyGraph, scan
+from xil_builder.project import Project
+
+# options of synth_design accepted in syn_args
+SYN_ARGS = {
+    "assert", "bufg", "cascade_dsp", "control_set_opt_threshold",
+    "directive", "fanout_limit", "flatten_hierarchy", "fsm_extraction",
+    "gated_clock_conversion", "global_retiming", "keep_equivalent_registers",
+    "max_bram", "max_bram_cascade_height", "max_dsp", "max_uram",
+    "max_uram_cascade_height", "mode", "no_lc", "no_srlextract",
+    "no_timing_driven", "resource_sharing", "retiming", "sfcu",
+    "shreg_min_size", "verbose",
+}
+# implementation steps and the settings of a step accepted in impl_args
+IMPL_STEPS = [
+    "opt_design", "power_opt_design", "place_design",
+    "post_place_power_opt_design", "phys_opt_design", "route_design",
+    "post_route_phys_opt_design",
+]
+IMPL_ARGS = {"is_enabled", "directive", "more options", "verbose"}
+GENERIC = re.compile(r"^[A-Za-z]\w*$")
+MAGIC = set("*?[")
+
+
+class PreflightError(RuntimeError):
+    def __init__(self, errors):
+        """
+        Initializes a PreflightError object.
+
+        Args:
+          errors (List[str]): The problems found in the project.
+        """
+        self.errors = errors
+        super().__init__(f"{len(errors)} problems found in the project:\n"
+                         + "\n".join(f"  {e}" for e in errors))
+
+
+def _suggest(key: str, known) -> str:
+    close = difflib.get_close_matches(key, known, n=1)
+    return f", did you mean {close[0]}?" if close else ""
+
+
+def check_patterns(prj: Project) -> list:
+    """
+    Checks that every file pattern of the YAML file matches a file.
+
+    Args:
+      prj (Project): The project object.
+
+    Returns:
+      List[str]: The problems found.
+    """
+    data = load(prj.yaml.read_bytes(), Loader=Loader) or {}
+    sections = [(s, data.get(s)) for s in ["bd_files", "ip_files",
+                                           "constraints"]]
+    for name, patterns in (data.get("libraries") or {}).items():
+        sections.append((f"libraries.{name}", patterns))
+    errors = []
+    for section, patterns in sections:
+        for pattern in patterns or []:
+            if prj.index.glob(prj.root, pattern):
+                continue
+            if any(c in MAGIC for c in pattern):
+                errors.append(f"{section}: {pattern} matches no file")
+            else:
+                errors.append(f"{section}: {pattern} does not exist")
+    return errors
+
+
+def _check_file(path: Path):
+    if not path.is_file():
+        return f"{path} does not exist"
+    if not os.access(path, os.R_OK):
+        return f"{path} is not readable"
+    return None
+
+
+def check_files(prj: Project, pool: ThreadPoolExecutor = None) -> list:
+    """
+    Checks that all project files and external libraries exist and that
+    the files are readable.
+
+    Args:
+      prj (Project): The project object.
+      pool (ThreadPoolExecutor, optional): Runs the checks of the files.
+          Defaults to None (one after the other).
+
+    Returns:
+      List[str]: The problems found.
+    """
+    files = [s.get_path() for s in prj.bd_files + prj.ip_files +
+             prj.xdc_files]
+    for lib in prj.libs:
+        files.extend(s.get_path() for s in lib.get_files())
+    results = map(_check_file, files) if pool is None else \
+        pool.map(_check_file, files)
+    errors = [e for e in results if e is not None]
+    for lib in prj.external_libs or []:
+        if not Path(lib).is_dir():
+            errors.append(f"external_libs: {lib} is not a directory")
+    return errors
+
+
+def check_duplicates(prj: Project) -> list:
+    """
+    Checks that no file is part of more than one library.
+
+    Args:
+      prj (Project): The project object.
+
+    Returns:
+      List[str]: The problems found.
+    """
+    owners = {}
+    for lib in prj.libs:
+        for src in lib.get_files():
+            path = Path(src.get_path()).resolve()
+            owners.setdefault(path, []).append(lib.get_name())
+    return [f"{path} is in libraries {', '.join(libs)}"
+            for path, libs in owners.items() if len(libs) > 1]
+
+
+def check_top(prj: Project) -> list:
+    """
+    Checks that the top entity or module is defined in the sources.
+
+    A top ending in _wrapper is accepted for projects with block designs,
+    the wrapper is generated by Vivado.
+
+    Args:
+      prj (Project): The project object.
+
+    Returns:
+      List[str]: The problems found.
+    """
+    if prj.bd_files and prj.top.endswith("_wrapper"):
+        return []
+    top = prj.top.lower()
+    for lib in prj.libs:
+        for src in lib.get_files():
+            if src.get_type() not in DependencyGraph.HDL:
+                continue
+            try:
+                provides, _ = scan(src)
+            except OSError:
+                # reported by check_files
+                continue
+            if top in {p.lower() for p in provides}:
+                return []
+    return [f"top {prj.top} is not defined in any HDL file"]
+
+
+def _check_value(what: str, val) -> list:
+    if type(val) not in (bool, int, str):
+        return [f"{what} must be a bool, int or string, "
+                f"not {type(val).__name__}"]
+    return []
+
+
+def check_syn_args(prj: Project) -> list:
+    """
+    Checks the keys and values of syn_args.
+
+    Args:
+      prj (Project): The project object.
+
+    Returns:
+      List[str]: The problems found.
+    """
+    if prj.syn_args is None:
+        return []
+    if not isinstance(prj.syn_args, dict):
+        return ["syn_args must be a mapping"]
+    errors = []
+    for key, val in prj.syn_args.items():
+        if str(key).lower() not in SYN_ARGS:
+            errors.append(f"syn_args: unknown argument {key}"
+                          f"{_suggest(str(key).lower(), SYN_ARGS)}")
+            continue
+        errors += _check_value(f"syn_args.{key}", val)
+    return errors
+
+
+def check_impl_args(prj: Project) -> list:
+    """
+    Checks the steps and settings of impl_args.
+
+    Args:
+      prj (Project): The project object.
+
+    Returns:
+      List[str]: The problems found.
+    """
+    if prj.impl_args is None:
+        return []
+    if not isinstance(prj.impl_args, dict):
+        return ["impl_args must be a mapping"]
+    errors = []
+    for step, args in prj.impl_args.items():
+        if step not in IMPL_STEPS:
+            errors.append(f"impl_args: unknown step {step}"
+                          f"{_suggest(str(step), IMPL_STEPS)}")
+            continue
+        if args is None:
+            continue
+        if not isinstance(args, dict):
+            errors.append(f"impl_args.{step} must be a mapping")
+            continue
+        for key, val in args.items():
+            if str(key).lower() not in IMPL_ARGS:
+                errors.append(f"impl_args.{step}: unknown setting {key}"
+                              f"{_suggest(str(key).lower(), IMPL_ARGS)}")
+            elif str(key).lower() == "is_enabled" and type(val) is not bool:
+                errors.append(f"impl_args.{step}.is_enabled must be a bool")
+            else:
+                errors += _check_value(f"impl_args.{step}.{key}", val)
+    return errors
+
+
+def check_generics(prj: Project) -> list:
+    """
+    Checks the names and values of the generics.
+
+    Args:
+      prj (Project): The project object.
+
+    Returns:
+      List[str]: The problems found.
+    """
+    if prj.generics is None:
+        return []
+    if not isinstance(prj.generics, dict):
+        return ["generics must be a mapping"]
+    errors = []
+    for key, val in prj.generics.items():
+        if not GENERIC.match(str(key)):
+            errors.append(f"generics: {key} is not a valid generic name")
+        if type(val) not in (bool, int, float, str):
+            errors.append(f"generics.{key} must be a bool, number or "
+                          f"string, not {type(val).__name__}")
+        elif any(c in str(val) for c in "{}\n"):
+            # the generics are written in braces to the Tcl flow
+            errors.append(f"generics.{key} must not contain braces or "
+                          f"newlines")
+    return errors
+
+
+CHECKS = [
+    check_patterns, check_files, check_duplicates, check_top,
+    check_syn_args, check_impl_args, check_generics,
+]
+
+
+def preflight(prj: Project, jobs: int = 8) -> list:
+    """
+    Runs all checks of a project in parallel.
+
+    Args:
+      prj (Project): The project object.
+      jobs (int, optional): Number of threads checking the files.
+          Defaults to 8.
+
+    Returns:
+      List[str]: The problems found, in the order of CHECKS.
+    """
+    # check_files waits for its own pool, a shared one could run dry
+    with ThreadPoolExecutor(max_workers=len(CHECKS)) as pool, \
+            ThreadPoolExecutor(max_workers=jobs) as files:
+        futures = []
+        for check in CHECKS:
+            if check is check_files:
+                futures.append(pool.submit(check, prj, files))
+            else:
+                futures.append(pool.submit(check, prj))
+        errors = []
+        for check, fut in zip(CHECKS, futures):
+            try:
+                errors += fut.result()
+            except Exception as e:
+                errors.append(f"{check.__name__} failed: {e}")
+    return errors
+
+
+def check(prj: Project, jobs: int = 8):
+    """
+    Validates a project before Vivado is started.
+
+    Args:
+      prj (Project): The project object.
+      jobs (int, optional): Number of threads. Defaults to 8.
+
+    Raises:
+      PreflightError: With all problems found.
+    """
+    errors = preflight(prj, jobs)
+    if errors:
+        raise PreflightError(errors)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from xil_builder.progress import ProgressEvent
+from xil_builder.sampler import tree_rss
+
+MARKER = re.compile(r"XB_PROFILE (begin|end) (\S+) (\d+) (\d+) (\d+)")
+# the summary Vivado writes for every step to the runme.log of a run
+RUN_STEP = re.compile(
+    r"^(\w+): Time \(s\): cpu = [\d:]+ ; elapsed = (\d+):(\d+):(\d+) \. "
+    r"Memory \(MB\): peak = ([\d.]+)")
+RUN_STEPS = [
+    "synth_design", "opt_design", "power_opt_design", "place_design",
+    "phys_opt_design", "route_design", "write_bitstream",
+]
+
+
+class BuildProfile:
+    def __init__(self, path: Path, interval: float = 0.5):
+        """
+        Initializes a BuildProfile object.
+
+        The profile collects the wall time and peak memory of every build
+        stage. Python side stages are timed with stage() while the process
+        tree memory is sampled; Tcl side stages are reported by the
+        xb_stage markers of the generated flow, which the profile receives
+        as a progress callback. The markers only see Vivado itself, so the
+        process tree is sampled while a Tcl stage is open within a Python
+        stage; this includes the runs launch_runs starts in child
+        processes. The steps of those runs are added by add_runs().
+
+        Args:
+          path (Path): The JSON file the profile is written to.
+          interval (float, optional): Memory sampling interval in seconds.
+              Defaults to 0.5.
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self.stages = []
+        self._open = {}
+        # peak process tree memory in kB of the open Tcl stages
+        self._tree = {}
+        self._sampling = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Times a Python side stage and samples the memory of the process
+        tree (including all child processes) while it runs.
+
+        Args:
+          name (str): The stage name.
+        """
+        peak = [tree_rss(os.getpid())]
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.interval):
+                rss = tree_rss(os.getpid())
+                peak[0] = max(peak[0], rss)
+                with self._lock:
+                    for tcl in self._tree:
+                        self._tree[tcl] = max(self._tree[tcl], rss // 1024)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        start = time.time()
+        with self._lock:
+            self._sampling += 1
+        sampler.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            sampler.join()
+            with self._lock:
+                self._sampling -= 1
+            peak[0] = max(peak[0], tree_rss(os.getpid()))
+            self.stages.append({
+                "name": name,
+                "source": "python",
+                "start": start,
+                "duration": time.time() - start,
+                "peak_rss_kb": peak[0] // 1024,
+            })
+
+    def __call__(self, ev: ProgressEvent):
+        if ev.kind != "profile":
+            return
+        m = MARKER.search(ev.message)
+        if m is None:
+            return
+        event, name = m.group(1), m.group(2)
+        stamp = int(m.group(3)) / 1000
+        hwm, rss = int(m.group(4)), int(m.group(5))
+        if event == "begin":
+            self._open[name] = (stamp, hwm, rss)
+            with self._lock:
+                if self._sampling:
+                    self._tree[name] = tree_rss(os.getpid()) // 1024
+            return
+        if name not in self._open:
+            return
+        start, hwm0, rss0 = self._open.pop(name)
+        # a new high water mark means the peak was reached in this stage,
+        # otherwise the larger of both samples is the best lower bound
+        peak = hwm if hwm > hwm0 else max(rss0, rss)
+        with self._lock:
+            if name in self._tree:
+                peak = max(peak, self._tree.pop(name),
+                           tree_rss(os.getpid()) // 1024)
+        self.stages.append({
+            "name": name,
+            "source": "tcl",
+            "start": start,
+            "duration": stamp - start,
+            "peak_rss_kb": peak,
+        })
+
+    def add_runs(self, runs: Path, since: float = 0):
+        """
+        Adds the steps of the synthesis and implementation runs of a
+        project as stages, with the elapsed time and peak memory Vivado
+        reports for every step in the runme.log of the run.
+
+        Args:
+          runs (Path): The <name>.runs directory of the project.
+          since (float, optional): Skip the logs of runs that did not run
+              after this time. Defaults to 0.
+        """
+        tcl = {s["name"]: s for s in self.stages if s["source"] == "tcl"}
+        for run, stage in [("synth_1", "synth"), ("impl_1", "impl")]:
+            log = Path(runs) / run / "runme.log"
+            try:
+                mtime = log.stat().st_mtime
+                lines = log.read_text(errors="replace").splitlines()
+            except OSError:
+                continue
+            if mtime < since:
+                continue
+            steps = []
+            for line in lines:
+                m = RUN_STEP.match(line)
+                if m is None or m.group(1) not in RUN_STEPS:
+                    continue
+                h, mi, s = (int(m.group(i)) for i in range(2, 5))
+                steps.append((m.group(1), h * 3600 + mi * 60 + s,
+                              int(float(m.group(5)) * 1024)))
+            # the log has no timestamps, the steps follow each other from
+            # the start of the Tcl stage that waited for the run
+            if stage in tcl:
+                start = tcl[stage]["start"]
+            else:
+                start = mtime - sum(s[1] for s in steps)
+            for name, duration, peak in steps:
+                self.stages.append({
+                    "name": f"{stage}.{name}",
+                    "source": "run",
+                    "start": start,
+                    "duration": duration,
+                    "peak_rss_kb": peak,
+                })
+                start += duration
+
+    def total(self, source: str = "python") -> float:
+        """
+        Returns the summed duration of all stages of one source.
+
+        Args:
+          source (str, optional): "python", "tcl" or "run".
+              Defaults to "python".
+
+        Returns:
+          float: The duration in seconds.
+        """
+        return sum(s["duration"] for s in self.stages
+                   if s["source"] == source)
+
+    def write(self):
+        """
+        Writes the profile as JSON.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "created": time.time(),
+            "stages": sorted(self.stages, key=lambda s: s["start"]),
+        }
+        self.path.write_text(json.dumps(data, indent=2))
+
+    def print(self):
+        """
+        Prints the stages with duration and peak memory.
+        """
+        for s in sorted(self.stages, key=lambda s: s["start"]):
+            print(f"{s['source']:<7}{s['name']:<28}{s['duration']:>9.1f} s"
+                  f"{s['peak_rss_kb'] / 1024:>10.0f} MiB")
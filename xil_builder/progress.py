@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from subprocess import Popen, PIPE, STDOUT, CompletedProcess
+
+
+class ProgressEvent:
+    def __init__(self, kind: str, stage: str = None, message: str = "",
+                 current: int = None, total: int = None):
+        """
+        Initializes a ProgressEvent object.
+
+        Args:
+          kind (str): One of "stage_start", "stage_end", "task",
+              "profile", "ip_cache", "critical_warning" or "error".
+          stage (str, optional): The build stage. Defaults to None.
+          message (str, optional): The log line or message. Defaults to "".
+          current (int, optional): Finished tasks of a "task" event.
+              Defaults to None.
+          total (int, optional): Total tasks of a "task" event.
+              Defaults to None.
+        """
+        self.kind = kind
+        self.stage = stage
+        self.message = message
+        self.current = current
+        self.total = total
+        self.time = time.time()
+
+    def __repr__(self):
+        return f"ProgressEvent({self.kind}, {self.stage}, {self.message!r})"
+
+
+class VivadoLogParser:
+    """
+    Recognizes the Vivado build phases in its console output.
+
+    Non-project flows log every command ("Command: place_design",
+    "place_design completed successfully"), project flows log the launched
+    runs ("Launched impl_1", "impl_1 finished"). Errors between the
+    XB_CAUGHT markers of the flow belong to commands the flow catches and
+    recovers from, they are not reported.
+    """
+
+    STAGES = ["synth_design", "opt_design", "power_opt_design",
+              "place_design", "phys_opt_design", "route_design",
+              "write_bitstream"]
+    COMMAND = re.compile(r"^Command: (\w+)")
+    COMPLETED = re.compile(r"^(\w+) completed successfully")
+    LAUNCHED = re.compile(r"Launched (\w+_\d+)")
+    FINISHED = re.compile(r"\] (\w+_\d+) finished")
+    PROFILE = re.compile(r"XB_PROFILE \w+ (\S+)")
+    CAUGHT = re.compile(r"^XB_CAUGHT (begin|end)")
+    IP_CACHE_HIT = re.compile(
+        r"using cached ip|ip cache hit|found in (?:the )?ip cache", re.I
+    )
+
+    def __init__(self):
+        self.caught = False
+
+    def parse(self, line: str):
+        """
+        Parses one line of output.
+
+        Args:
+          line (str): The output line.
+
+        Returns:
+          List[ProgressEvent]: The events found in the line.
+        """
+        line = line.rstrip()
+        m = self.CAUGHT.match(line)
+        if m is not None:
+            self.caught = m.group(1) == "begin"
+            return []
+        m = self.PROFILE.search(line)
+        if m is not None:
+            return [ProgressEvent("profile", m.group(1), line)]
+        if self.IP_CACHE_HIT.search(line):
+            return [ProgressEvent("ip_cache", "hit", line)]
+        if line.startswith("CRITICAL WARNING:"):
+            return [ProgressEvent("critical_warning", message=line)]
+        if line.startswith("ERROR:"):
+            if self.caught:
+                return []
+            return [ProgressEvent("error", message=line)]
+        m = self.COMMAND.match(line)
+        if m is not None and m.group(1) in self.STAGES:
+            return [ProgressEvent("stage_start", m.group(1), line)]
+        m = self.COMPLETED.match(line)
+        if m is not None and m.group(1) in self.STAGES:
+            return [ProgressEvent("stage_end", m.group(1), line)]
+        m = self.LAUNCHED.search(line)
+        if m is not None:
+            return [ProgressEvent("stage_start", m.group(1), line)]
+        m = self.FINISHED.search(line)
+        if m is not None:
+            return [ProgressEvent("stage_end", m.group(1), line)]
+        return []
+
+
+class PetalinuxLogParser:
+    """
+    Recognizes petalinux steps and bitbake task progress in the output.
+    """
+
+    INFO = re.compile(r"^\[INFO\]\s+(.*)")
+    TASK = re.compile(r"Running task (\d+) of (\d+)")
+
+    def parse(self, line: str):
+        """
+        Parses one line of output.
+
+        Args:
+          line (str): The output line.
+
+        Returns:
+          List[ProgressEvent]: The events found in the line.
+        """
+        line = line.rstrip()
+        if line.startswith("ERROR:") or line.startswith("[ERROR]"):
+            return [ProgressEvent("error", message=line)]
+        m = self.TASK.search(line)
+        if m is not None:
+            return [ProgressEvent("task", "bitbake", line,
+                                  int(m.group(1)), int(m.group(2)))]
+        m = self.INFO.match(line)
+        if m is not None:
+            return [ProgressEvent("stage_start", m.group(1), line)]
+        return []
+
+
+class ConsoleReporter:
+    def __init__(self, out=None):
+        """
+        Initializes a ConsoleReporter object.
+
+        The reporter is a progress callback printing stage changes and an
+        ETA for bitbake, extrapolated from the task rate seen so far.
+
+        Args:
+          out (file, optional): Output stream. Defaults to sys.stderr.
+        """
+        self.out = sys.stderr if out is None else out
+        self.start = None
+
+    def __call__(self, ev: ProgressEvent):
+        if ev.kind in ["stage_start", "stage_end"]:
+            state = "start" if ev.kind == "stage_start" else "done"
+            self.out.write(f"[xil_builder] {ev.stage}: {state}\n")
+        elif ev.kind == "task":
+            if self.start is None:
+                self.start = (ev.time, ev.current)
+            t0, c0 = self.start
+            done = ev.current - c0
+            eta = "?"
+            if done > 0:
+                rate = (ev.time - t0) / done
+                eta = f"{rate * (ev.total - ev.current) / 60:.1f} min"
+            self.out.write(f"[xil_builder] task {ev.current}/{ev.total}, "
+                           f"ETA {eta}\n")
+
+
+def dispatch(parser, callbacks, line: str) -> bool:
+    """
+    Parses a line and forwards the events to the callbacks.
+
+    Args:
+      parser: VivadoLogParser or PetalinuxLogParser.
+      callbacks (List[callable]): Called with every ProgressEvent.
+      line (str): The output line.
+
+    Returns:
+      bool: True if the line contained an error.
+    """
+    error = False
+    for ev in parser.parse(line):
+        for cb in callbacks:
+            cb(ev)
+        error = error or ev.kind == "error"
+    return error
+
+
+def _kill_on(proc, cancel: threading.Event):
+    while proc.poll() is None:
+        if cancel.wait(0.1):
+            try:
+                os.killpg(proc.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            return
+
+
+def stream(pargs, parser, callbacks=(), cwd: Path = None, log: Path = None,
+           fail_fast=False, cancel: threading.Event = None
+           ) -> CompletedProcess:
+    """
+    Runs a command and streams its output line by line through a parser.
+
+    Args:
+      pargs (List[str]): The command.
+      parser: VivadoLogParser or PetalinuxLogParser.
+      callbacks (List[callable], optional): Called with every
+          ProgressEvent. Defaults to ().
+      cwd (Path, optional): The working directory. Defaults to None.
+      log (Path, optional): Write the output to this file instead of the
+          console. Defaults to None.
+      fail_fast (bool, optional): Terminate the command on the first error.
+          Defaults to False.
+      cancel (threading.Event, optional): Terminate the command when the
+          event is set. Defaults to None.
+
+    Returns:
+      CompletedProcess: The finished process.
+    """
+    out = sys.stdout if log is None else Path(log).open("w")
+    proc = Popen(pargs, stdout=PIPE, stderr=STDOUT, text=True, bufsize=1,
+                 cwd=cwd, start_new_session=True)
+    if cancel is not None:
+        threading.Thread(target=_kill_on, args=(proc, cancel),
+                         daemon=True).start()
+    aborted = False
+    try:
+        for line in proc.stdout:
+            out.write(line)
+            if dispatch(parser, callbacks, line) and fail_fast:
+                print(f"aborting {pargs[0]} on first error")
+                os.killpg(proc.pid, signal.SIGTERM)
+                aborted = True
+                break
+        proc.stdout.close()
+        returncode = proc.wait()
+    except BaseException:
+        # the command runs in its own session, take it down with us
+        os.killpg(proc.pid, signal.SIGTERM)
+        raise
+    finally:
+        if log is not None:
+            out.close()
+    if aborted and returncode <= 0:
+        returncode = 1
+    return CompletedProcess(pargs, returncode)
@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import hashlib
+import json
+import os
 from pathlib import Path
 from yaml import load
 
@@ -7,29 +10,49 @@ try:
 except ImportError:
     from yaml import Loader
 
+from xil_builder.fileindex import FileIndex
 from xil_builder.library import SrcFile, Library, FType
 
+CACHE_FORMAT = 1
+
 
 class Project:
-    def __init__(self, yaml: Path, outdir: Path, debug=False):
+    def __init__(self, yaml: Path, outdir: Path, debug=False,
+                 index: FileIndex = None, use_cache=False):
         """
         Initializes a Project object.
 
+        With use_cache, the resolved project is cached in the output
+        directory and loaded from there as long as the YAML file and all
+        directories the file patterns were resolved in are unchanged.
+
         Args:
           yaml (Path): The path to the YAML file containing project
                       information.
           outdir (Path): The output directory for the project.
           debug (bool, optional): Whether to enable debug mode.
                       Defaults to False.
+          index (FileIndex, optional): The index used to resolve the file
+                      patterns. Defaults to the index shared by all
+                      projects of the process.
+          use_cache (bool, optional): Load and store the resolved project
+                      in the output directory. Defaults to False.
         """
         assert yaml.is_file(), f"{yaml} is not a file"
 
         self.yaml = yaml
         self.root = self.yaml.parent
-        with self.yaml.open("r") as f:
-            data = load(f, Loader=Loader)
+        self.index = FileIndex.shared() if index is None else index
+        raw = self.yaml.read_bytes()
         self.outdir = outdir
         self.outdir.mkdir(parents=True, exist_ok=True)
+        self.cache_file = self.outdir / f"{self.yaml.stem}.project.json"
+        key = self._cache_key(raw)
+        cached = self._load_cache(key) if use_cache else None
+        if cached is None:
+            data = load(raw, Loader=Loader)
+        else:
+            data = cached["data"]
 
         # Project init
         self.name = data.get("project", {}).get("name")
@@ -50,29 +73,135 @@ class Project:
         self.external_libs = data.get("project", {}).get("external_libs")
         if self.external_libs is None:
             print("no external_libs")
+        # names of workspace projects that have to be built first
+        self.depends = data.get("project", {}).get("depends") or []
 
         # files
         if debug:
             self.print_prj_info()
-        self.bd_files = self._get_files(data.get("bd_files"))
-        self.ip_files = self._get_files(data.get("ip_files"))
-        self.xdc_files = self._get_files(data.get("constraints"))
+        if cached is None:
+            watch = {}
+            self._resolve_files(data, watch)
+            if use_cache:
+                self._store_cache(key, data, watch)
+        else:
+            watch = cached["dirs"]
+            self._restore_files(cached["files"])
+        # directories the file patterns were resolved in
+        self.dirs = [Path(d) for d in watch]
         if debug:
             self.print_files()
+            print("libraries")
+            self.print_libraries()
+
+        self.linux_cfg = data.get("linux")
+        # implementation strategies for the directive sweep
+        self.sweep = data.get("sweep")
+
+    def _resolve_files(self, data, watch: dict):
+        """
+        Resolves the file patterns of the YAML file.
+
+        Args:
+          data (dict): The parsed YAML file.
+          watch (dict): Filled with the directories the result depends on.
+        """
+        self.bd_files = self._get_files(data.get("bd_files"), watch=watch)
+        self.ip_files = self._get_files(data.get("ip_files"), watch=watch)
+        self.xdc_files = self._get_files(data.get("constraints"),
+                                         watch=watch)
         # libraries
         self.libs = []
         for k in data.get("libraries").keys():
             lib = Library(str(k))
-            files = self._get_files(data.get("libraries", {}).get(k))
+            files = self._get_files(data.get("libraries", {}).get(k),
+                                    watch=watch)
             for f in files:
                 lib.add_file_obj(f)
             self.libs.append(lib)
 
-        if debug:
-            print("libraries")
-            self.print_libraries()
+    def _cache_key(self, raw: bytes) -> str:
+        h = hashlib.sha256()
+        h.update(f"{CACHE_FORMAT}\0{os.getcwd()}\0{self.yaml}\0".encode())
+        h.update(raw)
+        return h.hexdigest()
 
-        self.linux_cfg = data.get("linux")
+    def _load_cache(self, key: str):
+        """
+        Loads the cached project if it is still valid.
+
+        Args:
+          key (str): The digest of the YAML file.
+
+        Returns:
+          dict: The cache content or None.
+        """
+        try:
+            cached = json.loads(self.cache_file.read_text())
+        except (OSError, ValueError):
+            return None
+        if cached.get("key") != key:
+            return None
+        for d, mtime in cached.get("dirs", {}).items():
+            if FileIndex.mtime(d) != mtime:
+                return None
+        return cached
+
+    def _store_cache(self, key: str, data, watch: dict):
+        """
+        Writes the resolved project to the cache file.
+
+        Args:
+          key (str): The digest of the YAML file.
+          data (dict): The parsed YAML file.
+          watch (dict): The directories the resolved files depend on.
+        """
+
+        def entries(files):
+            return [[f.get_path().as_posix(), f.get_type().value]
+                    for f in files]
+
+        cached = {
+            "key": key,
+            "dirs": watch,
+            "data": data,
+            "files": {
+                "bd": entries(self.bd_files),
+                "ip": entries(self.ip_files),
+                "xdc": entries(self.xdc_files),
+                "libs": {lib.get_name(): entries(lib.get_files())
+                         for lib in self.libs},
+            },
+        }
+        try:
+            blob = json.dumps(cached)
+        except (TypeError, ValueError):
+            # YAML types without a JSON representation, e.g. dates
+            return
+        tmp = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(blob)
+        os.replace(tmp, self.cache_file)
+
+    def _restore_files(self, files: dict):
+        """
+        Restores the resolved files from the cache.
+
+        Args:
+          files (dict): The "files" section of the cache.
+        """
+
+        def src_files(entries):
+            return [SrcFile(p, t) for p, t in entries]
+
+        self.bd_files = src_files(files["bd"])
+        self.ip_files = src_files(files["ip"])
+        self.xdc_files = src_files(files["xdc"])
+        self.libs = []
+        for name, entries in files["libs"].items():
+            lib = Library(name)
+            for f in src_files(entries):
+                lib.add_file_obj(f)
+            self.libs.append(lib)
 
     def _get_fileType(self, f):
         """
@@ -101,13 +230,17 @@ class Project:
                 t = FType.NONE
         return t
 
-    def _get_files(self, tmp, t=None):
+    def _get_files(self, tmp, t=None, watch: dict = None):
         """
         Retrieves a list of source files based on the provided file paths.
+        All patterns are resolved at once by the file index, a file matched
+        by several patterns is returned once.
 
         Args:
           tmp (List[str]): The list of file paths.
           t (FType, optional): The file type. Defaults to None.
+          watch (dict, optional): Filled with the mtime of the directories
+              the files were found in. Defaults to None.
 
         Returns:
           List[SrcFile]: The list of source files.
@@ -115,17 +248,13 @@ class Project:
         files = []
         if tmp is None:
             return files
-        for i in tmp:
-            p = self.root / Path(i).parent
-            n = Path(i).name
-            flist = list(p.glob(n))
-            for f in flist:
-                if t is None:
-                    t = self._get_fileType(f)
-                # else:
-                #    t = FType.NONE
-                src = SrcFile(f, t)
-                files.append(src)
+        for f in self.index.resolve(self.root, tmp, watch):
+            if t is None:
+                t = self._get_fileType(f)
+            # else:
+            #    t = FType.NONE
+            src = SrcFile(f, t)
+            files.append(src)
         return files
 
     def print_prj_info(self):
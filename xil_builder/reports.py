@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from xil_builder.profile import MARKER
+from xil_builder.project import Project
+
+# per build values stored in the results database
+METRICS = [
+    "wns", "tns", "whs", "ths",
+    "luts", "ffs", "brams", "dsps",
+    "power",
+    "drc_errors", "drc_critical", "drc_warnings",
+    "unrouted_nets", "routing_errors",
+]
+
+# site types of the flat utilization report (7 series / UltraScale names)
+UTIL_SITES = {
+    "Slice LUTs": "luts",
+    "CLB LUTs": "luts",
+    "Slice Registers": "ffs",
+    "CLB Registers": "ffs",
+    "Block RAM Tile": "brams",
+    "DSPs": "dsps",
+}
+# columns of the hierarchical utilization report
+UTIL_COLUMNS = {
+    "Total LUTs": "luts",
+    "FFs": "ffs",
+    "RAMB36": "ramb36",
+    "RAMB18": "ramb18",
+    "DSP Blocks": "dsps",
+    "DSP48 Blocks": "dsps",
+}
+TIMING_COLUMNS = {
+    "WNS(ns)": "wns", "TNS(ns)": "tns", "WHS(ns)": "whs", "THS(ns)": "ths",
+}
+ROUTE_STATUS = re.compile(r"#\s+of\s+([a-z ]+?)\.*\s*:\s*(\d+)\s*:")
+COMMAND_TIME = re.compile(
+    r"^(\w+): Time \(s\): cpu = [\d:]+ ; elapsed = (\d+):(\d+):(\d+)")
+
+
+def _number(text: str):
+    try:
+        val = float(text.strip().rstrip("*"))
+    except ValueError:
+        return None
+    return int(val) if val.is_integer() else val
+
+
+def _cells(line: str):
+    return [c.strip() for c in line.strip().strip("|").split("|")]
+
+
+def parse_timing(lines) -> dict:
+    """
+    Parses the design timing summary of report_timing_summary.
+
+    Reading stops after the summary table.
+
+    Args:
+      lines (Iterable[str]): The report lines.
+
+    Returns:
+      dict: wns, tns, whs and ths in ns, None for unconstrained designs.
+    """
+    it = iter(lines)
+    for line in it:
+        if "WNS(ns)" not in line or "TNS(ns)" not in line:
+            continue
+        header = re.split(r"\s{2,}", line.strip())
+        next(it, None)  # dashes
+        values = (next(it, "") or "").split()
+        if len(values) != len(header):
+            return {}
+        return {TIMING_COLUMNS[h]: _number(v)
+                for h, v in zip(header, values) if h in TIMING_COLUMNS}
+    return {}
+
+
+def parse_utilization(lines) -> dict:
+    """
+    Parses flat and hierarchical (-hierarchical) utilization reports.
+
+    The hierarchical report is read up to its first row, the top level
+    instance, so reports of any size are parsed in constant time and
+    memory.
+
+    Args:
+      lines (Iterable[str]): The report lines.
+
+    Returns:
+      dict: luts, ffs, brams (36 Kb tiles) and dsps.
+    """
+    result = {}
+    columns = None
+    for line in lines:
+        if not line.startswith("|"):
+            continue
+        cells = _cells(line)
+        if columns is None and "Instance" in cells[0:1]:
+            columns = cells
+            continue
+        if columns is not None:
+            # first row after the header is the top level instance
+            row = {UTIL_COLUMNS[c]: _number(v)
+                   for c, v in zip(columns, cells) if c in UTIL_COLUMNS}
+            ramb = (row.pop("ramb36", 0) or 0) + \
+                (row.pop("ramb18", 0) or 0) / 2
+            row["brams"] = int(ramb) if float(ramb).is_integer() else ramb
+            return row
+        site = cells[0].rstrip("*").strip()
+        key = UTIL_SITES.get(site)
+        if key is not None and key not in result and len(cells) > 1:
+            result[key] = _number(cells[1])
+            if len(result) == 4:
+                break
+    return result
+
+
+def parse_drc(lines) -> dict:
+    """
+    Parses the violation summary of report_drc.
+
+    Args:
+      lines (Iterable[str]): The report lines.
+
+    Returns:
+      dict: drc_errors, drc_critical and drc_warnings.
+    """
+    result = {"drc_errors": 0, "drc_critical": 0, "drc_warnings": 0}
+    severities = {"Error": "drc_errors",
+                  "Critical Warning": "drc_critical",
+                  "Warning": "drc_warnings"}
+    in_table = False
+    for line in lines:
+        if not line.startswith("|"):
+            if in_table and not line.startswith("+"):
+                break
+            continue
+        cells = _cells(line)
+        if cells[0:2] == ["Rule", "Severity"]:
+            in_table = True
+            continue
+        if in_table and len(cells) >= 4:
+            key = severities.get(cells[1])
+            count = _number(cells[-1])
+            if key is not None and count is not None:
+                result[key] += count
+    return result
+
+
+def parse_power(lines) -> dict:
+    """
+    Parses the total on-chip power of report_power.
+
+    Args:
+      lines (Iterable[str]): The report lines.
+
+    Returns:
+      dict: power in W.
+    """
+    for line in lines:
+        if line.startswith("| Total On-Chip Power (W)"):
+            return {"power": _number(_cells(line)[1])}
+    return {}
+
+
+def parse_route_status(lines) -> dict:
+    """
+    Parses report_route_status.
+
+    Args:
+      lines (Iterable[str]): The report lines.
+
+    Returns:
+      dict: unrouted_nets and routing_errors.
+    """
+    result = {}
+    keys = {"unrouted nets": "unrouted_nets",
+            "nets with routing errors": "routing_errors"}
+    for line in lines:
+        m = ROUTE_STATUS.search(line)
+        if m is None:
+            continue
+        key = keys.get(m.group(1).strip())
+        if key is not None:
+            result[key] = int(m.group(2))
+            if len(result) == len(keys):
+                break
+    return result
+
+
+def parse_runtimes(lines) -> dict:
+    """
+    Collects stage runtimes from a Vivado log.
+
+    The xb_stage markers of the generated flows define the stages. Logs
+    without markers (the runme.log of project runs) report the elapsed
+    time of every Vivado command.
+
+    Args:
+      lines (Iterable[str]): The log lines.
+
+    Returns:
+      dict: Seconds per stage.
+    """
+    result = {}
+    begin = {}
+    for line in lines:
+        m = MARKER.search(line)
+        if m is not None:
+            event, name, stamp = m.group(1), m.group(2), int(m.group(3))
+            if event == "begin":
+                begin[name] = stamp
+            elif name in begin:
+                result[name] = (stamp - begin.pop(name)) / 1000
+            continue
+        m = COMMAND_TIME.match(line)
+        if m is not None:
+            h, mi, s = (int(g) for g in m.group(2, 3, 4))
+            result[m.group(1)] = result.get(m.group(1), 0) + \
+                h * 3600 + mi * 60 + s
+    return result
+
+
+def parse_report(path: Path, parser) -> dict:
+    """
+    Runs a parser on a report file line by line.
+
+    Args:
+      path (Path): The report, a missing report yields no values.
+      parser (callable): One of the parse_* functions.
+
+    Returns:
+      dict: The parsed values.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return {}
+    with path.open("r", errors="replace") as f:
+        return parser(f)
+
+
+def report_files(prj: Project) -> dict:
+    """
+    Returns the post route reports of a project.
+
+    The reports of the non-project flow are preferred, the reports of the
+    impl_1 run are used for project builds.
+
+    Args:
+      prj (Project): The project.
+
+    Returns:
+      dict: The report path per parser.
+    """
+    out = Path(prj.outdir)
+    non_project = {
+        parse_timing: out / f"{prj.name}_post_route_tim.rpt",
+        parse_utilization: out / f"{prj.name}_post_route_util.rpt",
+        parse_drc: out / f"{prj.name}_post_opt_drc.rpt",
+        parse_power: out / f"{prj.name}_post_route_power.rpt",
+        parse_route_status: out / f"{prj.name}_post_route_status.rpt",
+    }
+    if non_project[parse_timing].is_file():
+        return non_project
+    impl = out / f"{prj.name}.runs" / "impl_1"
+    return {
+        parse_timing: impl / f"{prj.top}_timing_summary_routed.rpt",
+        parse_utilization: impl / f"{prj.top}_utilization_placed.rpt",
+        parse_drc: impl / f"{prj.top}_drc_routed.rpt",
+        parse_power: impl / f"{prj.top}_power_routed.rpt",
+        parse_route_status: impl / f"{prj.top}_route_status.rpt",
+    }
+
+
+def collect(prj: Project, log: Path = None, since: float = 0) -> dict:
+    """
+    Collects the results of the last build of a project.
+
+    Args:
+      prj (Project): The project.
+      log (Path, optional): The Vivado log of the build. Defaults to None,
+          the runtimes are then taken from the synth_1 and impl_1 logs.
+      since (float, optional): Skip the logs of runs that did not run
+          after this time, e.g. a synth_1 the build did not reset.
+          Defaults to 0.
+
+    Returns:
+      Tuple[dict, dict]: The metrics and the runtime per stage.
+    """
+    metrics = {}
+    for parser, path in report_files(prj).items():
+        metrics.update(parse_report(path, parser))
+    runtimes = {}
+    if log is not None:
+        runtimes = parse_report(log, parse_runtimes)
+    if not runtimes:
+        runs = Path(prj.outdir) / f"{prj.name}.runs"
+        for run in ["synth_1", "impl_1"]:
+            path = runs / run / "runme.log"
+            if path.is_file() and path.stat().st_mtime < since:
+                continue
+            runtimes.update(parse_report(path, parse_runtimes))
+    return metrics, runtimes
+
+
+class ResultsDB:
+    def __init__(self, path: Path):
+        """
+        Initializes a ResultsDB object.
+
+        The database keeps the timing, utilization, DRC, power and route
+        status results and the stage runtimes of every recorded build.
+
+        Args:
+          path (Path): The SQLite database file, created if missing.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # concurrent workspace builds record into the same database
+        self.db = sqlite3.connect(self.path, timeout=30)
+        columns = ", ".join(f"{m} REAL" for m in METRICS)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS builds ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "project TEXT NOT NULL, created REAL NOT NULL, "
+                f"git_sha TEXT, status INTEGER, {columns})")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS runtimes ("
+                "build INTEGER NOT NULL REFERENCES builds(id), "
+                "stage TEXT NOT NULL, seconds REAL NOT NULL)")
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS builds_project "
+                "ON builds(project, created)")
+
+    def close(self):
+        self.db.close()
+
+    def record(self, project: str, metrics: dict, runtimes: dict = None,
+               git_sha: str = None, status: int = 0,
+               created: float = None) -> int:
+        """
+        Stores the results of a build.
+
+        Args:
+          project (str): The project name.
+          metrics (dict): The values of METRICS, missing ones are NULL.
+          runtimes (dict, optional): Seconds per stage. Defaults to None.
+          git_sha (str, optional): The built revision. Defaults to None.
+          status (int, optional): The build return code. Defaults to 0.
+          created (float, optional): The build time. Defaults to now.
+
+        Returns:
+          int: The build id.
+        """
+        created = time.time() if created is None else created
+        columns = ["project", "created", "git_sha", "status"] + METRICS
+        values = [project, created, git_sha, status] + \
+            [metrics.get(m) for m in METRICS]
+        with self.db:
+            cur = self.db.execute(
+                f"INSERT INTO builds ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})", values)
+            build = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO runtimes (build, stage, seconds) "
+                "VALUES (?, ?, ?)",
+                [(build, s, t) for s, t in (runtimes or {}).items()])
+        return build
+
+    def record_project(self, prj: Project, log: Path = None,
+                       git_sha: str = None, status: int = 0,
+                       since: float = 0) -> int:
+        """
+        Collects and stores the results of the last build of a project.
+
+        Args:
+          prj (Project): The project.
+          log (Path, optional): The Vivado log. Defaults to None.
+          git_sha (str, optional): The built revision. Defaults to None.
+          status (int, optional): The build return code. Defaults to 0.
+          since (float, optional): The start of the build, see collect().
+              Defaults to 0.
+
+        Returns:
+          int: The build id.
+        """
+        metrics, runtimes = collect(prj, log, since)
+        return self.record(prj.name, metrics, runtimes, git_sha, status)
+
+    def builds(self, project: str, limit: int = None) -> list:
+        """
+        Returns the recorded builds of a project, newest first.
+
+        Args:
+          project (str): The project name.
+          limit (int, optional): Maximum number of builds. Defaults to all.
+
+        Returns:
+          List[dict]: One dict per build with all columns.
+        """
+        cur = self.db.execute(
+            "SELECT * FROM builds WHERE project = ? "
+            "ORDER BY created DESC, id DESC LIMIT ?",
+            (project, -1 if limit is None else limit))
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def trend(self, project: str, metric: str, since: float = None,
+              limit: int = None) -> list:
+        """
+        Returns a metric of a project over time.
+
+        Args:
+          project (str): The project name.
+          metric (str): One of METRICS.
+          since (float, optional): Only builds after this time. Defaults
+              to None.
+          limit (int, optional): Only the most recent builds. Defaults to
+              all.
+
+        Returns:
+          List[Tuple[float, float]]: (created, value), oldest first.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric}")
+        rows = self.db.execute(
+            f"SELECT created, {metric} FROM builds "
+            "WHERE project = ? AND created >= ? AND status = 0 "
+            "ORDER BY created DESC, id DESC LIMIT ?",
+            (project, since or 0, -1 if limit is None else limit)
+        ).fetchall()
+        return list(reversed(rows))
+
+    def runtime_trend(self, project: str, stage: str,
+                      limit: int = None) -> list:
+        """
+        Returns the runtime of a stage over time.
+
+        Args:
+          project (str): The project name.
+          stage (str): The stage name.
+          limit (int, optional): Only the most recent builds. Defaults to
+              all.
+
+        Returns:
+          List[Tuple[float, float]]: (created, seconds), oldest first.
+        """
+        rows = self.db.execute(
+            "SELECT b.created, r.seconds FROM runtimes r "
+            "JOIN builds b ON b.id = r.build "
+            "WHERE b.project = ? AND r.stage = ? "
+            "ORDER BY b.created DESC, b.id DESC LIMIT ?",
+            (project, stage, -1 if limit is None else limit)).fetchall()
+        return list(reversed(rows))
+
+    def runtimes(self, build: int) -> dict:
+        """
+        Returns the stage runtimes of a build.
+
+        Args:
+          build (int): The build id.
+
+        Returns:
+          dict: Seconds per stage.
+        """
+        return dict(self.db.execute(
+            "SELECT stage, seconds FROM runtimes WHERE build = ?",
+            (build,)).fetchall())
+
+    def print(self, project: str, limit: int = 10):
+        """
+        Prints the most recent builds of a project.
+
+        Args:
+          project (str): The project name.
+          limit (int, optional): Number of builds. Defaults to 10.
+        """
+        print(f"{'date':<20}{'sha':<10}{'WNS':>8}{'WHS':>8}"
+              f"{'LUT':>9}{'FF':>9}{'BRAM':>7}{'DSP':>6}")
+        for b in self.builds(project, limit):
+            date = time.strftime("%Y-%m-%d %H:%M",
+                                 time.localtime(b["created"]))
+
+            def fmt(v, width, spec=""):
+                return f"{'-':>{width}}" if v is None \
+                    else f"{v:>{width}{spec}}"
+
+            print(f"{date:<20}{(b['git_sha'] or '-'):<10}"
+                  f"{fmt(b['wns'], 8, '.3f')}{fmt(b['whs'], 8, '.3f')}"
+                  f"{fmt(b['luts'], 9, '.0f')}{fmt(b['ffs'], 9, '.0f')}"
+                  f"{fmt(b['brams'], 7, '.1f')}{fmt(b['dsps'], 6, '.0f')}")
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+import fcntl
+import json
+import math
+import os
+import re
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+CGROUP = Path("/sys/fs/cgroup")
+MEMINFO = Path("/proc/meminfo")
+# Vivado does not use more than 8 threads for most steps
+MAX_THREADS = 8
+GiB = 2**30
+# peak memory of one synthesis or implementation run by device, after the
+# Vivado memory recommendations; the first match wins
+PART_MEMORY = [
+    (r"xc7z0[01]\d|xc7a(12|15|25|35|50)t|xc7s", 2 * GiB),
+    (r"xc7z0[2-4]\d|xc7a(75|100|200)t|xc7k(70|160)t", 4 * GiB),
+    (r"xc7z(045|100)|xc7k\d+t|xc7v", 8 * GiB),
+    (r"xczu[1-5](cg|eg|ev)", 6 * GiB),
+    (r"xczu([6-9]|1[01])(cg|eg|ev)", 10 * GiB),
+    (r"xcvu(9|1[13]|19|3[157]|4[57])p|xcv[pce]", 32 * GiB),
+    (r"xczu\d+|xcku|xcvu", 16 * GiB),
+]
+DEFAULT_MEMORY = 8 * GiB
+
+
+def _read(path: Path) -> str:
+    try:
+        return Path(path).read_text().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpus(root: Path = CGROUP):
+    """
+    Returns the CPU quota of the cgroup (v2 or v1) of the process.
+
+    Args:
+      root (Path, optional): The cgroup mount. Defaults to /sys/fs/cgroup.
+
+    Returns:
+      int: The quota in CPUs (rounded up), None without a quota.
+    """
+    v2 = _read(root / "cpu.max")
+    if v2 is not None:
+        quota, _, period = v2.partition(" ")
+        if quota == "max":
+            return None
+        return max(1, math.ceil(int(quota) / int(period or 100000)))
+    quota = _read(root / "cpu" / "cpu.cfs_quota_us")
+    period = _read(root / "cpu" / "cpu.cfs_period_us")
+    if quota is None or period is None or int(quota) < 0:
+        return None
+    return max(1, math.ceil(int(quota) / int(period)))
+
+
+def cgroup_memory(root: Path = CGROUP):
+    """
+    Returns the memory left in the cgroup (v2 or v1) of the process.
+
+    Args:
+      root (Path, optional): The cgroup mount. Defaults to /sys/fs/cgroup.
+
+    Returns:
+      int: Limit minus usage in bytes, None without a limit.
+    """
+    limit = _read(root / "memory.max")
+    usage = _read(root / "memory.current")
+    if limit is None:
+        limit = _read(root / "memory" / "memory.limit_in_bytes")
+        usage = _read(root / "memory" / "memory.usage_in_bytes")
+    if limit is None or limit == "max" or usage is None:
+        return None
+    limit = int(limit)
+    # v1 reports "no limit" as a huge number
+    if limit >= 2**60:
+        return None
+    return max(0, limit - int(usage))
+
+
+def available_cpus(root: Path = CGROUP) -> int:
+    """
+    Returns the CPUs the process may use (affinity and cgroup quota).
+
+    Args:
+      root (Path, optional): The cgroup mount. Defaults to /sys/fs/cgroup.
+
+    Returns:
+      int: The number of CPUs.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpus(root)
+    return cpus if quota is None else min(cpus, quota)
+
+
+def available_memory(root: Path = CGROUP, meminfo: Path = MEMINFO) -> int:
+    """
+    Returns the memory available to new processes.
+
+    Args:
+      root (Path, optional): The cgroup mount. Defaults to /sys/fs/cgroup.
+      meminfo (Path, optional): Defaults to /proc/meminfo.
+
+    Returns:
+      int: The free memory in bytes (MemAvailable or the cgroup limit).
+    """
+    free = None
+    text = _read(meminfo) or ""
+    m = re.search(r"^MemAvailable:\s+(\d+) kB", text, re.M)
+    if m is not None:
+        free = int(m.group(1)) * 1024
+    limit = cgroup_memory(root)
+    if limit is not None:
+        free = limit if free is None else min(free, limit)
+    return DEFAULT_MEMORY if free is None else free
+
+
+def estimate_memory(part: str) -> int:
+    """
+    Returns the estimated peak memory of one Vivado run for a part.
+
+    Args:
+      part (str): The FPGA part, e.g. xc7z010clg400-1.
+
+    Returns:
+      int: The estimate in bytes.
+    """
+    for pattern, memory in PART_MEMORY:
+        if re.match(pattern, part.lower()):
+            return memory
+    return DEFAULT_MEMORY
+
+
+class Allocation:
+    def __init__(self, jobs: int, threads: int, cpus: int, memory: int):
+        """
+        Initializes an Allocation object.
+
+        Args:
+          jobs (int): Parallel runs of launch_runs (-jobs).
+          threads (int): Threads per run (general.maxThreads).
+          cpus (int): The CPUs the allocation was computed for.
+          memory (int): The memory the allocation was computed for.
+        """
+        self.jobs = jobs
+        self.threads = threads
+        self.cpus = cpus
+        self.memory = memory
+
+    def tcl(self) -> str:
+        return f"set JOBS {self.jobs}\nset THREADS {self.threads}\n"
+
+    def __repr__(self):
+        return (f"{self.jobs} jobs, {self.threads} threads "
+                f"({self.cpus} cpus, {self.memory / GiB:.1f} GiB)")
+
+
+def allocate(part: str, cpus: int = None, memory: int = None,
+             runs: int = 1) -> Allocation:
+    """
+    Chooses the Vivado jobs and threads for the available resources.
+
+    The runs of a build mostly follow each other (synth_1, then impl_1),
+    so every run gets up to MAX_THREADS threads first. Runs that can run
+    in parallel, such as out-of-context IP runs, get further jobs from the
+    CPUs and memory left over; every job needs the estimated memory of
+    the part and jobs * threads never exceeds the CPUs.
+
+    Args:
+      part (str): The FPGA part.
+      cpus (int, optional): Defaults to available_cpus().
+      memory (int, optional): Defaults to available_memory().
+      runs (int, optional): Runs of the build that can run in parallel.
+          Defaults to 1.
+
+    Returns:
+      Allocation: The allocation.
+    """
+    cpus = available_cpus() if cpus is None else cpus
+    memory = available_memory() if memory is None else memory
+    threads = max(1, min(MAX_THREADS, cpus))
+    jobs = max(1, min(runs, cpus // threads,
+                      memory // estimate_memory(part)))
+    return Allocation(jobs, threads, cpus, memory)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ResourceLedger:
+    def __init__(self, path: Path = None, cpus: int = None,
+                 memory: int = None):
+        """
+        Initializes a ResourceLedger object.
+
+        The ledger is a file shared by all builds of a host. A build
+        reserves the threads and the estimated memory of each of its
+        parallel jobs before Vivado starts and releases them when it
+        finishes; reservations of processes that died are dropped. A
+        build is only admitted if its reservation fits into what the
+        other reservations leave, or if no other build is running.
+
+        Args:
+          path (Path, optional): The ledger file. Defaults to
+              xil_builder.ledger in the temporary directory.
+          cpus (int, optional): CPUs of the host. Defaults to
+              available_cpus().
+          memory (int, optional): Memory of the host. Defaults to the
+              memory available when the reservation is made.
+        """
+        if path is None:
+            path = Path(tempfile.gettempdir()) / "xil_builder.ledger"
+        self.path = Path(path)
+        self.cpus = cpus
+        self.memory = memory
+
+    @contextmanager
+    def _locked(self):
+        with self.path.open("a+") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                lf.seek(0)
+                try:
+                    entries = json.loads(lf.read() or "{}")
+                except ValueError:
+                    entries = {}
+                entries = {k: e for k, e in entries.items()
+                           if _alive(e["pid"])}
+                yield entries
+                lf.seek(0)
+                lf.truncate()
+                lf.write(json.dumps(entries, indent=2))
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def reserved(self) -> dict:
+        """
+        Returns the live reservations.
+
+        Returns:
+          dict: The reservation per id with pid, part, cpus and memory.
+        """
+        with self._locked() as entries:
+            return dict(entries)
+
+    def _try_reserve(self, key: str, part: str, runs: int = 1):
+        with self._locked() as entries:
+            cpus = available_cpus() if self.cpus is None else self.cpus
+            free_cpus = cpus - sum(e["cpus"] for e in entries.values())
+            reserved = sum(e["memory"] for e in entries.values())
+            if self.memory is None:
+                # MemAvailable already accounts for what running builds
+                # use, the reservations cover builds that did not grow yet
+                free_memory = min(available_memory(),
+                                  self._host_memory() - reserved)
+            else:
+                free_memory = self.memory - reserved
+            need = estimate_memory(part)
+            if entries and (free_cpus < 1 or free_memory < need):
+                return None
+            alloc = allocate(part, max(1, free_cpus), max(need, free_memory),
+                             runs)
+            # only the jobs the build can run at the same time are reserved
+            entries[key] = {
+                "pid": os.getpid(),
+                "part": part,
+                "cpus": alloc.jobs * alloc.threads,
+                "memory": alloc.jobs * need,
+                "started": time.time(),
+            }
+            return alloc
+
+    @staticmethod
+    def _host_memory() -> int:
+        text = _read(MEMINFO) or ""
+        m = re.search(r"^MemTotal:\s+(\d+) kB", text, re.M)
+        total = int(m.group(1)) * 1024 if m else DEFAULT_MEMORY
+        limit = cgroup_memory()
+        return total if limit is None else min(total, limit)
+
+    @contextmanager
+    def admit(self, part: str, timeout: float = None, poll: float = 5.0,
+              runs: int = 1):
+        """
+        Waits until the resources of a run are free and reserves them.
+
+        Args:
+          part (str): The FPGA part of the run.
+          timeout (float, optional): Maximum wait in seconds. Defaults to
+              None (wait forever).
+          poll (float, optional): Seconds between attempts. Defaults to 5.
+          runs (int, optional): Runs of the build that can run in
+              parallel, see allocate(). Defaults to 1.
+
+        Yields:
+          Allocation: The jobs and threads for the admitted run.
+        """
+        key = uuid.uuid4().hex
+        start = time.monotonic()
+        waiting = False
+        while True:
+            alloc = self._try_reserve(key, part, runs)
+            if alloc is not None:
+                break
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(f"no resources for a {part} run after "
+                                   f"{timeout:.0f} s")
+            if not waiting:
+                print(f"waiting for resources for a {part} run")
+                waiting = True
+            time.sleep(poll)
+        try:
+            yield alloc
+        finally:
+            with self._locked() as entries:
+                entries.pop(key, None)
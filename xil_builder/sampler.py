@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from xil_builder.progress import ProgressEvent
+
+PAGE = os.sysconf("SC_PAGE_SIZE")
+TICKS = os.sysconf("SC_CLK_TCK")
+COLUMNS = ["t", "cpu", "rss", "read", "write", "procs"]
+EVENT = re.compile(r"XB_PROFILE (begin|end) ")
+
+
+def _children():
+    children = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry.name))
+    return children
+
+
+def process_tree(pid: int) -> list:
+    """
+    Returns a process and all its descendants.
+
+    Args:
+      pid (int): The root process id.
+
+    Returns:
+      List[int]: The process ids, the root first.
+    """
+    children = _children()
+    tree = []
+    todo = [pid]
+    while todo:
+        p = todo.pop()
+        tree.append(p)
+        todo.extend(children.get(p, []))
+    return tree
+
+
+def tree_rss(pid: int) -> int:
+    """
+    Returns the resident memory of a process and all its descendants.
+
+    Args:
+      pid (int): The root process id.
+
+    Returns:
+      int: The resident set size in bytes.
+    """
+    rss = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/statm") as f:
+                rss += int(f.read().split()[1]) * PAGE
+        except OSError:
+            continue
+    return rss
+
+
+def process_usage(pid: int):
+    """
+    Reads the counters of one process.
+
+    Args:
+      pid (int): The process id.
+
+    Returns:
+      Tuple[int, int, int, int]: CPU ticks (user and system), resident
+      bytes, bytes read and written from storage, None if it is gone. The
+      I/O counters are 0 if /proc/<pid>/io is not readable.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss = int(f.read().split()[1]) * PAGE
+    except OSError:
+        return None
+    ticks = int(fields[11]) + int(fields[12])
+    read = write = 0
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                key, _, val = line.partition(":")
+                if key == "read_bytes":
+                    read = int(val)
+                elif key == "write_bytes":
+                    write = int(val)
+    except OSError:
+        pass
+    return ticks, rss, read, write
+
+
+class ResourceSampler:
+    def __init__(self, path: Path, interval: float = 1.0, pid: int = None):
+        """
+        Initializes a ResourceSampler object.
+
+        The sampler reads the CPU time, resident memory and storage I/O of
+        a process tree from /proc at a fixed interval while a stage is
+        open. Stages are opened by stage() on the Python side and by the
+        xb_stage markers of the generated flows, which the sampler receives
+        as a progress callback.
+
+        The timeline file holds one row per sample (time, CPU in cores,
+        RSS in bytes, read and write rates in bytes/s, processes), the
+        stages and the peak and average usage of every stage.
+
+        Args:
+          path (Path): The JSON file the timeline is written to.
+          interval (float, optional): Sampling interval in seconds.
+              Defaults to 1.0.
+          pid (int, optional): The root of the sampled tree. Defaults to
+              the current process, which includes every tool it starts.
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self.pid = os.getpid() if pid is None else pid
+        self.samples = []
+        self.stages = []
+        self._open = {}
+        self._depth = 0
+        self._lock = threading.Lock()
+        # samples are taken by the thread and at stage boundaries
+        self._sample_lock = threading.Lock()
+        self._stop = None
+        self._thread = None
+        self._last = {}
+        self._last_time = None
+
+    def sample(self):
+        """
+        Takes one sample of the process tree.
+
+        CPU and I/O are the increase of the counters of every process since
+        the previous sample; processes that ended in between only count
+        with what they used up to the previous sample.
+
+        Returns:
+          list: The row appended to the timeline.
+        """
+        with self._sample_lock:
+            return self._sample()
+
+    def _sample(self):
+        now = time.time()
+        cpu = read = write = rss = procs = 0
+        current = {}
+        for p in process_tree(self.pid):
+            usage = process_usage(p)
+            if usage is None:
+                continue
+            ticks, p_rss, p_read, p_write = usage
+            last = self._last.get(p, (0, 0, 0))
+            cpu += ticks - last[0]
+            read += p_read - last[1]
+            write += p_write - last[2]
+            rss += p_rss
+            procs += 1
+            current[p] = (ticks, p_read, p_write)
+        if self._last_time is None:
+            # counters before the first sample are not part of the run
+            row = [now, 0.0, rss, 0, 0, procs]
+        else:
+            dt = max(now - self._last_time, 1e-3)
+            row = [now, round(cpu / TICKS / dt, 2), rss,
+                   int(read / dt), int(write / dt), procs]
+        self._last = current
+        self._last_time = now
+        with self._lock:
+            self.samples.append(row)
+        return row
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def _begin(self, name: str):
+        with self._lock:
+            if name in self._open:
+                return
+            self._open[name] = None
+            self._depth += 1
+            first = self._depth == 1
+        if first:
+            self._last = {}
+            self._last_time = None
+        # every stage boundary is a sample, short stages have two rows
+        start = self.sample()[0]
+        with self._lock:
+            self._open[name] = start
+        if first:
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _end(self, name: str):
+        with self._lock:
+            if name not in self._open:
+                return
+            start = self._open.pop(name)
+            self._depth -= 1
+            last = self._depth == 0
+        if last:
+            self._stop.set()
+            self._thread.join()
+        end = self.sample()[0]
+        with self._lock:
+            self.stages.append({"name": name, "start": start, "end": end})
+        if last:
+            self.write()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Samples the process tree while a Python side stage runs.
+
+        Args:
+          name (str): The stage name.
+        """
+        self._begin(name)
+        try:
+            yield
+        finally:
+            self._end(name)
+
+    def __call__(self, ev: ProgressEvent):
+        if ev.kind != "profile":
+            return
+        m = EVENT.search(ev.message)
+        if m is None:
+            return
+        # the markers carry Vivado's clock, the stages use the samples'
+        if m.group(1) == "begin":
+            self._begin(ev.stage)
+        else:
+            self._end(ev.stage)
+
+    def summary(self) -> dict:
+        """
+        Summarizes the samples of every stage.
+
+        Returns:
+          dict: Per stage (and "total") the duration, peak and average CPU
+          in cores, peak and average RSS, bytes read and written and the
+          maximum number of processes.
+        """
+        with self._lock:
+            samples = list(self.samples)
+            stages = list(self.stages)
+        result = {}
+        spans = [(s["name"], s["start"], s["end"]) for s in stages]
+        if samples:
+            spans.append(("total", samples[0][0], samples[-1][0]))
+        for name, start, end in spans:
+            rows = [r for r in samples if start <= r[0] <= end]
+            if not rows:
+                continue
+            # rates are per second since the previous sample
+            io = [0, 0]
+            for prev, r in zip(rows, rows[1:]):
+                dt = r[0] - prev[0]
+                io[0] += r[3] * dt
+                io[1] += r[4] * dt
+            result[name] = {
+                "duration": end - start,
+                "cpu_peak": max(r[1] for r in rows),
+                "cpu_avg": round(sum(r[1] for r in rows) / len(rows), 2),
+                "rss_peak": max(r[2] for r in rows),
+                "rss_avg": int(sum(r[2] for r in rows) / len(rows)),
+                "read_bytes": int(io[0]),
+                "write_bytes": int(io[1]),
+                "procs_peak": max(r[5] for r in rows),
+            }
+        return result
+
+    def write(self):
+        """
+        Writes the timeline, the stages and the summary as JSON.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {
+                "interval": self.interval,
+                "columns": COLUMNS,
+                "samples": list(self.samples),
+                "stages": sorted(self.stages, key=lambda s: s["start"]),
+            }
+        data["summary"] = self.summary()
+        # one sample per line keeps long timelines small and greppable
+        rows = ",\n".join(json.dumps(r) for r in data.pop("samples"))
+        head = json.dumps(data, indent=1)[:-2]
+        self.path.write_text(f'{head},\n "samples": [\n{rows}\n]\n}}\n')
+
+    def print(self):
+        """
+        Prints the peak and average usage of every stage.
+        """
+        print(f"{'stage':<28}{'time':>9}{'cpu':>13}{'rss [MiB]':>17}"
+              f"{'io [MiB]':>12}")
+        for name, s in self.summary().items():
+            print(f"{name:<28}{s['duration']:>8.1f}s"
+                  f"{s['cpu_peak']:>6.1f}/{s['cpu_avg']:<6.1f}"
+                  f"{s['rss_peak'] / 2**20:>8.0f}/"
+                  f"{s['rss_avg'] / 2**20:<8.0f}"
+                  f"{(s['read_bytes'] + s['write_bytes']) / 2**20:>8.1f}")
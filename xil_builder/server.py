@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import re
+import sys
+from pathlib import Path
+from subprocess import Popen, PIPE, STDOUT, TimeoutExpired
+
+from xil_builder.sampler import tree_rss
+
+READY = "XB_READY"
+DONE = re.compile(r"XB_JOB_DONE (-?\d+)")
+
+# Installed once per Vivado process. exit is redirected into an error so a
+# job calling exit (as the generated flows do) ends the job instead of the
+# server; the design and project are closed after every job.
+BOOTSTRAP = """\
+rename exit __xb_exit
+proc exit {{code 0}} {
+  return -code error -errorcode [list XB_EXIT $code] "exit $code"
+}
+proc __xb_job {script args} {
+  set ::argv $args
+  set ::argc [llength $args]
+  set rc [catch {uplevel #0 [list source $script]} err opts]
+  set code 0
+  if {$rc == 1} {
+    set ecode [dict get $opts -errorcode]
+    if {[lindex $ecode 0] eq "XB_EXIT"} {
+      set code [lindex $ecode 1]
+    } else {
+      puts "ERROR: $err"
+      set code 1
+    }
+  }
+  catch { close_design }
+  catch { close_project }
+  puts "XB_JOB_DONE $code"
+  flush stdout
+}
+puts "XB_READY"
+flush stdout
+"""
+
+
+class VivadoServer:
+    def __init__(self, max_jobs: int = 20, max_rss: int = 8 * 2**30,
+                 workdir: Path = None, cmd=None):
+        """
+        Initializes a VivadoServer object.
+
+        The server keeps one `vivado -mode tcl` process alive and feeds it
+        generated flows over its stdin, saving the Vivado startup for every
+        job after the first one. The process is recycled after max_jobs
+        jobs or once its process tree uses more than max_rss bytes.
+
+        Args:
+          max_jobs (int, optional): Jobs per Vivado process. Defaults to 20.
+          max_rss (int, optional): Memory limit in bytes before the process
+              is recycled. Defaults to 8 GiB.
+          workdir (Path, optional): Working directory of the Vivado process.
+              Defaults to the current directory.
+          cmd (List[str], optional): Command starting the Tcl shell.
+              Defaults to vivado in tcl mode.
+        """
+        self.max_jobs = max_jobs
+        self.max_rss = max_rss
+        self.workdir = Path.cwd() if workdir is None else Path(workdir)
+        self.cmd = cmd or ["vivado", "-nolog", "-nojournal", "-mode", "tcl"]
+        self.bootstrap = self.workdir / ".xb_server.tcl"
+        self.proc = None
+        self.jobs = 0
+        self.restarts = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def alive(self) -> bool:
+        """
+        Returns whether the Vivado process is running.
+
+        Returns:
+          bool: True if the process is running.
+        """
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        """
+        Starts the Vivado process and waits until it accepts jobs.
+        """
+        self.bootstrap.write_text(BOOTSTRAP)
+        self.proc = Popen(self.cmd, stdin=PIPE, stdout=PIPE, stderr=STDOUT,
+                          text=True, bufsize=1, cwd=self.workdir)
+        self.jobs = 0
+        self._send(f"source {{{self.bootstrap.resolve().as_posix()}}}")
+        for line in self.proc.stdout:
+            if READY in line:
+                return
+        raise RuntimeError("vivado tcl server terminated during startup")
+
+    def stop(self):
+        """
+        Terminates the Vivado process.
+        """
+        if self.alive():
+            try:
+                self._send("__xb_exit")
+                self.proc.wait(timeout=60)
+            except (OSError, TimeoutExpired):
+                self.proc.kill()
+                self.proc.wait()
+        if self.proc is not None:
+            self.proc.stdin.close()
+            self.proc.stdout.close()
+        self.proc = None
+
+    def _send(self, cmd):
+        self.proc.stdin.write(cmd + "\n")
+        self.proc.stdin.flush()
+
+    def _recycle(self) -> bool:
+        if self.jobs >= self.max_jobs:
+            return True
+        return tree_rss(self.proc.pid) > self.max_rss
+
+    def run(self, tcl: Path, args=(), log: Path = None,
+            on_line=None) -> int:
+        """
+        Runs a generated flow in the warm Vivado process.
+
+        Args:
+          tcl (Path): The Tcl script to source.
+          args (list, optional): The script arguments ($argv).
+              Defaults to ().
+          log (Path, optional): Write the job output to this file instead of
+              the console. Defaults to None.
+          on_line (callable, optional): Called with every output line; a
+              True result aborts the job and kills the Vivado process.
+              Defaults to None.
+
+        Returns:
+          int: The exit code of the job.
+        """
+        if self.alive() and self._recycle():
+            self.stop()
+            self.restarts += 1
+        if not self.alive():
+            self.start()
+        targs = " ".join(str(a) for a in args)
+        self._send(f"__xb_job {{{Path(tcl).resolve().as_posix()}}} {targs}")
+        self.jobs += 1
+        out = sys.stdout if log is None else Path(log).open("w")
+        try:
+            for line in self.proc.stdout:
+                m = DONE.search(line)
+                if m is not None:
+                    return int(m.group(1))
+                out.write(line)
+                if on_line is not None and on_line(line):
+                    self.proc.kill()
+                    self.stop()
+                    return 1
+        finally:
+            if log is not None:
+                out.close()
+        # the process died while running the job
+        code = self.proc.wait()
+        self.stop()
+        return code or 1
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+import json
+from pathlib import Path
+
+from xil_builder.fingerprint import (
+    file_entries, hash_data, hash_file, hash_tree, template_digest,
+    tool_version
+)
+from xil_builder.project import Project
+
+
+class StageTracker:
+    def __init__(self, prj: Project, extra: dict = None,
+                 xdc_in_synth=False):
+        """
+        Initializes a StageTracker object.
+
+        The tracker computes one digest per build stage and compares it with
+        the digests of the last successful build, stored next to the
+        project, to decide which Vivado runs are stale:
+
+          synth: HDL, IP and BD sources, generics, syn_args, part and top
+          impl:  the synth digest plus XDC files and impl_args
+
+        Every block design additionally gets a digest of its script and a
+        digest of the BD file and wrapper Vivado generated from it, so an
+        unchanged block design in an existing project is not recreated.
+
+        Args:
+          prj (Project): The project object.
+          extra (dict, optional): Additional synthesis inputs (e.g. language
+              or git revision). Defaults to None.
+          xdc_in_synth (bool, optional): Count the XDC files as synthesis
+              inputs, for flows whose post synthesis checkpoint carries the
+              constraints. Defaults to False.
+        """
+        self.prj = prj
+        self.xdc_in_synth = xdc_in_synth
+        self.state_file = Path(prj.outdir) / f"{prj.name}.stages.json"
+        self.digests = self._compute(extra)
+        self.previous = self._load()
+        self.bd_inputs = {
+            self._bd_name(bd): self._bd_input_digest(bd)
+            for bd in prj.bd_files
+        }
+
+    def _compute(self, extra):
+        prj = self.prj
+        xdc = file_entries(prj, prj.xdc_files)
+        synth = {
+            "part": prj.part,
+            "top": prj.top,
+            "generics": prj.generics,
+            "syn_args": prj.syn_args,
+            "external_libs": [
+                hash_tree(Path(lib)) for lib in prj.external_libs or []
+            ],
+            "bd_files": file_entries(prj, prj.bd_files),
+            "ip_files": file_entries(prj, prj.ip_files),
+            "libraries": [
+                [lib.get_name(), file_entries(prj, lib.get_files())]
+                for lib in prj.libs
+            ],
+            "templates": template_digest(),
+            "tool": tool_version(),
+            "extra": extra,
+        }
+        if self.xdc_in_synth:
+            synth["xdc_files"] = xdc
+        synth = hash_data(synth)
+        impl = hash_data({
+            "synth": synth,
+            "xdc_files": xdc,
+            "impl_args": prj.impl_args,
+        })
+        return {"synth": synth, "impl": impl}
+
+    @staticmethod
+    def _bd_name(bd) -> str:
+        return bd.get_path().stem
+
+    def _bd_input_digest(self, bd) -> str:
+        prj = self.prj
+        return hash_data({
+            "script": hash_file(bd.get_path()),
+            "part": prj.part,
+            "external_libs": [
+                hash_tree(Path(lib)) for lib in prj.external_libs or []
+            ],
+            "tool": tool_version(),
+        })
+
+    def bd_outputs(self, name: str) -> list:
+        """
+        Returns the files Vivado generates from a block design script.
+
+        Args:
+          name (str): The block design name.
+
+        Returns:
+          List[Path]: The BD file and the wrappers.
+        """
+        outdir = Path(self.prj.outdir)
+        srcs = outdir / f"{self.prj.name}.srcs" / "sources_1/bd" / name
+        gen = outdir / f"{self.prj.name}.gen" / "sources_1/bd" / name
+        return [
+            srcs / f"{name}.bd",
+            gen / "hdl" / f"{name}_wrapper.v",
+            gen / "hdl" / f"{name}_wrapper.vhd",
+        ]
+
+    def _bd_output_digest(self, name: str):
+        outputs = self.bd_outputs(name)
+        if not outputs[0].is_file():
+            return None
+        return hash_data([hash_file(p) if p.is_file() else None
+                          for p in outputs])
+
+    def reuse_bd(self, bd) -> bool:
+        """
+        Returns whether a block design in the existing project is current.
+
+        Args:
+          bd (SrcFile): The block design script.
+
+        Returns:
+          bool: True if neither the script nor the generated BD changed
+              since the last successful build.
+        """
+        name = self._bd_name(bd)
+        xpr = Path(self.prj.outdir) / f"{self.prj.name}.xpr"
+        previous = self.previous.get("bd", {}).get(name)
+        if previous is None or not xpr.is_file():
+            return False
+        outputs = self._bd_output_digest(name)
+        return (outputs is not None
+                and previous.get("inputs") == self.bd_inputs[name]
+                and previous.get("outputs") == outputs)
+
+    def _load(self):
+        if not self.state_file.is_file():
+            return {}
+        try:
+            return json.loads(self.state_file.read_text())
+        except ValueError:
+            return {}
+
+    def reset_synth(self) -> bool:
+        """
+        Returns whether synth_1 has to be reset and relaunched.
+
+        Returns:
+          bool: True if the synthesis inputs changed since the last build.
+        """
+        return self.previous.get("synth") != self.digests["synth"]
+
+    def reset_impl(self) -> bool:
+        """
+        Returns whether impl_1 has to be reset and relaunched.
+
+        Returns:
+          bool: True if the implementation inputs changed since the last
+              build.
+        """
+        return self.previous.get("impl") != self.digests["impl"]
+
+    def reuse_bitstream(self) -> bool:
+        """
+        Returns whether the deployed bitstream of the last build is current.
+
+        Returns:
+          bool: True if nothing changed and the latest bitstream exists.
+        """
+        latest = Path(self.prj.outdir) / "deploy" / \
+            f"latest-{self.prj.name}.bit"
+        return not self.reset_impl() and latest.exists()
+
+    def commit(self, syn=False, impl=False):
+        """
+        Records the digests of the stages that completed successfully.
+
+        Args:
+          syn (bool, optional): Synthesis completed. Defaults to False.
+          impl (bool, optional): Implementation completed. Defaults to False.
+        """
+        state = dict(self.previous)
+        # the block designs are generated by every run of the flow
+        state["bd"] = {
+            name: {"inputs": digest,
+                   "outputs": self._bd_output_digest(name)}
+            for name, digest in self.bd_inputs.items()
+        }
+        if syn or impl:
+            state["synth"] = self.digests["synth"]
+        if impl:
+            state["impl"] = self.digests["impl"]
+        self.state_file.write_text(json.dumps(state, indent=2))
+        self.previous = state
+
+    def print(self):
+        """
+        Prints which stages are invalidated.
+        """
+        print(f"synth stale:\t{self.reset_synth()}")
+        print(f"impl stale:\t{self.reset_impl()}")
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import signal
+import time
+from itertools import islice
+from pathlib import Path
+from queue import Queue
+from subprocess import Popen, PIPE, STDOUT
+from threading import Thread
+
+from xil_builder.artifacts import ArtifactStore
+from xil_builder.project import Project
+from xil_builder.resources import available_cpus, MAX_THREADS
+
+# directives used for steps a strategy does not mention
+DEFAULT_DIRECTIVES = {
+    "opt_design": "Explore",
+    "place_design": "Explore",
+    "phys_opt_design": "AggressiveExplore",
+    "route_design": "Explore",
+}
+
+DEFAULT_STRATEGIES = [
+    {},
+    {"place_design": "ExtraNetDelay_high"},
+    {"place_design": "ExtraPostPlacementOpt"},
+    {"place_design": "ExtraTimingOpt"},
+    {"place_design": "AltSpreadLogic_high"},
+    {"place_design": "WLDrivenBlockPlacement"},
+    {"opt_design": "ExploreWithRemap", "place_design": "EarlyBlockPlacement"},
+    {"place_design": "Explore", "route_design": "AggressiveExplore"},
+]
+
+MARKER = "XB_SWEEP"
+
+
+class SweepRun:
+    def __init__(self, index: int, strategy: dict, rundir: Path):
+        """
+        Initializes a SweepRun object.
+
+        Args:
+          index (int): The run number.
+          strategy (dict): Directive per implementation step.
+          rundir (Path): The run directory.
+        """
+        self.index = index
+        self.strategy = dict(DEFAULT_DIRECTIVES, **strategy)
+        self.rundir = Path(rundir)
+        self.tcl = self.rundir / "run.tcl"
+        self.log = self.rundir / "run.log"
+        self.place_wns = None
+        self.route_wns = None
+        self.status = "pending"
+        self.returncode = None
+        self.proc = None
+
+    def print(self):
+        """
+        Prints the run's strategy and results.
+        """
+        directives = ", ".join(
+            f"{k}={v}" for k, v in self.strategy.items()
+        )
+        print(f"run{self.index}\t{self.status}\tplace={self.place_wns}\t"
+              f"route={self.route_wns}\t{directives}")
+
+
+class StrategySweep:
+    def __init__(self, prj: Project, checkpoint: Path = None,
+                 strategies=None, runs: int = None, jobs: int = None,
+                 prune_margin: float = 0.5, artifacts: ArtifactStore = None,
+                 git_sha: str = None):
+        """
+        Initializes a StrategySweep object.
+
+        The sweep fans one synthesized checkpoint out to several
+        implementation runs with different directive combinations, prunes
+        runs whose post-place WNS trails the best one by more than
+        prune_margin and promotes the best routed result into deploy/.
+
+        Args:
+          prj (Project): The project object.
+          checkpoint (Path, optional): The synthesized checkpoint, see
+              Vivado.synth_checkpoint(). Defaults to the synth_1
+              checkpoint of the project mode flow.
+          strategies (List[dict], optional): Directive per step for every
+              run. Defaults to the project's sweep section or
+              DEFAULT_STRATEGIES.
+          runs (int, optional): Limit the number of strategies. Defaults to
+              None (all).
+          jobs (int, optional): Concurrent Vivado runs. Defaults to the
+              number of runs.
+          prune_margin (float, optional): Post-place WNS margin in ns.
+              Defaults to 0.5.
+          artifacts (ArtifactStore, optional): Add the promoted result to
+              this store. Defaults to None.
+          git_sha (str, optional): The revision recorded for the promoted
+              result. Defaults to None.
+        """
+        self.prj = prj
+        if checkpoint is None:
+            checkpoint = Path(prj.outdir) / f"{prj.name}.runs" / \
+                "synth_1" / f"{prj.top}.dcp"
+        self.checkpoint = Path(checkpoint)
+        if strategies is None:
+            strategies = prj.sweep or DEFAULT_STRATEGIES
+        strategies = list(islice(strategies, runs))
+        assert len(strategies) > 0, "no implementation strategies"
+        self.jobs = jobs or len(strategies)
+        self.prune_margin = prune_margin
+        self.artifacts = artifacts
+        self.git_sha = git_sha
+        self.sweep_dir = Path(prj.outdir) / "sweep"
+        threads = max(1, min(MAX_THREADS, available_cpus() // self.jobs))
+        self.runs = []
+        for i, strategy in enumerate(strategies):
+            run = SweepRun(i, strategy, self.sweep_dir / f"run{i}")
+            run.rundir.mkdir(parents=True, exist_ok=True)
+            with run.tcl.open("w") as f:
+                self._write_run(f, run, threads)
+            self.runs.append(run)
+
+    def _write_run(self, f, run: SweepRun, threads: int):
+        f.write("#######################################\n")
+        f.write(f"# Strategy sweep run {run.index}\n")
+        f.write("# autogenerated file\n")
+        f.write("# DO NOT TOUCH\n")
+        f.write("#######################################\n")
+        din = Path(__file__).parent / "tcl" / "git.tcl"
+        with din.open("r") as d:
+            f.write(d.read())
+        f.write("\n")
+        din = Path(__file__).parent / "tcl" / "non_project.tcl"
+        with din.open("r") as d:
+            f.write(d.read())
+        f.write("\n\n")
+        s = run.strategy
+        f.write(f"set_param general.maxThreads {threads}\n")
+        f.write(f"set NAME {self.prj.name}\n")
+        f.write(f"set DIR {run.rundir.resolve().as_posix()}\n")
+        f.write(f"open_checkpoint {self.checkpoint.resolve().as_posix()}\n")
+        f.write(f"opt $NAME $DIR {s['opt_design']}\n")
+        f.write(f"place $NAME $DIR {s['place_design']}\n")
+        f.write(f'puts "{MARKER} place_wns [setup_wns]"\n')
+        # the enable flags of the project apply to every strategy, like in
+        # the non-project flow
+        impl_args = self.prj.impl_args or {}
+        args = {
+            k.lower(): v
+            for k, v in (impl_args.get("phys_opt_design") or {}).items()
+        }
+        if args.get("is_enabled", True):
+            f.write(f"phys_opt $NAME $DIR {s['phys_opt_design']}\n")
+        f.write(f"set wns [route $NAME $DIR {s['route_design']}]\n")
+        args = {
+            k.lower(): v for k, v in
+            (impl_args.get("post_route_phys_opt_design") or {}).items()
+        }
+        if args.get("is_enabled", False):
+            f.write("phys_opt_design -directive "
+                    f"{args.get('directive', 'Default')}\n")
+            f.write("set wns [setup_wns]\n")
+        f.write(f'puts "{MARKER} route_wns $wns"\n')
+        f.write("write_debug_probes -force $DIR/$NAME.ltx\n")
+        f.write("write_bitstream -force $DIR/$NAME.bit -bin_file\n")
+        f.write("catch { write_hw_platform -fixed -include_bit -force "
+                "-file $DIR/$NAME.xsa }\n")
+
+    @staticmethod
+    def _reader(run: SweepRun, events: Queue):
+        with run.log.open("w") as log:
+            for line in run.proc.stdout:
+                log.write(line)
+                if line.startswith(MARKER):
+                    try:
+                        _, key, val = line.split()
+                        events.put((run, key, float(val)))
+                    except ValueError:
+                        pass
+        run.proc.stdout.close()
+        events.put((run, "exit", run.proc.wait()))
+
+    def _start(self, run: SweepRun, events: Queue):
+        pargs = [
+            "vivado",
+            "-nolog",
+            "-nojournal",
+            "-mode",
+            "batch",
+            "-source",
+            run.tcl.resolve().as_posix(),
+        ]
+        run.proc = Popen(pargs, stdout=PIPE, stderr=STDOUT, text=True,
+                         cwd=run.rundir, start_new_session=True)
+        run.status = "running"
+        Thread(target=self._reader, args=(run, events), daemon=True).start()
+
+    def _prune(self):
+        placed = [r.place_wns for r in self.runs if r.place_wns is not None]
+        if not placed:
+            return
+        best = max(placed)
+        for r in self.runs:
+            if r.status != "running" or r.place_wns is None:
+                continue
+            if best - r.place_wns > self.prune_margin:
+                print(f"pruning run{r.index}: post-place WNS "
+                      f"{r.place_wns} vs. best {best}")
+                r.status = "pruned"
+                try:
+                    os.killpg(r.proc.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    def run(self):
+        """
+        Runs all strategies and waits for them to finish or to be pruned.
+
+        Returns:
+          List[SweepRun]: The runs sorted by routed WNS, best first.
+        """
+        events = Queue()
+        pending = list(self.runs)
+        active = 0
+        while pending or active:
+            while pending and active < self.jobs:
+                self._start(pending.pop(0), events)
+                active += 1
+            run, key, val = events.get()
+            if key == "place_wns":
+                run.place_wns = val
+                self._prune()
+            elif key == "route_wns":
+                run.route_wns = val
+            elif key == "exit":
+                active -= 1
+                run.returncode = val
+                if run.status == "running":
+                    ok = val == 0 and run.route_wns is not None
+                    run.status = "ok" if ok else "failed"
+        return sorted(
+            self.runs,
+            key=lambda r: (r.status != "ok", -(r.route_wns or 0.0)),
+        )
+
+    def promote(self, run: SweepRun) -> Path:
+        """
+        Copies a run's artifacts into deploy/ and updates the latest links.
+        With an artifact store the promoted build is added to the store and
+        old builds are pruned, like after a regular build.
+
+        Args:
+          run (SweepRun): The run to promote.
+
+        Returns:
+          Path: The promoted bitstream.
+        """
+        assert run.status == "ok", f"run{run.index} did not complete"
+        deploy = Path(self.prj.outdir) / "deploy"
+        deploy.mkdir(parents=True, exist_ok=True)
+        name = self.prj.name
+        stamp = time.strftime("%Y-%m-%d_%H-%M-%S")
+        stem = f"{name}_sweep{run.index}_{stamp}_{run.route_wns:.3f}ns"
+        for ext in ["bit", "bin", "ltx", "xsa"]:
+            src = run.rundir / f"{name}.{ext}"
+            if not src.is_file():
+                continue
+            shutil.copy2(src, deploy / f"{stem}.{ext}")
+            link = deploy / f"latest-{name}.{ext}"
+            if link.is_symlink() or link.exists():
+                link.unlink()
+            link.symlink_to(f"{stem}.{ext}")
+        if self.artifacts is not None:
+            manifest = self.artifacts.ingest(name, self.git_sha,
+                                             run.route_wns)
+            if manifest is not None:
+                removed = self.artifacts.prune()
+                if removed:
+                    print(f"pruned {len(removed)} old builds from deploy")
+        return deploy / f"{stem}.bit"
+
+    def build(self):
+        """
+        Runs the sweep and promotes the best result.
+
+        Returns:
+          SweepRun: The best run or None if no run completed.
+        """
+        assert self.checkpoint.is_file(), \
+            f"{self.checkpoint} is not a file, run synthesis first"
+        ranked = self.run()
+        for r in ranked:
+            r.print()
+        best = ranked[0]
+        if best.status != "ok":
+            return None
+        self.promote(best)
+        return best
@@ -1,8 +1,12 @@
 #######################################
 # Git Procedures
 #######################################
+# GIT_REV and GIT_BRANCH are set by the generator from the snapshot taken
+# before the build, git is only started for scripts written without them
 proc git_revision { } {
-  # The Maximum number of seconds
+  if {[info exists ::GIT_REV]} {
+    return $::GIT_REV
+  }
   #set cmd "git rev-parse --short=8 HEAD"
   set cmd "git describe --always --dirty"
   if {[catch {open "|$cmd"} input] } {
@@ -16,7 +20,9 @@ proc git_revision { } {
 }
 
 proc git_branch { } {
-  # The Maximum number of seconds
+  if {[info exists ::GIT_BRANCH]} {
+    return $::GIT_BRANCH
+  }
   set cmd "git branch --show-current"
   if {[catch {open "|$cmd"} input] } {
     return -code error $input
@@ -22,7 +22,7 @@ proc place {PRJ_NAME PRJ_DIR {DIRECTIVE "Explore"} } {
   write_checkpoint -force $PRJ_DIR/${PRJ_NAME}_post_place.dcp
 }
 
-proc phys_opt {PRJ_NAME PRJ_DIR {DIRECTIVE "AggresiveExplore"}} {
+proc phys_opt {PRJ_NAME PRJ_DIR {DIRECTIVE "AggressiveExplore"}} {
   phys_opt_design -directive $DIRECTIVE
   report_timing_summary -file $PRJ_DIR/${PRJ_NAME}_post_place_physopt_tim.rpt
   report_utilization -file $PRJ_DIR/${PRJ_NAME}_post_place_physopt_util.rpt
@@ -37,17 +37,23 @@ proc phys_opt_loop { PRJ_NAME PRJ_DIR WNS } {
       phys_opt_design -directive AggressiveFanoutOpt
       phys_opt_design -directive AlternateReplication
     }
-    report_timing_summary -file $PROJ_DIR/${PROJ_NM}_post_place_physopt_tim.rpt
+    report_timing_summary -file $PRJ_DIR/${PRJ_NAME}_post_place_physopt_tim.rpt
     report_design_analysis -logic_level_distribution \
       -of_timing_paths [get_timing_paths -max_paths 10000 \
-      -slack_lesser_than 0] \ 
-      -file $PROJ_DIR/post_place_physopt_vios.rpt
-    write_checkpoint -force $PROJ_DIR/${PROJ_NM}_post_place_physopt.dcp
+      -slack_lesser_than 0] \
+      -file $PRJ_DIR/${PRJ_NAME}_post_place_physopt_vios.rpt
+    write_checkpoint -force $PRJ_DIR/${PRJ_NAME}_post_place_physopt.dcp
   }
 }
 
 
-proc route {PRJ_NAME PRJ_DIR {$DIRECTIVE "Explore"}} {
+proc setup_wns { } {
+  set WNS "0.00"
+  catch {set WNS [get_property SLACK [get_timing_paths -max_paths 1 -nworst 1 -setup]]}
+  return $WNS
+}
+
+proc route {PRJ_NAME PRJ_DIR {DIRECTIVE "Explore"}} {
   route_design -directive $DIRECTIVE
   report_timing_summary -file $PRJ_DIR/${PRJ_NAME}_post_route_tim.rpt
   report_utilization -hierarchical -file $PRJ_DIR/${PRJ_NAME}_post_route_util.rpt
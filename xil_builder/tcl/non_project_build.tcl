@@ -0,0 +1,75 @@
+##############################################
+# Start synthesis (conditional)
+##############################################
+# reset_syn/reset_impl/reuse_bit are computed by the generator from the
+# inputs of the last successful build; the checkpoints written after every
+# stage replace the run directories of the project mode
+set SYN_DCP $PRJ_DIR/${PRJ_NAME}_post_synth.dcp
+if {$ena_syn || $ena_impl } {
+  if { $reset_syn || ![file exists $SYN_DCP] } {
+    xb_stage synth begin
+    synth $PRJ_NAME $PRJ_DIR $SYN_ARGS $TOP_MODULE $PART
+    xb_stage synth end
+    set reset_impl 1
+  } else {
+    puts "post synthesis checkpoint is up to date, skipping synthesis"
+    open_checkpoint $SYN_DCP
+  }
+}
+
+##############################################
+# Start implementation (conditional)
+##############################################
+if { !$ena_impl } {
+  puts "Skipping implementation"
+  exit 0
+}
+if { !$reset_impl && $reuse_bit } {
+  puts "Reusing deployed bitstream"
+  exit 0
+}
+
+xb_stage opt begin
+opt   $PRJ_NAME $PRJ_DIR $OPT_DIRECTIVE
+xb_stage opt end
+xb_stage place begin
+place $PRJ_NAME $PRJ_DIR $PLACE_DIRECTIVE
+xb_stage place end
+if { $ena_phys_opt } {
+  xb_stage phys_opt begin
+  phys_opt $PRJ_NAME $PRJ_DIR $PHYS_OPT_DIRECTIVE
+  xb_stage phys_opt end
+}
+xb_stage route begin
+set WNS [route $PRJ_NAME $PRJ_DIR $ROUTE_DIRECTIVE]
+xb_stage route end
+if { $ena_post_route_phys_opt } {
+  xb_stage post_route_phys_opt begin
+  phys_opt_design -directive $POST_ROUTE_PHYS_OPT_DIRECTIVE
+  write_checkpoint -force $PRJ_DIR/${PRJ_NAME}_post_route_physopt.dcp
+  set WNS [setup_wns]
+  xb_stage post_route_phys_opt end
+}
+
+##############################################
+# start post build
+##############################################
+set BUILD_DATE    [ clock format [ clock seconds ] -format %Y-%m-%d ]
+set BUILD_TIME    [ clock format [ clock seconds ] -format %H-%M-%S ]
+set BUILD_REV     [ git_revision ]
+set BUILD_BRANCH  [ git_branch   ]
+puts "Post Route WNS = $WNS"
+
+set BUILD_NAME ${PRJ_NAME}_${BUILD_BRANCH}_${BUILD_REV}_${BUILD_DATE}_${BUILD_TIME}_${WNS}ns
+file mkdir $PRJ_DIR/deploy
+write_debug_probes -force $PRJ_DIR/deploy/${BUILD_NAME}.ltx
+xb_stage write_bitstream begin
+write_bitstream    -force $PRJ_DIR/deploy/${BUILD_NAME}.bit -bin_file
+xb_stage write_bitstream end
+xb_stage write_hw_platform begin
+write_hw_platform  -file  $PRJ_DIR/deploy/${BUILD_NAME}.xsa -force -fixed -include_bit
+xb_stage write_hw_platform end
+
+foreach ext {xsa bit bin ltx} {
+  catch {exec ln -sf "${BUILD_NAME}.${ext}" "$PRJ_DIR/deploy/latest-${PRJ_NAME}.${ext}"}
+}
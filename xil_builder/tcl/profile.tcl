@@ -0,0 +1,23 @@
+#######################################
+# Profiling Procedures
+#######################################
+proc xb_mem { } {
+  # peak and current resident memory of this process in kB, the runs
+  # of a project are child processes sampled by BuildProfile
+  set hwm 0
+  set rss 0
+  catch {
+    set fp [open /proc/[pid]/status r]
+    foreach line [split [read $fp] "\n"] {
+      regexp {^VmHWM:\s+(\d+)} $line -> hwm
+      regexp {^VmRSS:\s+(\d+)} $line -> rss
+    }
+    close $fp
+  }
+  return "$hwm $rss"
+}
+
+proc xb_stage { name event } {
+  puts "XB_PROFILE $event $name [clock milliseconds] [xb_mem]"
+  flush stdout
+}
@@ -0,0 +1,91 @@
+#######################################
+# Source Loading Procedures
+#######################################
+# reset for every flow, a warm Vivado server sources several flows
+set XB_READ_ERRORS 0
+array unset XB_KNOWN
+
+proc xb_known { file } {
+  # files of a reopened project are already part of it
+  global XB_KNOWN
+  if { ![array exists XB_KNOWN] } {
+    array set XB_KNOWN {}
+    foreach f [get_files -quiet -all] {
+      set XB_KNOWN([file normalize $f]) 1
+    }
+  }
+  return [info exists XB_KNOWN([file normalize $file])]
+}
+
+proc xb_catch { script } {
+  # runs a command that is allowed to fail, the errors Vivado prints for
+  # it are enclosed in XB_CAUGHT markers like the caught reads of xb_read
+  puts "XB_CAUGHT begin"
+  set failed [catch { uplevel 1 $script }]
+  puts "XB_CAUGHT end"
+  return $failed
+}
+
+proc xb_read { cmd files } {
+  # read all files with one command, if that fails read them one by one
+  # to report every file that cannot be read; the errors Vivado prints
+  # for the caught reads are enclosed in XB_CAUGHT markers
+  global XB_KNOWN XB_READ_ERRORS
+  set todo {}
+  foreach file $files {
+    if { ![xb_known $file] } {
+      lappend todo $file
+    }
+  }
+  if { [llength $todo] == 0 } {
+    return
+  }
+  set failed {}
+  puts "XB_CAUGHT begin"
+  if { [catch { {*}$cmd $todo }] } {
+    foreach file $todo {
+      if { [llength [get_files -quiet $file]] } {
+        continue
+      }
+      if { [catch { {*}$cmd $file } err] } {
+        lappend failed $file $err
+      }
+    }
+  }
+  puts "XB_CAUGHT end"
+  foreach {file err} $failed {
+    puts "ERROR: \[xil_builder\] cannot read $file: $err"
+    incr XB_READ_ERRORS
+  }
+  foreach file $todo {
+    set XB_KNOWN([file normalize $file]) 1
+  }
+}
+
+proc xb_read_check { } {
+  global XB_READ_ERRORS
+  if { $XB_READ_ERRORS } {
+    puts "ERROR: \[xil_builder\] $XB_READ_ERRORS source files could not be read"
+    exit 1
+  }
+}
+
+proc xb_order { files unused } {
+  # a reopened project keeps the files pruned from the compile order and
+  # its old order with new files appended; remove the pruned files and
+  # move the compile order to the front of the fileset
+  set stale {}
+  foreach file $unused {
+    lappend stale {*}[get_files -quiet [file normalize $file]]
+  }
+  if { [llength $stale] } {
+    remove_files -fileset sources_1 $stale
+  }
+  set order {}
+  foreach file $files {
+    lappend order {*}[get_files -quiet [file normalize $file]]
+  }
+  if { [llength $order] } {
+    reorder_files -fileset sources_1 -front $order
+  }
+}
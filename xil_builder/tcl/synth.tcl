@@ -1,10 +1,21 @@
 ##############################################
 # Start synthesis (conditional)
 ##############################################
+# reset_syn/reset_impl/reuse_bit are computed by the generator from the
+# inputs of the last successful build; a run that never completed is always
+# relaunched
 if {$ena_syn || $ena_impl } {
-  reset_runs synth_1
-  catch { launch_runs synth_1 -jobs 24 }
-  catch { wait_on_runs synth_1 }
+  if { $reset_syn || [get_property PROGRESS [get_runs synth_1]] ne "100%" } {
+    xb_stage synth begin
+    reset_runs synth_1
+    catch { launch_runs synth_1 -jobs $JOBS }
+    catch { wait_on_runs synth_1 }
+    xb_stage synth end
+    set reset_impl 1
+  } else {
+    puts "synth_1 is up to date, skipping synthesis"
+    set_property NEEDS_REFRESH false [get_runs synth_1]
+  }
   set syn_prog [get_property PROGRESS [get_run synth_1]]
   set syn_stat [get_property STATUS [get_run synth_1]]
   puts $syn_prog
@@ -19,8 +30,20 @@ if {$ena_syn || $ena_impl } {
 # Start implementation (conditional)
 ##############################################
 if { $ena_impl } {
-  launch_runs impl_1 -to_step write_bitstream -jobs 24
-  catch { wait_on_run impl_1 }
+  if { $reset_impl || [get_property PROGRESS [get_runs impl_1]] ne "100%" } {
+    xb_stage impl begin
+    reset_runs impl_1
+    launch_runs impl_1 -to_step write_bitstream -jobs $JOBS
+    catch { wait_on_run impl_1 }
+    xb_stage impl end
+  } else {
+    puts "impl_1 is up to date, skipping implementation"
+    set_property NEEDS_REFRESH false [get_runs impl_1]
+    if { $reuse_bit } {
+      puts "Reusing deployed bitstream"
+      exit 0
+    }
+  }
   set imp_prog [get_property PROGRESS [get_run impl_1]]
   set imp_stat [get_property STATUS [get_run impl_1]]
   puts $imp_prog
@@ -49,9 +72,15 @@ puts "Post Route WNS = $WNS"
 
 file mkdir $PRJ_DIR/deploy
 write_debug_probes -force $PRJ_DIR/deploy/${PRJ_NAME}_${BUILD_BRANCH}_${BUILD_REV}_${BUILD_DATE}_${BUILD_TIME}_${WNS}ns.ltx
+xb_stage write_bitstream begin
 write_bitstream    -force $PRJ_DIR/deploy/${PRJ_NAME}_${BUILD_BRANCH}_${BUILD_REV}_${BUILD_DATE}_${BUILD_TIME}_${WNS}ns.bit -bin_file
+xb_stage write_bitstream end
+xb_stage write_hw_platform begin
 write_hw_platform  -file  $PRJ_DIR/deploy/${PRJ_NAME}_${BUILD_BRANCH}_${BUILD_REV}_${BUILD_DATE}_${BUILD_TIME}_${WNS}ns.xsa -force -fixed -include_bit
+xb_stage write_hw_platform end
+xb_stage archive_project begin
 archive_project           $PRJ_DIR/deploy/${PRJ_NAME}_${BUILD_BRANCH}_${BUILD_REV}_${BUILD_DATE}_${BUILD_TIME}_${WNS}ns.zip
+xb_stage archive_project end
 
 catch {exec ln -sf "${PRJ_NAME}_${BUILD_BRANCH}_${BUILD_REV}_${BUILD_DATE}_${BUILD_TIME}_${WNS}ns.xsa" "$PRJ_DIR/deploy/latest-${PRJ_NAME}.xsa"}
 catch {exec ln -sf "${PRJ_NAME}_${BUILD_BRANCH}_${BUILD_REV}_${BUILD_DATE}_${BUILD_TIME}_${WNS}ns.bit" "$PRJ_DIR/deploy/latest-${PRJ_NAME}.bit"}
@@ -1,13 +1,46 @@
 #!/usr/bin/env python3
+from contextlib import contextmanager, nullcontext, ExitStack
+import json
+import time
 from pathlib import Path
-from subprocess import run
-import git
+from subprocess import run, STDOUT, CompletedProcess
+from threading import Event
+from xil_builder.artifacts import ArtifactStore
+from xil_builder.cache import BuildCache
+from xil_builder.fingerprint import project_fingerprint
+from xil_builder.gitinfo import snapshot
+from xil_builder.hdl_deps import DependencyGraph
+from xil_builder.ipcache import IpCache
 from xil_builder.library import FType
+from xil_builder.preflight import check
+from xil_builder.profile import BuildProfile
+from xil_builder.progress import (
+    stream, dispatch, VivadoLogParser, PetalinuxLogParser
+)
 from xil_builder.project import Project
+from xil_builder.resources import ResourceLedger, allocate
+from xil_builder.sampler import ResourceSampler
+from xil_builder.server import VivadoServer
+from xil_builder.stages import StageTracker
+from xil_builder.xsa import xsa_fingerprint, rebuild_plan, extract_bitstream
 
 
 class Vivado:
-    def __init__(self, prj: Project, lang: str = "vhdl"):
+    READ_HDL = {
+        FType.VHDL: "read_vhdl -vhdl2008",
+        FType.VERILOG: "read_verilog",
+        FType.SYSTEMVERILOG: "read_verilog -sv",
+    }
+    # characters of file names per read command
+    READ_CHUNK = 32768
+
+    def __init__(self, prj: Project, lang: str = "vhdl",
+                 cache: BuildCache = None, callbacks=None, fail_fast=False,
+                 profile: BuildProfile = None, hdl_deps=False,
+                 ip_cache: IpCache = None, artifacts: ArtifactStore = None,
+                 resources: ResourceLedger = None,
+                 sampler: ResourceSampler = None, cancel: Event = None,
+                 preflight=False, vivado_log: Path = None):
         """
         Initializes a Vivado object.
 
@@ -17,22 +50,165 @@ class Vivado:
               Defaults to False.
           lang (str, optional): The language used in the project.
               Defaults to "vhdl".
+          cache (BuildCache, optional): Build cache used to skip Vivado
+              when an identical project was built before. Defaults to None.
+          callbacks (List[callable], optional): Progress callbacks called
+              with every ProgressEvent parsed from the streamed Vivado
+              output. Defaults to None.
+          fail_fast (bool, optional): Abort the build on the first ERROR
+              line. Defaults to False.
+          profile (BuildProfile, optional): Records the time and memory of
+              the Tcl generation, the Vivado run and every stage of the
+              generated flow. Defaults to None.
+          hdl_deps (bool, optional): Order the HDL files by the dependencies
+              found by the Python scanner and leave out files the top does
+              not reference, instead of letting Vivado find the compile
+              order. Defaults to False.
+          ip_cache (IpCache, optional): Shared IP cache the generated
+              project uses for out-of-context IP results. Defaults to None.
+          artifacts (ArtifactStore, optional): Store the deploy artifacts
+              of every full build are added to, deduplicated and pruned
+              by. Defaults to None.
+          resources (ResourceLedger, optional): Ledger of the host the
+              build waits in until enough CPUs and memory are free.
+              Defaults to None, the jobs and threads are then chosen from
+              the resources free when the build starts.
+          sampler (ResourceSampler, optional): Samples CPU, memory and I/O
+              of all processes of the build per stage. Defaults to None.
+          cancel (threading.Event, optional): Terminates a running build
+              when set. Defaults to None.
+          preflight (bool, optional): Validate the project before the
+              flow is generated. Defaults to False.
+          vivado_log (Path, optional): Vivado writes its log to this file
+              in batch mode, besides the console output. Defaults to None
+              (no log).
+
+        Raises:
+          PreflightError: If preflight is enabled and the project is
+          invalid.
         """
         self.lang = lang
         self.prj = prj
+        self.cache = cache
+        self.callbacks = list(callbacks or [])
+        self.fail_fast = fail_fast
+        self.profile = profile
+        self.hdl_deps = hdl_deps
+        self.compile_order = None
+        self.unused = []
+        self.ip_cache = ip_cache
+        self.artifacts = artifacts
+        self.resources = resources
+        self.sampler = sampler
+        self.cancel = cancel
+        self.preflight = preflight
+        self.vivado_log = vivado_log
+        self.cache_hit = False
+        self.started = 0
+        if preflight:
+            check(prj)
+        self.resources_tcl = \
+            self.prj.outdir / f"{self.prj.name}.resources.tcl"
+        if profile is not None:
+            self.callbacks.append(profile)
+        if ip_cache is not None:
+            self.callbacks.append(ip_cache)
+        if sampler is not None:
+            self.callbacks.append(sampler)
+        self.git = None
+        self.git_sha = None
+        self.git_dirty = None
+        self.stages = None
         self.prj.outdir.mkdir(parents=True, exist_ok=True)
 
         self.build_tcl = self.prj.outdir / str(self.prj.name + ".tcl")
-        with self.build_tcl.open("w") as f:
-            self._prj_flow_head(f)
-            self._prj_flow_libs(f)
-            self._prj_flow_xdc(f)
-            self._prj_flow_hdl(f)
-            self._prj_flow_ip(f)
-            self._prj_flow_bd(f)
-            self._prj_flow_top(f)
-            self._prj_flow_build(f)
-            self._prj_flow_post(f)
+        with self._profiled("tcl_generation"):
+            with self.build_tcl.open("w") as f:
+                self._write_flow(f)
+
+    def _profiled(self, name):
+        stack = ExitStack()
+        if self.profile is not None:
+            stack.enter_context(self.profile.stage(name))
+        if self.sampler is not None:
+            stack.enter_context(self.sampler.stage(name))
+        return stack
+
+    def _configure_resources(self, f):
+        """
+        Writes the Vivado jobs and threads. The defaults are chosen for the
+        resources free now, the build replaces them by the allocation it
+        was admitted with.
+
+        Args:
+          f (file): The file object to write to.
+        """
+        f.write(allocate(self.prj.part, runs=self._parallel_runs()).tcl())
+        f.write(f"catch {{source {self.resources_tcl.as_posix()}}}\n")
+        f.write("set_param general.maxThreads $THREADS\n")
+
+    def _parallel_runs(self) -> int:
+        # every IP and block design adds out-of-context runs that
+        # launch_runs starts next to synth_1
+        return 1 + len(self.prj.ip_files) + len(self.prj.bd_files)
+
+    @contextmanager
+    def _admitted(self):
+        runs = self._parallel_runs()
+        if self.resources is None:
+            admission = nullcontext(allocate(self.prj.part, runs=runs))
+        else:
+            admission = self.resources.admit(self.prj.part, runs=runs)
+        with admission as alloc:
+            print(f"vivado resources: {alloc}")
+            self.resources_tcl.write_text(alloc.tcl())
+            yield alloc
+
+    @staticmethod
+    def _prj_flow_stage(f, name, event):
+        """
+        Writes a profiling marker reporting the begin or end of a stage.
+
+        Args:
+          f (file): The file object to write the marker to.
+          name (str): The stage name.
+          event (str): "begin" or "end".
+        """
+        f.write(f"xb_stage {name} {event}\n")
+
+    def _write_flow(self, f):
+        """
+        Writes the complete build flow.
+
+        Args:
+          f (file): The file object to write the flow to.
+        """
+        self._prj_flow_head(f)
+        if self._synth_current():
+            f.write('puts "synthesis is up to date, skipping the sources"\n')
+        else:
+            self._prj_flow_sources(f)
+        self._prj_flow_build(f)
+        self._prj_flow_post(f)
+
+    def _prj_flow_sources(self, f):
+        self._prj_flow_libs(f)
+        sections = [
+            ("read_xdc", self._prj_flow_xdc),
+            ("read_hdl", self._prj_flow_hdl),
+            ("read_ip", self._prj_flow_ip),
+        ]
+        for name, section in sections:
+            self._prj_flow_stage(f, name, "begin")
+            section(f)
+            self._prj_flow_stage(f, name, "end")
+        f.write("xb_read_check\n")
+        self._prj_flow_bd(f)
+        self._prj_flow_top(f)
+
+    def _synth_current(self) -> bool:
+        # the project keeps its sources, every flow adds the new ones
+        return False
 
     def _prj_flow_libs(self, f):
         if self.prj.external_libs is not None:
@@ -47,7 +223,9 @@ class Vivado:
                 f.write("set_property ip_repo_paths ")
                 f.write(f"{Path(lib).resolve().as_posix()}")
                 f.write(" [current_project] }\n")
+            self._prj_flow_stage(f, "ip_catalog", "begin")
             f.write("update_ip_catalog -rebuild\n")
+            self._prj_flow_stage(f, "ip_catalog", "end")
             f.write("\n")
 
     def _configure_impl_step(self, f, step):
@@ -111,20 +289,60 @@ class Vivado:
                   "route_design" | "post_route_phys_opt_design":
                     self._configure_impl_step(f, key)
                 case _:
-                    print("unknown impl arg")
+                    print(f"unknown impl arg {key}")
                     continue
 
+    def _sources(self):
+        files = self.prj.bd_files + self.prj.ip_files + self.prj.xdc_files
+        for lib in self.prj.libs:
+            files = files + lib.get_files()
+        return [self.prj.yaml] + [s.get_path() for s in files]
+
+    def _git_snapshot(self):
+        """
+        Returns the git snapshot of the build, taken once per build.
+
+        The dirty state only covers the YAML file and the sources of the
+        project. The snapshot is cached in the output directory.
+
+        Returns:
+          GitSnapshot: The snapshot.
+        """
+        if self.git is None:
+            cache_file = self.prj.outdir / f"{self.prj.name}.git.json"
+            self.git = snapshot(self._sources(), cache_file)
+            self.git_sha = self.git.short_sha
+            self.git_dirty = self.git.dirty
+        return self.git
+
+    def _git_generics(self):
+        """
+        Returns the generics describing the git revision of the build.
+
+        Returns:
+          dict: g_git_sha and g_git_dirty.
+        """
+        git = self._git_snapshot()
+        return {"g_git_sha": f'x"{git.short_sha}"', "g_git_dirty": git.dirty}
+
+    def _write_git(self, f):
+        """
+        Writes the git procedures and the snapshot they report.
+
+        Args:
+          f (file): The file object to write to.
+        """
+        f.write(self._git_snapshot().tcl())
+        din = Path(__file__).parent / "tcl" / "git.tcl"
+        with din.open("r") as d:
+            f.write(d.read())
+
     def _configure_generics(self, f):
         f.write("\n")
-        repo = git.Repo(search_parent_directories=True)
-        sha = repo.head.object.hexsha[0:8]
-        dirty = repo.is_dirty()
-        f.write('set_property generic {')
-        f.write(f'g_git_sha=x"{sha}"')
-        f.write('} [current_fileset]\n')
-        f.write('set_property generic {')
-        f.write(f'g_git_dirty={dirty}')
-        f.write('} [current_fileset]\n')
+        for key, val in self._git_generics().items():
+            f.write('set_property generic {')
+            f.write(f'{key}={val}')
+            f.write('} [current_fileset]\n')
 
         for key in self.prj.generics:
             val = self.prj.generics.get(key)
@@ -139,27 +357,50 @@ class Vivado:
         Args:
           f (file): The file object to write the synthesis arguments to.
         """
+        f.write("set SYN_ARGS [list]\n")
         for key in self.prj.syn_args.keys():
             val = self.prj.syn_args.get(key)
-            print(f"{key} {val}")
+            # flags such as -verbose are only passed when enabled
             if type(val) is bool:
                 if val:
-                    f.write(f'lappend SYN_ARGS " " {key} " "\n')
+                    f.write(f'lappend SYN_ARGS -{key}\n')
             elif type(val) is str:
-                f.write(f'lappend SYN_ARGS " " {key} " " {val} " "\n')
+                f.write(f'lappend SYN_ARGS -{key} {{{val}}}\n')
             elif type(val) is int:
-                f.write(f'lappend SYN_ARGS " " {key} ')
-                f.write('" {')
-                f.write(f" {val} ")
-                f.write('} "\n')
+                f.write(f'lappend SYN_ARGS -{key} {val}\n')
             else:
                 raise RuntimeError("Unknown type for synthesis argument")
 
     def _prj_flow_top(self, f):
-        f.write(f"update_compile_order -fileset sources_1\n")
-        f.write(f"set_property top $TOP_MODULE [current_fileset]\n")
-        f.write(f"update_compile_order -fileset sources_1\n")
+        self._prj_flow_stage(f, "compile_order", "begin")
+        if self.compile_order is None:
+            f.write("update_compile_order -fileset sources_1\n")
+            f.write("set_property top $TOP_MODULE [current_fileset]\n")
+            f.write("update_compile_order -fileset sources_1\n")
+        else:
+            # the files were read in compile order, a reopened project
+            # keeps its old order and the files pruned since
+            f.write("set_property source_mgmt_mode None [current_project]\n")
+            f.write(f"xb_order {self._tcl_list(self.compile_order)} "
+                    f"{self._tcl_list(self.unused)}\n")
+            f.write("set_property top $TOP_MODULE [current_fileset]\n")
+        self._prj_flow_stage(f, "compile_order", "end")
 
+    @staticmethod
+    def _tcl_list(entries) -> str:
+        """
+        Returns the paths of (library name, file) pairs as a Tcl list.
+
+        Args:
+          entries (List[Tuple[str, SrcFile]]): The (library name, file)
+              pairs.
+
+        Returns:
+          str: The braced list with one path per line.
+        """
+        paths = "".join("  {" + x.get_path().as_posix() + "}\n"
+                        for _, x in entries)
+        return f"{{\n{paths}}}"
 
     def _prj_flow_head(self, f):
         """
@@ -176,17 +417,27 @@ class Vivado:
         f.write(f"set PART {self.prj.part}\n")
         f.write(f"set TOP_MODULE {self.prj.top}\n")
         f.write(f"set PRJ_DIR {self.prj.outdir.as_posix()}\n")
+        self._configure_resources(f)
         # git cfg
         f.write("\n")
-        din = Path(__file__).parent / "tcl" / "git.tcl"
+        self._write_git(f)
+        f.write("\n\n")
+        din = Path(__file__).parent / "tcl" / "profile.tcl"
         with din.open("r") as d:
             f.write(d.read())
-        f.write("\n\n")
+        f.write("\n")
+        din = Path(__file__).parent / "tcl" / "sources.tcl"
+        with din.open("r") as d:
+            f.write(d.read())
+        f.write("\n")
 
+        self._prj_flow_stage(f, "open_project", "begin")
         din = Path(__file__).parent / "tcl" / "project.tcl"
         with din.open("r") as d:
             f.write(d.read())
         f.write("\n")
+        self._prj_flow_stage(f, "open_project", "end")
+        self._configure_ip_cache(f)
         self._configure_synthesis(f)
         self._configure_implementation(f)
         self._configure_generics(f)
@@ -204,10 +455,8 @@ class Vivado:
         for i in range(40):
             f.write("#")
         f.write("\n")
-        for xdc in self.prj.xdc_files:
-            f.write("catch { ")
-            f.write(f"read_xdc {xdc.get_path().as_posix()}")
-            f.write(" }\n")
+        self._read_batched(f, "read_xdc",
+                           [x.get_path() for x in self.prj.xdc_files])
         f.write("\n")
 
     def _prj_flow_ip(self, f):
@@ -223,8 +472,8 @@ class Vivado:
         for i in range(40):
             f.write("#")
         f.write("\n")
-        for ip in self.prj.ip_files:
-            f.write(f"read_ip {ip.get_path().as_posix()}\n")
+        self._read_batched(f, "read_ip",
+                           [x.get_path() for x in self.prj.ip_files])
         f.write("\n")
 
     def _prj_flow_hdl(self, f):
@@ -241,30 +490,92 @@ class Vivado:
         for i in range(40):
             f.write("#")
         f.write("\n")
+        if self.hdl_deps:
+            self._prj_flow_hdl_ordered(f)
+            return
         for lib in self.prj.libs:
             libname = lib.get_name()
             f.write(f"# library : {libname}\n")
             flist = lib.get_files()
-            for x in flist:
-                p = x.get_path()
-                t = x.get_type()
-                if t == FType.VHDL:
-                    f.write("catch { ")
-                    f.write("read_vhdl -vhdl2008 ")
-                    f.write(f"-library {libname} {p.as_posix()}")
-                    f.write(" }\n")
-                if t == FType.VERILOG:
-                    f.write("catch { ")
-                    f.write("read_verilog ")
-                    f.write(f"-library {libname} {p.as_posix()}")
-                    f.write(" }\n")
-                if t == FType.SYSTEMVERILOG:
-                    f.write("catch { ")
-                    f.write("read_verilog -sv ")
-                    f.write(f"-library {libname} {p.as_posix()}")
-                    f.write(" }\n")
+            for t in self.READ_HDL:
+                self._read_hdl(f, [(libname, x) for x in flist
+                                   if x.get_type() == t])
         f.write("\n")
 
+    def _prj_flow_hdl_ordered(self, f):
+        """
+        Writes the HDL sources referenced by the top in compile order.
+
+        Args:
+          f (file): The file object to write the generated code to.
+        """
+        graph = DependencyGraph(self.prj.libs)
+        self.compile_order = graph.compile_order(self.prj.top)
+        if self.compile_order is None:
+            print(f"top {self.prj.top} not found in the HDL sources, "
+                  "keeping all files")
+            self._read_hdl(f, graph.files)
+            f.write("\n")
+            return
+        self.unused = graph.unused(self.prj.top)
+        print(f"compile order: {len(self.compile_order)} files, "
+              f"{len(self.unused)} unused")
+        for libname, x in self.unused:
+            f.write(f"# unused : {libname} {x.get_path().as_posix()}\n")
+        self._read_hdl(f, self.compile_order)
+        f.write("\n")
+
+    def _read_hdl(self, f, entries):
+        """
+        Writes the read commands of HDL files. Consecutive files of the same
+        library and type are read by one command, so the order is kept.
+
+        Args:
+          f (file): The file object to write the commands to.
+          entries (List[Tuple[str, SrcFile]]): The (library name, file)
+              pairs.
+        """
+        group = []
+        key = None
+        for libname, x in entries:
+            t = x.get_type()
+            if t not in self.READ_HDL:
+                continue
+            if (libname, t) != key and group:
+                self._read_batched(f, self.READ_HDL[key[1]] +
+                                   f" -library {key[0]}", group)
+                group = []
+            key = (libname, t)
+            group.append(x.get_path())
+        if group:
+            self._read_batched(f, self.READ_HDL[key[1]] +
+                               f" -library {key[0]}", group)
+
+    @classmethod
+    def _read_batched(cls, f, cmd, paths):
+        """
+        Writes xb_read calls reading the files with as few commands as
+        possible. Files that cannot be read are reported one by one and
+        fail the flow after all sources were read.
+
+        Args:
+          f (file): The file object to write the commands to.
+          cmd (str): The read command including its options.
+          paths (List[Path]): The files.
+        """
+        chunk = []
+        size = 0
+        for p in paths:
+            entry = "  {" + p.as_posix() + "}\n"
+            if chunk and size + len(entry) > cls.READ_CHUNK:
+                f.write(f"xb_read {{{cmd}}} {{\n{''.join(chunk)}}}\n")
+                chunk = []
+                size = 0
+            chunk.append(entry)
+            size += len(entry)
+        if chunk:
+            f.write(f"xb_read {{{cmd}}} {{\n{''.join(chunk)}}}\n")
+
     def _prj_flow_bd(self, f):
         """
         Executes the project flow for block design (BD) files.
@@ -282,7 +593,12 @@ class Vivado:
             self.prj.outdir / str(self.prj.name + ".gen") / "sources_1/bd"
         ).as_posix()
         f.write("\n# BD files\n")
+        self._prj_flow_stage(f, "bd", "begin")
         for bd in self.prj.bd_files:
+            if self._stage_tracker().reuse_bd(bd):
+                f.write(f'puts "bd {bd.get_path().stem} is up to date, '
+                        'skipping regeneration"\n')
+                continue
             f.write(f"set b {bd.get_path().as_posix()}\n")
             f.write("set bdname [file rootname [file tail $b]]\n")
             f.write(f"set bd_path  {bd_path}\n")
@@ -296,14 +612,15 @@ class Vivado:
                 "make_wrapper -files [get_files $bd_path/$bdname/$bdname.bd] \
                       -top -inst_template -testbench\n"
             )
+            # only the wrapper of the target language exists
             f.write(
-                "catch {\
+                "xb_catch {\
                       add_files -norecurse \
                         $gen_path/$bdname/hdl/${bdname}_wrapper.v \
                       }\n"
             )
             f.write(
-                "catch {\
+                "xb_catch {\
                       add_files -norecurse \
                         $gen_path/$bdname/hdl/${bdname}_wrapper.vhd \
                       }\n"
@@ -312,17 +629,53 @@ class Vivado:
                 "generate_target all \
                       [get_files $bd_path/$bdname/$bdname.bd]\n"
             )
+        self._prj_flow_stage(f, "bd", "end")
         # generate all ips
-        f.write("catch {upgrade_ip [get_ips *]}\n")
-        f.write("catch {generate_target all [get_ips *]}\n")
+        self._prj_flow_stage(f, "ip_generate", "begin")
+        f.write("xb_catch {upgrade_ip [get_ips *]}\n")
+        f.write("xb_catch {generate_target all [get_ips *]}\n")
         f.write("foreach i [get_ips *] {\n")
-        f.write("  catch { config_ip_cache -export [get_ips -all $i] }\n")
-        f.write("}\n\n")
-        f.write("foreach i [get_ips *] {\n")
-        f.write("  catch { config_ip_cache -export [get_ips -all $i] }\n")
-        f.write("}\n\n")
+        f.write("  xb_catch { config_ip_cache -export [get_ips -all $i] }\n")
+        f.write("}\n")
+        self._prj_flow_stage(f, "ip_generate", "end")
+        f.write("\n")
+
+    def _configure_ip_cache(self, f):
+        """
+        Points the current project at the shared IP cache.
+
+        Args:
+          f (file): The file object to write the settings to.
+        """
+        if self.ip_cache is None:
+            return
+        loc = self.ip_cache.location(self.prj.part).as_posix()
+        f.write(f"set IP_CACHE {loc}\n")
+        f.write("config_ip_cache -use_cache_location $IP_CACHE\n")
+        f.write("set_property ip_cache_permissions {read write} "
+                "[current_project]\n")
+        f.write("\n")
+
+    def _stage_tracker(self) -> StageTracker:
+        if self.stages is None:
+            self.stages = StageTracker(self.prj, self._build_inputs())
+        return self.stages
+
+    def _prj_flow_stages(self, f):
+        """
+        Writes the flags telling the build flow which stages are stale.
+
+        Args:
+          f (file): The file object to write the flags to.
+        """
+        self._stage_tracker()
+        f.write("\n")
+        f.write(f"set reset_syn  {int(self.stages.reset_synth())}\n")
+        f.write(f"set reset_impl {int(self.stages.reset_impl())}\n")
+        f.write(f"set reuse_bit  {int(self.stages.reuse_bitstream())}\n")
 
     def _prj_flow_build(self, f):
+        self._prj_flow_stages(f)
         din = Path(__file__).parent / "tcl" / "synth.tcl"
         with din.open("r") as d:
             f.write(d.read())
@@ -330,7 +683,30 @@ class Vivado:
     def _prj_flow_post(self, f):
         pass
 
-    def build(self, syn=False, impl=False):
+    def _build_inputs(self):
+        return {"lang": self.lang, "git_sha": self.git_sha,
+                "git_dirty": self.git_dirty, "hdl_deps": self.hdl_deps}
+
+    def fingerprint(self):
+        """
+        Returns the fingerprint of everything this build depends on.
+
+        Returns:
+          str: The hex digest.
+        """
+        return project_fingerprint(self.prj, self._build_inputs())
+
+    def synth_checkpoint(self) -> Path:
+        """
+        Returns the checkpoint the flow writes after synthesis.
+
+        Returns:
+          Path: The synth_1 checkpoint of the project.
+        """
+        return Path(self.prj.outdir) / f"{self.prj.name}.runs" / \
+            "synth_1" / f"{self.prj.top}.dcp"
+
+    def _run_batch(self, syn, impl, log):
         pargs = [
             "vivado",
             "-nolog",
@@ -341,14 +717,303 @@ class Vivado:
             self.build_tcl.as_posix(),
             "-tclargs",
         ]
+        if self.vivado_log is not None:
+            pargs[1:2] = ["-log", Path(self.vivado_log).as_posix()]
         pargs.append(str(int(syn)))
         pargs.append(str(int(impl)))
-        code = run(pargs)
+        if self.callbacks or self.fail_fast or self.cancel is not None:
+            code = stream(pargs, VivadoLogParser(), self.callbacks,
+                          log=log, fail_fast=self.fail_fast,
+                          cancel=self.cancel)
+        elif log is None:
+            code = run(pargs)
+        else:
+            with Path(log).open("w") as lf:
+                code = run(pargs, stdout=lf, stderr=STDOUT)
         return code.returncode
 
+    def build(self, syn=False, impl=False, log: Path = None,
+              server: VivadoServer = None):
+        """
+        Runs the generated flow in Vivado batch mode and sets started to
+        the time Vivado was started.
+
+        With a build cache, a full build (impl) of an unchanged project
+        restores the cached deploy artifacts instead of starting Vivado
+        and sets cache_hit.
+
+        Args:
+          syn (bool, optional): Run synthesis. Defaults to False.
+          impl (bool, optional): Run implementation and write the deploy
+              artifacts. Defaults to False.
+          log (Path, optional): Write the Vivado output to this file instead
+              of the console. Defaults to None.
+          server (VivadoServer, optional): Run the flow in this warm Vivado
+              process instead of starting a new one. Defaults to None.
+
+        Returns:
+          int: The Vivado return code.
+        """
+        deploy = self.prj.outdir / "deploy"
+        key = None
+        self.cache_hit = False
+        if self.cache is not None and impl:
+            key = self.fingerprint()
+            if self.cache.restore(key, deploy):
+                print(f"build cache hit {key[0:12]}, skipping vivado")
+                self.cache_hit = True
+                self._store_artifacts()
+                return 0
+        start = time.time()
+        self.started = start
+        with self._profiled("vivado"), self._admitted():
+            if self.ip_cache is None:
+                returncode = self._execute(syn, impl, log, server)
+            else:
+                with self.ip_cache.session(self.prj.part):
+                    returncode = self._execute(syn, impl, log, server)
+        if self.profile is not None:
+            # the runs of a project build time and log each step themselves
+            self.profile.add_runs(
+                self.prj.outdir / f"{self.prj.name}.runs", since=start)
+            self.profile.write()
+        if returncode == 0:
+            self.stages.commit(syn, impl)
+        if key is not None and returncode == 0:
+            self.cache.store(key, deploy, self.prj.name)
+        if impl and returncode == 0:
+            self._store_artifacts()
+        return returncode
+
+    def _store_artifacts(self):
+        if self.artifacts is None:
+            return
+        manifest = self.artifacts.ingest(self.prj.name, self.git_sha)
+        if manifest is not None:
+            removed = self.artifacts.prune()
+            if removed:
+                print(f"pruned {len(removed)} old builds from deploy")
+
+    def _execute(self, syn, impl, log, server):
+        if server is None:
+            returncode = self._run_batch(syn, impl, log)
+        else:
+            parser = VivadoLogParser()
+
+            def on_line(line):
+                error = dispatch(parser, self.callbacks, line)
+                if self.cancel is not None and self.cancel.is_set():
+                    return True
+                return error and self.fail_fast
+
+            returncode = server.run(self.build_tcl, [int(syn), int(impl)],
+                                    log=log, on_line=on_line)
+        return returncode
+
+
+class NonProjectVivado(Vivado):
+    """
+    Generates a non-project (checkpoint based) flow from a Project.
+
+    The design stays in memory between the stages and a checkpoint is
+    written after synth, opt, place, phys_opt and route instead of using
+    the .xpr project and its run directories. The build interface is the
+    same as for Vivado.
+    """
+
+    def _prj_flow_head(self, f):
+        """
+        Writes the header section of the non-project flow file.
+
+        Args:
+          f (file): The file object to write the header section to.
+        """
+        for i in range(39):
+            f.write("#")
+        f.write("\n# Non-Project Mode\n")
+        f.write("# autogenerated file \n")
+        f.write("# DO NOT TOUCH \n")
+        for i in range(39):
+            f.write("#")
+        f.write("\n")
+        f.write("if { $argc != 2 } {\n")
+        f.write("  exit\n")
+        f.write("} else {\n")
+        f.write("  set ena_syn  [lindex $argv 0]\n")
+        f.write("  set ena_impl [lindex $argv 1]\n")
+        f.write("}\n\n")
+
+        f.write(f"set PRJ_NAME {self.prj.name}\n")
+        f.write(f"set PART {self.prj.part}\n")
+        f.write(f"set TOP_MODULE {self.prj.top}\n")
+        f.write(f"set PRJ_DIR {self.prj.outdir.as_posix()}\n")
+        self._configure_resources(f)
+        f.write("\n")
+        self._write_git(f)
+        f.write("\n\n")
+        din = Path(__file__).parent / "tcl" / "profile.tcl"
+        with din.open("r") as d:
+            f.write(d.read())
+        f.write("\n")
+        din = Path(__file__).parent / "tcl" / "sources.tcl"
+        with din.open("r") as d:
+            f.write(d.read())
+        f.write("\n")
+        din = Path(__file__).parent / "tcl" / "non_project.tcl"
+        with din.open("r") as d:
+            f.write(d.read())
+        f.write("\n\n")
+
+        f.write("create_project -in_memory -part $PART\n")
+        f.write("set_property XPM_LIBRARIES {XPM_CDC XPM_MEMORY XPM_FIFO} "
+                "[current_project]\n")
+        f.write("set_property target_language VHDL [current_project]\n")
+        f.write("\n")
+        self._configure_ip_cache(f)
+        self._append_syn_args(f)
+        self._append_generics(f)
+        self._configure_directives(f)
+
+    def _append_generics(self, f):
+        """
+        Appends the generics as -generic synthesis arguments.
+
+        Args:
+          f (file): The file object to write the generics to.
+        """
+        generics = self._git_generics()
+        generics.update(self.prj.generics or {})
+        for key, val in generics.items():
+            f.write(f"lappend SYN_ARGS -generic {{{key}={val}}}\n")
+        f.write("\n")
+
+    def _configure_directives(self, f):
+        """
+        Writes the directive and enable flag of every implementation step.
+
+        Args:
+          f (file): The file object to write the settings to.
+        """
+        steps = {
+            "opt_design": "OPT",
+            "place_design": "PLACE",
+            "phys_opt_design": "PHYS_OPT",
+            "route_design": "ROUTE",
+            "post_route_phys_opt_design": "POST_ROUTE_PHYS_OPT",
+        }
+        impl_args = self.prj.impl_args or {}
+        for step, var in steps.items():
+            args = {
+                k.lower(): v for k, v in (impl_args.get(step) or {}).items()
+            }
+            f.write(f"set {var}_DIRECTIVE "
+                    f"{args.get('directive', 'Default')}\n")
+        for step in ["phys_opt_design", "post_route_phys_opt_design"]:
+            args = {
+                k.lower(): v for k, v in (impl_args.get(step) or {}).items()
+            }
+            default = step == "phys_opt_design"
+            ena = int(bool(args.get("is_enabled", default)))
+            f.write(f"set ena_{step.removesuffix('_design')} {ena}\n")
+        f.write("\n")
+
+    def _prj_flow_ip(self, f):
+        """
+        Writes the commands to read, generate and synthesize the IP files.
+
+        Args:
+          f (file): The file object to write the commands to.
+        """
+        super()._prj_flow_ip(f)
+        f.write("xb_catch { generate_target all [get_ips *] }\n")
+        f.write("xb_catch { synth_ip [get_ips *] }\n")
+        f.write("\n")
+
+    def _prj_flow_bd(self, f):
+        """
+        Writes the commands to create the block designs in memory.
+
+        Args:
+            f (file): The file object to write the commands to.
+        """
+        f.write("\n# BD files\n")
+        self._prj_flow_stage(f, "bd", "begin")
+        for bd in self.prj.bd_files:
+            f.write(f"set b {bd.get_path().as_posix()}\n")
+            f.write("set bdname [file rootname [file tail $b]]\n")
+            f.write("set ret [ source $b ]\n")
+            f.write('if { $ret == 1 } {\n')
+            f.write('  puts "error in bd $b"\n')
+            f.write('  exit 1 \n')
+            f.write("}\n")
+            f.write("set bdfile [get_files $bdname.bd]\n")
+            f.write("generate_target all $bdfile\n")
+            f.write("add_files -norecurse [make_wrapper -files $bdfile "
+                    "-top]\n")
+        self._prj_flow_stage(f, "bd", "end")
+        f.write("\n")
+
+    def _parallel_runs(self) -> int:
+        # one process runs all steps one after the other
+        return 1
+
+    def _stage_tracker(self) -> StageTracker:
+        # the post synthesis checkpoint is reopened with the constraints
+        # it was synthesized with, an XDC change needs a new one
+        if self.stages is None:
+            self.stages = StageTracker(self.prj, self._build_inputs(),
+                                       xdc_in_synth=True)
+        return self.stages
+
+    def _synth_current(self) -> bool:
+        # the flow opens the checkpoint, reading and generating the
+        # sources would be thrown away
+        return (not self._stage_tracker().reset_synth()
+                and self.synth_checkpoint().is_file())
+
+    def _prj_flow_top(self, f):
+        # synth_design gets the top module directly
+        pass
+
+    def synth_checkpoint(self) -> Path:
+        """
+        Returns the checkpoint the flow writes after synthesis.
+
+        Returns:
+          Path: The post synthesis checkpoint in the output directory.
+        """
+        return Path(self.prj.outdir) / f"{self.prj.name}_post_synth.dcp"
+
+    def _prj_flow_build(self, f):
+        self._prj_flow_stages(f)
+        din = Path(__file__).parent / "tcl" / "non_project_build.tcl"
+        with din.open("r") as d:
+            f.write(d.read())
+
 
 class Petalinux:
-    def __init__(self, prj: Project):
+    def __init__(self, prj: Project, callbacks=None, fail_fast=False,
+                 profile: BuildProfile = None,
+                 sampler: ResourceSampler = None):
+        """
+        Initializes a Petalinux object.
+
+        Args:
+          prj (Project): The project object.
+          callbacks (List[callable], optional): Progress callbacks called
+              with every ProgressEvent parsed from the streamed petalinux
+              output. Defaults to None.
+          fail_fast (bool, optional): Abort a step on the first ERROR line.
+              Defaults to False.
+          profile (BuildProfile, optional): Records the time and memory of
+              the config, build and package steps. Defaults to None.
+          sampler (ResourceSampler, optional): Samples CPU, memory and I/O
+              of the bitbake process tree per step. Defaults to None.
+        """
+        self.callbacks = list(callbacks or [])
+        self.fail_fast = fail_fast
+        self.profile = profile
+        self.sampler = sampler
         if prj.linux_cfg is None:
             self.name = None
             self.kernel = None
@@ -359,6 +1024,7 @@ class Petalinux:
             self.bitstream = None
             self.fsbl = None
             self.xsa_dir = None
+            self.state_file = None
         else:
             self.name = prj.linux_cfg.get("name")
             self.kernel = prj.linux_cfg.get("kernel")
@@ -373,21 +1039,40 @@ class Petalinux:
                 Path(self.linux_dir) / "images/linux/zynq_fsbl.elf"
             ).resolve()
             self.xsa_dir = (Path(prj.outdir) / "deploy").resolve()
+            self.state_file = Path(prj.outdir) / f"{self.name}.petalinux.json"
 
         assert self.name is not None, "No petalinux name specified"
 
+    def _run(self, pargs):
+        if self.callbacks or self.fail_fast:
+            return stream(pargs, PetalinuxLogParser(), self.callbacks,
+                          cwd=self.linux_dir, fail_fast=self.fail_fast)
+        return run(pargs, cwd=self.linux_dir)
+
+    def _profiled(self, name):
+        stack = ExitStack()
+        if self.profile is not None:
+            stack.enter_context(self.profile.stage(name))
+        if self.sampler is not None:
+            stack.enter_context(self.sampler.stage(name))
+        return stack
+
     def _configure(self, xsa_dir):
         pargs = [
             "petalinux-config",
             "--silentconfig",
             f"--get-hw-description={xsa_dir / f'latest-{self.name}.xsa'}",
         ]
-        code = run(pargs, cwd=self.linux_dir)
+        with self._profiled("petalinux_config"):
+            code = self._run(pargs)
         return code
 
-    def _build(self):
+    def _build(self, component: str = None):
         pargs = ["petalinux-build"]
-        code = run(pargs, cwd=self.linux_dir)
+        if component is not None:
+            pargs += ["-c", component]
+        with self._profiled("petalinux_build"):
+            code = self._run(pargs)
         return code
 
     def _package(self):
@@ -402,18 +1087,84 @@ class Petalinux:
             f"{self.bitstream}",
             "--force",
         ]
-        code = run(pargs, cwd=self.linux_dir)
+        with self._profiled("petalinux_package"):
+            code = self._run(pargs)
         return code
 
-    def build(self, reconfigure=False, package=False):
-        if reconfigure:
+    def plan(self):
+        """
+        Compares the latest XSA with the one of the last successful build.
+
+        Returns:
+          Tuple[str, List[str], dict]: The action ("full", "components",
+          "package" or "none"), the components to rebuild and the
+          fingerprint of the latest XSA.
+        """
+        xsa = self.xsa_dir / f"latest-{self.name}.xsa"
+        current = xsa_fingerprint(xsa)
+        previous = None
+        if self.state_file.is_file():
+            try:
+                previous = json.loads(self.state_file.read_text())
+            except ValueError:
+                previous = None
+        action, components = rebuild_plan(previous, current)
+        return action, components, current
+
+    def _build_incremental(self, package):
+        action, components, current = self.plan()
+        print(f"petalinux: {action} {' '.join(components)}".rstrip())
+        xsa = self.xsa_dir / f"latest-{self.name}.xsa"
+        code = CompletedProcess([], 0)
+        if action in ["full", "components"]:
             code = self._configure(self.xsa_dir)
             code.check_returncode()
-        code = self._build()
-        code.check_returncode()
-        if package:
+        if action == "full":
+            code = self._build()
+            code.check_returncode()
+        for component in components:
+            code = self._build(component)
+            code.check_returncode()
+        if action in ["components", "package"]:
+            # petalinux-build only copies the bitstream on a full build
+            extract_bitstream(xsa, self.bitstream)
+        if action != "none" and (package or action == "package"):
             code = self._package()
             code.check_returncode()
+        self.state_file.write_text(json.dumps(current, indent=2))
+        return code
+
+    def build(self, reconfigure=False, package=False, incremental=False):
+        """
+        Builds the petalinux project.
+
+        Args:
+          reconfigure (bool, optional): Import the latest XSA first.
+              Defaults to False.
+          package (bool, optional): Package BOOT.BIN. Defaults to False.
+          incremental (bool, optional): With reconfigure, compare the
+              latest XSA with the one of the last build and only run the
+              steps its changes require: nothing, repackaging BOOT.BIN
+              for a new bitstream, rebuilding the device tree, boot
+              loaders and kernel image, or a full build. Defaults to False.
+
+        Returns:
+          CompletedProcess: The last step.
+        """
+        try:
+            if reconfigure and incremental:
+                return self._build_incremental(package)
+            if reconfigure:
+                code = self._configure(self.xsa_dir)
+                code.check_returncode()
+            code = self._build()
+            code.check_returncode()
+            if package:
+                code = self._package()
+                code.check_returncode()
+        finally:
+            if self.profile is not None:
+                self.profile.write()
         return code
 
 
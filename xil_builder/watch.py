@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+
+from xil_builder.project import Project
+from xil_builder.vivado import Vivado
+from xil_builder.workspace import BuildResult
+
+# what a change requires, in increasing order of work
+STAGES = ["tcl", "synth", "impl"]
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+           IN_CREATE | IN_DELETE)
+EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    def __init__(self, dirs):
+        """
+        Initializes an InotifyWatcher object.
+
+        Editors usually save by writing a new file and renaming it, so the
+        directories are watched instead of the files.
+
+        Args:
+          dirs (List[Path]): The directories to watch.
+
+        Raises:
+          OSError: If inotify is not available.
+        """
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        for d in dirs:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(d), IN_MASK)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"cannot watch {d}")
+            self.dirs[wd] = Path(d)
+
+    def wait(self, timeout: float = None) -> set:
+        """
+        Waits for changes.
+
+        Args:
+          timeout (float, optional): Maximum wait in seconds. Defaults to
+              None (wait forever).
+
+        Returns:
+          Set[Path]: The changed paths, empty on timeout. An overflowed
+          event queue reports all watched directories.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changes = set()
+        try:
+            buf = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return changes
+        pos = 0
+        while pos < len(buf):
+            wd, mask, _, size = EVENT.unpack_from(buf, pos)
+            name = buf[pos + EVENT.size:pos + EVENT.size + size]
+            pos += EVENT.size + size
+            if mask & IN_Q_OVERFLOW:
+                changes.update(self.dirs.values())
+            elif wd in self.dirs:
+                name = os.fsdecode(name.rstrip(b"\0"))
+                changes.add(self.dirs[wd] / name if name else self.dirs[wd])
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, dirs, files, interval: float = 1.0):
+        """
+        Initializes a PollingWatcher object.
+
+        Compares the mtime and size of the files and the mtime of the
+        directories every interval.
+
+        Args:
+          dirs (List[Path]): The directories to watch for new and removed
+              files.
+          files (List[Path]): The files to watch.
+          interval (float, optional): Seconds between two scans.
+              Defaults to 1.0.
+        """
+        self.paths = sorted(set(Path(p) for p in list(dirs) + list(files)))
+        self.interval = interval
+        self.state = self._scan()
+
+    def _scan(self):
+        state = {}
+        for p in self.paths:
+            try:
+                st = p.stat()
+            except OSError:
+                st = None
+            state[p] = None if st is None else (st.st_mtime_ns, st.st_size)
+        return state
+
+    def wait(self, timeout: float = None) -> set:
+        """
+        Waits for changes.
+
+        Args:
+          timeout (float, optional): Maximum wait in seconds. Defaults to
+              None (wait forever).
+
+        Returns:
+          Set[Path]: The changed files and directories, empty on timeout.
+        """
+        start = time.monotonic()
+        while True:
+            state = self._scan()
+            changes = {p for p, s in state.items() if self.state.get(p) != s}
+            self.state = state
+            if changes:
+                return changes
+            left = None if timeout is None else \
+                timeout - (time.monotonic() - start)
+            if left is not None and left <= 0:
+                return changes
+            time.sleep(self.interval if left is None
+                       else min(self.interval, left))
+
+    def close(self):
+        pass
+
+
+def watched_files(prj: Project) -> list:
+    """
+    Returns the files a build of a project depends on.
+
+    Args:
+      prj (Project): The project object.
+
+    Returns:
+      List[Path]: The YAML file, HDL, XDC, IP and BD files.
+    """
+    files = [prj.yaml]
+    for src in prj.bd_files + prj.ip_files + prj.xdc_files:
+        files.append(src.get_path())
+    for lib in prj.libs:
+        files.extend(f.get_path() for f in lib.get_files())
+    return [Path(f).resolve() for f in files]
+
+
+def watcher(prj: Project, interval: float = 1.0):
+    """
+    Creates a watcher for the files of a project.
+
+    Args:
+      prj (Project): The project object.
+      interval (float, optional): Scan interval of the polling fallback.
+          Defaults to 1.0.
+
+    Returns:
+      InotifyWatcher or PollingWatcher: inotify where available.
+    """
+    files = watched_files(prj)
+    dirs = {f.parent for f in files} | {Path(d).resolve() for d in prj.dirs}
+    dirs = sorted(d for d in dirs if d.is_dir())
+    try:
+        return InotifyWatcher(dirs)
+    except OSError:
+        return PollingWatcher(dirs, files, interval)
+
+
+class Watch:
+    def __init__(self, yaml: Path, outdir: Path, builder=None,
+                 goal: str = "impl", lang: str = "vhdl", debounce=0.5,
+                 interval: float = 1.0, log: Path = None, debug=False,
+                 **options):
+        """
+        Initializes a Watch object.
+
+        Rebuilds a project whenever one of its files changes. A burst of
+        saves is collected until nothing changed for `debounce` seconds,
+        then the Tcl flow is regenerated and only the stage the changes
+        require is run:
+
+          YAML, HDL, IP or BD files, files added or removed: up to the goal
+          XDC files: implementation, nothing if the goal is synthesis
+
+        A change while a build runs cancels the build; the next one covers
+        the work of both.
+
+        Args:
+          yaml (Path): The project YAML file.
+          outdir (Path): The output directory of the project.
+          builder (type, optional): Vivado or NonProjectVivado.
+              Defaults to None (Vivado).
+          goal (str, optional): "synth" or "impl". Defaults to "impl".
+          lang (str, optional): The project language. Defaults to "vhdl".
+          debounce (float, optional): Quiet time in seconds that ends a
+              burst of changes. Defaults to 0.5.
+          interval (float, optional): Scan interval of the polling
+              fallback. Defaults to 1.0.
+          log (Path, optional): Write the Vivado output of every build to
+              this file instead of the console. Defaults to None.
+          debug (bool, optional): Whether to enable debug mode.
+              Defaults to False.
+          **options: Passed on to the builder (cache, callbacks, ...).
+        """
+        assert goal in STAGES[1:], f"unknown goal {goal}"
+        self.yaml = Path(yaml)
+        self.outdir = Path(outdir)
+        self.builder = builder or Vivado
+        self.goal = goal
+        self.lang = lang
+        self.debounce = debounce
+        self.interval = interval
+        self.log = log
+        self.debug = debug
+        self.options = options
+        self.results = []
+        self.prj = None
+        self.files = None
+        self.watcher = None
+        self._stop = threading.Event()
+        self._cancel = None
+        self._thread = None
+        self._stage = None
+
+    def _load(self):
+        self.prj = Project(self.yaml, self.outdir, debug=self.debug)
+        files = set(watched_files(self.prj))
+        changed = files != self.files
+        self.files = files
+        if self.watcher is not None:
+            self.watcher.close()
+        self.watcher = watcher(self.prj, self.interval)
+        return changed
+
+    def _required(self, changes) -> str:
+        """
+        Returns the stage a set of changed paths requires.
+
+        Args:
+          changes (Set[Path]): The changed paths.
+
+        Returns:
+          str: "tcl", "synth", "impl" or None if no project file changed.
+        """
+        xdc = {Path(f.get_path()).resolve() for f in self.prj.xdc_files}
+        yaml = self.yaml.resolve()
+        outdir = self.outdir.resolve()
+        reload = False
+        need = None
+        for p in changes:
+            p = Path(p).resolve()
+            if p == yaml:
+                reload = True
+                need = self.goal
+            elif p not in self.files:
+                # the builds write to the output directory
+                if p.is_relative_to(outdir):
+                    continue
+                # a new or renamed file or a temporary file of an editor
+                reload = True
+            elif not p.exists():
+                reload = True
+                need = self.goal
+            elif p in xdc:
+                need = self._max(need, self._clip("impl"))
+            else:
+                need = self._max(need, self.goal)
+        if reload:
+            try:
+                if self._load():
+                    need = self.goal
+            except (AssertionError, OSError, ValueError) as e:
+                # e.g. a YAML file saved half way, wait for the next save
+                print(f"watch: cannot load {self.yaml}: {e}")
+                return None
+        return need
+
+    def _clip(self, stage):
+        # nothing beyond the goal is built, the flow is still regenerated
+        return stage if STAGES.index(stage) <= STAGES.index(self.goal) \
+            else "tcl"
+
+    @staticmethod
+    def _max(a, b):
+        if a is None or b is None:
+            return a or b
+        return max(a, b, key=STAGES.index)
+
+    def _build(self, stage, cancel):
+        start = time.monotonic()
+        try:
+            viv = self.builder(self.prj, self.lang, cancel=cancel,
+                               **self.options)
+            code = 0
+            if stage != "tcl":
+                code = viv.build(True, stage == "impl", log=self.log)
+        except Exception as e:
+            print(f"watch: {e}")
+            code = 1
+        if cancel.is_set():
+            status = "cancelled"
+        else:
+            status = "ok" if code == 0 else "failed"
+        print(f"watch: {stage} {status}")
+        self.results.append(BuildResult(stage, status, code,
+                                        time.monotonic() - start, self.log))
+
+    def _start(self, stage):
+        self._stage = stage
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._build,
+                                        args=(stage, self._cancel))
+        self._thread.start()
+
+    def _running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _cancel_running(self):
+        """
+        Cancels the running build.
+
+        Returns:
+          str: The stage of the cancelled build, None if none was running.
+        """
+        if not self._running():
+            return None
+        print(f"watch: cancelling {self._stage}")
+        self._cancel.set()
+        self._thread.join()
+        return self._stage
+
+    def _collect(self) -> set:
+        changes = set()
+        while not changes:
+            if self._stop.is_set():
+                return changes
+            changes = self.watcher.wait(0.2)
+        while not self._stop.is_set():
+            more = self.watcher.wait(self.debounce)
+            if not more:
+                break
+            changes |= more
+        return changes
+
+    def run(self):
+        """
+        Builds the project and rebuilds it on every change until stop() is
+        called.
+        """
+        self._load()
+        self._start(self.goal)
+        try:
+            while not self._stop.is_set():
+                changes = self._collect()
+                if not changes:
+                    continue
+                stage = self._required(changes)
+                if stage is None:
+                    continue
+                stage = self._max(stage, self._cancel_running())
+                print(f"watch: {len(changes)} changes, {stage}")
+                self._start(stage)
+        finally:
+            self._cancel_running()
+            self.watcher.close()
+
+    def stop(self):
+        """
+        Ends run() and cancels the running build.
+        """
+        self._stop.set()
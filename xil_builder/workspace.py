@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from xil_builder.cache import BuildCache
+from xil_builder.ipcache import IpCache
+from xil_builder.project import Project
+from xil_builder.resources import ResourceLedger
+from xil_builder.vivado import Vivado
+
+
+class BuildResult:
+    def __init__(self, name, status, returncode=None, duration=0.0,
+                 log=None):
+        """
+        Initializes a BuildResult object.
+
+        Args:
+          name (str): The project name.
+          status (str): "ok", "failed" or "skipped".
+          returncode (int, optional): The Vivado return code.
+              Defaults to None.
+          duration (float, optional): Build time in seconds. Defaults to 0.
+          log (Path, optional): The build log. Defaults to None.
+        """
+        self.name = name
+        self.status = status
+        self.returncode = returncode
+        self.duration = duration
+        self.log = log
+
+
+class Workspace:
+    def __init__(self, yamls, outdir: Path, jobs: int = 1,
+                 lang: str = "vhdl", cache: BuildCache = None,
+                 debug=False, builder=None, ip_cache: IpCache = None,
+                 resources: ResourceLedger = None, project_cache=False):
+        """
+        Initializes a Workspace object.
+
+        Every project is built into <outdir>/<yaml file stem>. A project
+        depends on another project if it lists its name in project.depends
+        or if one of its external_libs lies inside the other project's
+        output directory (e.g. a packaged IP repository).
+
+        Args:
+          yamls (List[Path]): The project YAML files.
+          outdir (Path): The workspace output directory.
+          jobs (int, optional): Maximum number of concurrent Vivado
+              instances (e.g. available license seats). Defaults to 1.
+          lang (str, optional): The project language. Defaults to "vhdl".
+          cache (BuildCache, optional): Shared build cache.
+              Defaults to None.
+          debug (bool, optional): Whether to enable debug mode.
+              Defaults to False.
+          builder (type, optional): Vivado or NonProjectVivado.
+              Defaults to None (Vivado).
+          ip_cache (IpCache, optional): IP cache shared by all projects.
+              Defaults to None.
+          resources (ResourceLedger, optional): Admits a started build
+              only when enough CPUs and memory are free. Defaults to None.
+          project_cache (bool, optional): Cache the resolved projects in
+              their output directories. Defaults to False.
+        """
+        assert jobs > 0, "at least one job is required"
+        self.outdir = Path(outdir)
+        self.jobs = jobs
+        self.lang = lang
+        self.cache = cache
+        self.ip_cache = ip_cache
+        self.resources = resources
+        self.builder = builder or Vivado
+        self.projects = {}
+        for yaml in yamls:
+            yaml = Path(yaml)
+            prj = Project(yaml, self.outdir / yaml.stem, debug=debug,
+                          use_cache=project_cache)
+            assert prj.name not in self.projects, \
+                f"duplicate project name {prj.name}"
+            self.projects[prj.name] = prj
+        self.deps = self._dependencies()
+        self.order = self._topological_order()
+
+    def _dependencies(self):
+        deps = {}
+        outdirs = {n: p.outdir.resolve() for n, p in self.projects.items()}
+        for name, prj in self.projects.items():
+            d = set()
+            for dep in prj.depends:
+                assert dep in self.projects, \
+                    f"{name} depends on unknown project {dep}"
+                d.add(dep)
+            for lib in prj.external_libs or []:
+                lib_path = Path(lib).resolve()
+                for other, out in outdirs.items():
+                    if other != name and lib_path.is_relative_to(out):
+                        d.add(other)
+            deps[name] = d
+        return deps
+
+    def _topological_order(self):
+        order = []
+        done = set()
+        pending = dict(self.deps)
+        while pending:
+            ready = sorted(n for n, d in pending.items() if d <= done)
+            if not ready:
+                raise RuntimeError(
+                    f"dependency cycle between {sorted(pending)}"
+                )
+            for n in ready:
+                order.append(n)
+                done.add(n)
+                del pending[n]
+        return order
+
+    def _build_one(self, name, syn, impl):
+        prj = self.projects[name]
+        log = prj.outdir / f"{name}.log"
+        start = time.monotonic()
+        viv = self.builder(prj, self.lang, cache=self.cache,
+                           ip_cache=self.ip_cache, resources=self.resources)
+        code = viv.build(syn, impl, log=log)
+        status = "ok" if code == 0 else "failed"
+        return BuildResult(name, status, code, time.monotonic() - start, log)
+
+    def build(self, syn=True, impl=True):
+        """
+        Builds all projects, running independent projects concurrently.
+
+        Every build runs in its own Vivado process; at most `jobs` of them
+        are alive at any time. Projects whose dependencies failed are
+        skipped.
+
+        Args:
+          syn (bool, optional): Run synthesis. Defaults to True.
+          impl (bool, optional): Run implementation. Defaults to True.
+
+        Returns:
+          List[BuildResult]: One result per project in build order.
+        """
+        results = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while len(results) < len(self.order):
+                for name in self.order:
+                    if name in results or name in running.values():
+                        continue
+                    deps = self.deps[name]
+                    if any(results.get(d) and results[d].status != "ok"
+                           for d in deps):
+                        results[name] = BuildResult(name, "skipped")
+                        continue
+                    if all(d in results for d in deps) and \
+                            len(running) < self.jobs:
+                        fut = pool.submit(self._build_one, name, syn, impl)
+                        running[fut] = name
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = running.pop(fut)
+                    try:
+                        results[name] = fut.result()
+                    except Exception as e:
+                        print(f"{name}: {e}")
+                        results[name] = BuildResult(name, "failed")
+        return [results[n] for n in self.order]
+
+    @staticmethod
+    def print_results(results):
+        """
+        Prints the aggregate result table.
+
+        Args:
+          results (List[BuildResult]): The build results.
+        """
+        width = max([len(r.name) for r in results] + [7])
+        print(f"{'project':<{width}}  status   code  time[s]  log")
+        for r in results:
+            code = "-" if r.returncode is None else str(r.returncode)
+            log = "" if r.log is None else str(r.log)
+            print(f"{r.name:<{width}}  {r.status:<7}  {code:>4}  "
+                  f"{r.duration:>7.1f}  {log}")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import hashlib
+import re
+import zipfile
+from fnmatch import fnmatch
+from pathlib import Path
+
+# XSA members by the petalinux components that depend on them
+CLASSES = {
+    "bitstream": ["*.bit"],
+    "devicetree": ["*.hwh", "*.xml", "*.json"],
+    "boot": ["ps7_init*", "psu_init*", "psv_init*", "*.mmi"],
+}
+# components rebuilt when a class changed, "other" needs a full build;
+# the kernel is rebuilt after the device tree because image.ub is a FIT
+# image that embeds the DTB
+COMPONENTS = {
+    "devicetree": ["device-tree", "u-boot", "kernel"],
+    "boot": ["bootloader"],
+}
+# build dates and tool paths change on every export without a hardware
+# change
+VOLATILE = re.compile(
+    rb'(?:TIMESTAMP|DATE|TIME|BUILD_TIME)="[^"]*"'
+    rb'|"(?:date|time|timestamp|path)"\s*:\s*"[^"]*"',
+    re.I,
+)
+
+
+def _member_class(name: str) -> str:
+    base = Path(name).name
+    for cls, patterns in CLASSES.items():
+        if any(fnmatch(base, p) for p in patterns):
+            return cls
+    return "other"
+
+
+def xsa_fingerprint(xsa: Path) -> dict:
+    """
+    Returns one digest per class of XSA members.
+
+    Args:
+      xsa (Path): The XSA file.
+
+    Returns:
+      dict: The hex digest of the "bitstream", "devicetree", "boot" and
+      "other" members.
+    """
+    hashes = {cls: hashlib.sha256() for cls in list(CLASSES) + ["other"]}
+    with zipfile.ZipFile(xsa) as z:
+        for info in sorted(z.infolist(), key=lambda i: i.filename):
+            if info.is_dir():
+                continue
+            cls = _member_class(info.filename)
+            data = z.read(info)
+            if cls != "bitstream":
+                data = VOLATILE.sub(b"", data)
+            h = hashes[cls]
+            h.update(Path(info.filename).name.encode() + b"\0")
+            h.update(hashlib.sha256(data).digest())
+    return {cls: h.hexdigest() for cls, h in hashes.items()}
+
+
+def rebuild_plan(previous: dict, current: dict):
+    """
+    Decides which petalinux steps a new XSA requires.
+
+    Args:
+      previous (dict): The fingerprint of the last successful build, None
+          if unknown.
+      current (dict): The fingerprint of the new XSA.
+
+    Returns:
+      Tuple[str, List[str]]: The action, one of "full", "components",
+      "package" or "none", and the components to rebuild.
+    """
+    if not previous or set(previous) != set(current):
+        return "full", []
+    changed = [cls for cls in current if previous[cls] != current[cls]]
+    if "other" in changed:
+        return "full", []
+    components = []
+    for cls in changed:
+        components += COMPONENTS.get(cls, [])
+    if components:
+        return "components", components
+    if "bitstream" in changed:
+        return "package", []
+    return "none", []
+
+
+def extract_bitstream(xsa: Path, dst: Path) -> bool:
+    """
+    Extracts the bitstream of an XSA.
+
+    Args:
+      xsa (Path): The XSA file.
+      dst (Path): The bitstream file to write.
+
+    Returns:
+      bool: True if the XSA contained a bitstream.
+    """
+    with zipfile.ZipFile(xsa) as z:
+        bits = [n for n in z.namelist() if n.endswith(".bit")]
+        if not bits:
+            return False
+        Path(dst).parent.mkdir(parents=True, exist_ok=True)
+        Path(dst).write_bytes(z.read(bits[0]))
+    return True